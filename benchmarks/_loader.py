@@ -0,0 +1,20 @@
+"""
+基准测试公共工具
+插件目录名含连字符且导入时会初始化NoneBot插件，这里将插件目录注册为一个不执行__init__的包，
+只加载被测模块及其依赖
+"""
+import sys
+import types
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent / "nonebot-plugin-anipusher"
+PACKAGE = "anipusher_bench"
+
+
+def load_plugin_package() -> str:
+    """注册插件包并返回包名，之后可通过 importlib.import_module(f"{包名}.database") 导入子模块"""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [str(PLUGIN_DIR)]
+        sys.modules[PACKAGE] = package
+    return PACKAGE
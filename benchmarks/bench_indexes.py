@@ -0,0 +1,150 @@
+"""
+二级索引基准测试
+在合成的EMBY表（默认一百万行，绝大多数已推送，每行带raw_data）上，
+对比创建 DatabaseTables.INDEXES 声明的索引前后推送认领与按剧集查询历史的耗时
+
+用法：
+    python benchmarks/bench_indexes.py [--rows 1000000] [--pending 10] [--shows 5000] [--raw-bytes 256] [--ops 50]
+"""
+import argparse
+import importlib
+import random
+import sqlite3
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from _loader import load_plugin_package
+
+package = load_plugin_package()
+database = importlib.import_module(f"{package}.database")
+DatabaseTables = database.DatabaseTables
+SQLiteQueryBuilder = database.SQLiteQueryBuilder
+TABLE = DatabaseTables.TableName.EMBY
+BATCH = 10000  # 每批写入行数
+
+
+def prepare(path: Path, rows: int, pending: int, shows: int, raw_bytes: int) -> None:
+    """生成合成数据：最后pending行待推送，其余已推送或放弃，tmdb_id在shows部剧集间分布"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SQLiteQueryBuilder.build_create_table(TABLE, DatabaseTables.get_table_schema(TABLE)))
+        sql = (f"INSERT INTO {TABLE.value} (send_status, attempts, title, episode, tmdb_id, raw_data) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+        rng = random.Random(0)
+        raw = "".join(rng.choices(string.ascii_letters, k=raw_bytes))
+        sent, dead = DatabaseTables.SendStatus.SENT, DatabaseTables.SendStatus.DEAD
+        for start in range(0, rows, BATCH):
+            batch = []
+            for i in range(start, min(start + BATCH, rows)):
+                if i >= rows - pending:
+                    status = DatabaseTables.SendStatus.PENDING
+                else:
+                    status = dead if i % 1000 == 0 else sent
+                batch.append((int(status), 1, f"Show {i % shows}", i // shows + 1, i % shows, raw))
+            conn.execute("BEGIN")
+            conn.executemany(sql, batch)
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def claim_params() -> dict:
+    """与OutboxService._claim相同的认领参数"""
+    now = time.time()
+    return {
+        "claimed": DatabaseTables.SendStatus.CLAIMED,
+        "pending": DatabaseTables.SendStatus.PENDING,
+        "failed": DatabaseTables.SendStatus.FAILED,
+        "now": now,
+        "lease_until": now + 300,
+        "limit": 1,
+    }
+
+
+def claim(conn: sqlite3.Connection, i: int) -> None:
+    """执行OutboxService.claim的认领语句后回滚，保持数据不变"""
+    conn.execute("BEGIN")
+    conn.execute(SQLiteQueryBuilder.build_claim_rows(TABLE), claim_params()).fetchall()
+    conn.execute("ROLLBACK")
+
+
+def history(shows: int):
+    """按剧集查询最近20条记录"""
+    def run(conn: sqlite3.Connection, i: int) -> None:
+        sql, params = SQLiteQueryBuilder.build_select_table(
+            TABLE, columns=["id", "title", "episode"], where={"tmdb_id": i * 7919 % shows},
+            order_by="id DESC", limit=20)
+        conn.execute(sql, params).fetchall()
+    return run
+
+
+def plan(conn: sqlite3.Connection, sql: str, params) -> str:
+    return "; ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def measure(path: Path, ops: int, benchmarks) -> dict[str, float]:
+    """返回每项的平均耗时（毫秒）"""
+    results = {}
+    conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+    try:
+        for name, statement in benchmarks:
+            statement(conn, 0)  # 预热页缓存
+            start = time.perf_counter()
+            for i in range(ops):
+                statement(conn, i)
+            results[name] = (time.perf_counter() - start) / ops * 1000
+    finally:
+        conn.close()
+    return results
+
+
+def main(rows: int, pending: int, shows: int, raw_bytes: int, ops: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        start = time.perf_counter()
+        prepare(path, rows, pending, shows, raw_bytes)
+        print(f"{TABLE.value} 表 {rows} 行（待推送 {pending} 行，{shows} 部剧集），"
+              f"生成耗时 {time.perf_counter() - start:.1f}s，文件 {path.stat().st_size / 2**20:.0f} MiB\n")
+        benchmarks = [("推送认领 (claim, limit=1)", claim),
+                      ("按剧集查询历史 (tmdb_id, ORDER BY id DESC LIMIT 20)", history(shows))]
+        history_sql, history_params = SQLiteQueryBuilder.build_select_table(
+            TABLE, columns=["id", "title", "episode"], where={"tmdb_id": 1}, order_by="id DESC", limit=20)
+
+        def report_plans(conn: sqlite3.Connection) -> None:
+            print(f"  认领语句计划：{plan(conn, SQLiteQueryBuilder.build_claim_rows(TABLE), claim_params())}")
+            print(f"  历史查询计划：{plan(conn, history_sql, history_params)}")
+
+        conn = sqlite3.connect(path)
+        report_plans(conn)
+        before = measure(path, ops, benchmarks)
+
+        start = time.perf_counter()
+        for name, index in DatabaseTables.get_table_indexes(TABLE).items():
+            conn.execute(SQLiteQueryBuilder.build_create_index(TABLE, name, index))
+        conn.commit()
+        print(f"\n创建索引 {', '.join(DatabaseTables.get_table_indexes(TABLE))} "
+              f"耗时 {time.perf_counter() - start:.1f}s，文件 {path.stat().st_size / 2**20:.0f} MiB")
+        report_plans(conn)
+        conn.close()
+        after = measure(path, ops, benchmarks)
+
+        print(f"\n每项执行 {ops} 次，平均耗时：")
+        for name, _ in benchmarks:
+            print(name)
+            print(f"  无索引   {before[name]:>10.3f} ms")
+            print(f"  有索引   {after[name]:>10.3f} ms")
+            print(f"  提升 {before[name] / after[name]:.0f}x\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="测试表行数")
+    parser.add_argument("--pending", type=int, default=10, help="待推送行数（位于表末尾）")
+    parser.add_argument("--shows", type=int, default=5000, help="剧集（tmdb_id）数量")
+    parser.add_argument("--raw-bytes", type=int, default=256, help="每行raw_data字节数")
+    parser.add_argument("--ops", type=int, default=50, help="每项执行次数")
+    args = parser.parse_args()
+    main(args.rows, args.pending, args.shows, args.raw_bytes, args.ops)
@@ -0,0 +1,118 @@
+"""
+SQL语句生成与执行基准测试
+对比旧版（值直接拼接进SQL文本）与当前（占位符 + 语句结构缓存 + 连接预编译语句缓存）的每秒语句数
+
+用法：
+    python benchmarks/bench_sql.py [--rows 20000] [--ops 20000]
+"""
+import argparse
+import asyncio
+import importlib
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import aiosqlite
+from _loader import load_plugin_package
+
+package = load_plugin_package()
+database = importlib.import_module(f"{package}.database")
+DatabaseTables = database.DatabaseTables
+SQLiteQueryBuilder = database.SQLiteQueryBuilder
+TABLE = DatabaseTables.TableName.ANIME
+
+
+def legacy_literal(val) -> str:
+    """旧版的取值拼接方式"""
+    return f"'{val}'" if isinstance(val, str) else str(val)
+
+
+def legacy_select(where: dict) -> str:
+    """旧版build_select_table的输出：每个取值生成一条不同的SQL文本"""
+    conditions = " AND ".join(f"{col} = {legacy_literal(val)}" for col, val in where.items())
+    return f"SELECT * FROM {TABLE.value} WHERE {conditions}"
+
+
+def legacy_update(update_columns: dict, where: dict) -> str:
+    """旧版build_update_table的输出"""
+    set_clause = ", ".join(f"{col}={legacy_literal(val)}" for col, val in update_columns.items())
+    where_clause = " AND ".join(f"{col}={legacy_literal(val)}" for col, val in where.items())
+    return f"UPDATE {TABLE.value} SET {set_clause} WHERE {where_clause}"
+
+
+async def prepare(path: Path, rows: int) -> None:
+    async with aiosqlite.connect(path, isolation_level=None) as conn:
+        await conn.execute(SQLiteQueryBuilder.build_create_table(TABLE, DatabaseTables.get_table_schema(TABLE)))
+        await conn.execute("BEGIN")
+        for i in range(rows):
+            sql, params = SQLiteQueryBuilder.build_insert_or_update_data(
+                TABLE, {"tmdb_id": i, "tmdb_title": f"Title {i}", "score": "8.0"})
+            await conn.execute(sql, params)
+        await conn.execute("COMMIT")
+
+
+ROUNDS = 3  # 新旧交替执行的轮数，各取最好成绩，避免先执行者承担冷启动开销
+
+
+async def run(path: Path, ops: int, rows: int, statement) -> float:
+    """在同一连接上执行ops条语句，返回每秒语句数"""
+    async with aiosqlite.connect(path, isolation_level=None, cached_statements=256) as conn:
+        start = time.perf_counter()
+        for i in range(ops):
+            sql, params = statement(i % rows)
+            async with conn.execute(sql, params) as cursor:
+                await cursor.fetchall()
+        elapsed = time.perf_counter() - start
+    return ops / elapsed
+
+
+async def run_direct(path: Path, ops: int, rows: int, statement) -> float:
+    """直接使用sqlite3执行，排除aiosqlite线程切换的开销，单独体现语句解析与规划的差异"""
+    conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+    try:
+        start = time.perf_counter()
+        for i in range(ops):
+            sql, params = statement(i % rows)
+            conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+    return ops / elapsed
+
+
+async def main(rows: int, ops: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        await prepare(path, rows)
+        print(f"{TABLE.value} 表 {rows} 行，每项 {ops} 条语句\n")
+        benchmarks = [
+            ("SELECT by tmdb_id", lambda i: (legacy_select({"tmdb_id": i}), ()),
+             lambda i: SQLiteQueryBuilder.build_select_table(TABLE, where={"tmdb_id": i})),
+            ("SELECT by tmdb_id + title (TEXT)",
+             lambda i: (legacy_select({"tmdb_id": i, "tmdb_title": f"Title {i}"}), ()),
+             lambda i: SQLiteQueryBuilder.build_select_table(TABLE, where={"tmdb_id": i, "tmdb_title": f"Title {i}"})),
+            ("UPDATE score by tmdb_id", lambda i: (legacy_update({"score": f"{i % 10}.0"}, {"tmdb_id": i}), ()),
+             lambda i: SQLiteQueryBuilder.build_update_table(TABLE, {"score": f"{i % 10}.0"}, {"tmdb_id": i})),
+        ]
+        for runner, title in ((run, "经由aiosqlite（插件实际执行路径）"),
+                              (run_direct, "直接使用sqlite3（仅语句解析与执行）")):
+            print(f"== {title}")
+            for name, legacy, current in benchmarks:
+                before = after = 0.0
+                for _ in range(ROUNDS):
+                    before = max(before, await runner(path, ops, rows, legacy))
+                    after = max(after, await runner(path, ops, rows, current))
+                print(name)
+                print(f"  拼接取值（旧）          {before:>10,.0f} 语句/秒")
+                print(f"  占位符 + 语句缓存（新） {after:>10,.0f} 语句/秒")
+                print(f"  提升 {after / before:.2f}x\n")
+        print(f"语句结构缓存：{SQLiteQueryBuilder.statement_cache_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="测试表行数")
+    parser.add_argument("--ops", type=int, default=20000, help="每项执行的语句数")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.ops))
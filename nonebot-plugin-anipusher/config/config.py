@@ -1,4 +1,5 @@
 from os import path
+
 from pydantic import BaseModel
 
 
@@ -7,6 +8,21 @@ class AnipushConfig(BaseModel):
     emby_apikey: str = "Basic"
     tmdb_apikey: str = "Basic"
     tmdb_proxy: str = "Basic"
+    queue_workers: int = 4  # webhook处理worker数量
+    queue_max_size: int = 100  # webhook等待队列最大长度
+    backlog_interval: int = 600  # 积压数据补发间隔（秒），0为仅Bot连接时补发
+    backlog_batch_size: int = 20  # 积压数据每批读取行数
+    backlog_max_push: int = 10  # 每个数据源单次最多补发条数，0为关闭补发
+    tmdb_rate_limit: float = 20  # TMDB每秒最多请求数
+    tmdb_max_retries: int = 3  # TMDB请求失败最多重试次数
+    tmdb_timeout: float = 15  # 单次TMDB调用的截止时长（秒），包含限流等待与重试
+    probe_interval: int = 60  # 上游服务探测间隔（秒），0为仅启动时检测
+    image_cache_size: int = 512  # 图片缓存容量（MB）
+    image_hedge_delay: float = 1.5  # 图片下载对冲延迟（秒）
+    image_base_url: str | None = None  # 图片路由的对外地址，配置后消息以链接引用缓存图片
+    image_max_edge: int = 0  # 图片规格化的最长边（像素），0为关闭，需要安装Pillow
+    image_quality: int = 85  # 图片规格化的编码质量（1-100）
+    image_format: str = "jpeg"  # 图片规格化的输出格式，jpeg或webp
 
 
 class Config(BaseModel):
@@ -1,11 +1,19 @@
-from ..exceptions import AppError
-from ..config import WORKDIR
+import asyncio
 import json
 import shutil
 
+from ..config import WORKDIR
+from ..exceptions import AppError
+from ..utils import BlockingIO
+
 
 class JsonStorage:
-    """Json文件存储类"""
+    """
+    Json文件存储类
+    文件读写在线程池中执行，写入与更新串行进行，避免并发的读-改-写互相覆盖
+    """
+    _lock = asyncio.Lock()
+
     @staticmethod
     async def read():
         try:
@@ -14,7 +22,7 @@ class JsonStorage:
             if not WORKDIR.config_file.exists():
                 raise AppError.Exception(
                     AppError.MissingData, f"配置文件不存在: {WORKDIR.config_file}")
-            return json.loads(WORKDIR.config_file.read_text(encoding="utf-8"))
+            return json.loads(await BlockingIO.run(WORKDIR.config_file.read_text, encoding="utf-8"))
         except Exception:
             raise
 
@@ -26,8 +34,10 @@ class JsonStorage:
             if not WORKDIR.config_file.exists():
                 raise AppError.Exception(
                     AppError.MissingData, f"配置文件不存在: {WORKDIR.config_file}")
-            WORKDIR.config_file.write_text(
-                json.dumps(data, indent=4, ensure_ascii=False), encoding="utf-8")
+            async with JsonStorage._lock:
+                await BlockingIO.run(
+                    WORKDIR.config_file.write_text,
+                    json.dumps(data, indent=4, ensure_ascii=False), encoding="utf-8")
         except Exception:
             raise
 
@@ -50,19 +60,13 @@ class JsonStorage:
                 else:
                     old[key] = value
             return old
-        try:
-            # 1. 检查配置文件路径
-            if not WORKDIR.config_file:
-                raise AppError.Exception(AppError.MissingData, "未指定配置文件路径")
-            if not WORKDIR.config_file.exists():
-                raise AppError.Exception(
-                    AppError.MissingData, f"配置文件不存在: {WORKDIR.config_file}")
-            # 准备临时文件路径
-            temp_path = WORKDIR.config_file.with_suffix(".tmp")
+
+        def update_file(config_file, temp_path) -> None:
+            """读取、合并并原子替换配置文件（在线程池中执行）"""
             # 读取原内容（文件不存在时初始化空字典）
             try:
                 old_content = json.loads(
-                    WORKDIR.config_file.read_text(encoding="utf-8"))
+                    config_file.read_text(encoding="utf-8"))
             except json.JSONDecodeError:
                 raise AppError.Exception(AppError.ConfigIOError, "配置文件格式错误")
             except FileNotFoundError:
@@ -74,7 +78,18 @@ class JsonStorage:
             temp_path.write_text(
                 json.dumps(deep_update(old_content, content), indent=4, ensure_ascii=False), encoding="utf-8")
             # 5. 替换原文件
-            shutil.move(temp_path, WORKDIR.config_file)
+            shutil.move(temp_path, config_file)
+        try:
+            # 1. 检查配置文件路径
+            if not WORKDIR.config_file:
+                raise AppError.Exception(AppError.MissingData, "未指定配置文件路径")
+            if not WORKDIR.config_file.exists():
+                raise AppError.Exception(
+                    AppError.MissingData, f"配置文件不存在: {WORKDIR.config_file}")
+            # 准备临时文件路径
+            temp_path = WORKDIR.config_file.with_suffix(".tmp")
+            async with JsonStorage._lock:
+                await BlockingIO.run(update_file, WORKDIR.config_file, temp_path)
         except Exception as e:
             # 清理临时文件
             if "temp_path" in locals() and temp_path.exists():
@@ -5,10 +5,26 @@ class AppConfig:
     """存储应用程序配置参数"""
 
     def __init__(self):
-        self.proxy: str | None = None          # 代理服务器地址
+        self.proxy: str | None = None          # 当前TMDB线路使用的代理地址，直连时为None
+        self.configured_proxy: str | None = None  # 用户配置的代理地址
         self.tmdb_authorization: str | None = None  # TMDB API密钥
         self.emby_host: str | None = None      # Emby服务器地址
         self.emby_key: str | None = None       # Emby API密钥
+        self.queue_workers: int = 4            # webhook处理worker数量
+        self.queue_max_size: int = 100         # webhook等待队列最大长度
+        self.backlog_interval: int = 600       # 积压数据补发间隔（秒）
+        self.backlog_batch_size: int = 20      # 积压数据每批读取行数
+        self.backlog_max_push: int = 10        # 每个数据源单次最多补发条数
+        self.tmdb_rate_limit: float = 20       # TMDB每秒最多请求数
+        self.tmdb_max_retries: int = 3         # TMDB请求失败最多重试次数
+        self.tmdb_timeout: float = 15          # 单次TMDB调用的截止时长（秒）
+        self.probe_interval: int = 60          # 上游服务探测间隔（秒）
+        self.image_cache_size: int = 512       # 图片缓存容量（MB）
+        self.image_hedge_delay: float = 1.5    # 图片下载对冲延迟（秒）
+        self.image_base_url: str | None = None  # 图片路由的对外地址
+        self.image_max_edge: int = 0           # 图片规格化的最长边（像素），0为关闭
+        self.image_quality: int = 85           # 图片规格化的编码质量
+        self.image_format: str = "jpeg"        # 图片规格化的输出格式
 
 
 class FeatureFlags:
@@ -1,17 +1,20 @@
 import asyncio
+import importlib
+import inspect
 import json
 import shutil
-import inspect
-import importlib
-import nonebot_plugin_localstore as store
 from pathlib import Path
-from nonebot import logger, get_plugin_config
+
+import nonebot_plugin_localstore as store
+from nonebot import get_plugin_config, logger
 from pydantic import ValidationError
-from .monitor_core.abstract_processor import AbstractDataProcessor
+
+from ..config import APPCONFIG, FUNCTION, PUSHTARGET, WORKDIR, Config
+from ..database import DBHealthCheck, ExternalIdMap
 from ..exceptions import AppError
-from ..database import DBHealthCheck
-from ..external import get_request
-from ..config import Config, APPCONFIG, FUNCTION, PUSHTARGET, WORKDIR
+from ..external import TmdbCache, get_request
+from .monitor_core.abstract_processor import AbstractDataProcessor
+from .push_core import ImageCache
 
 
 class HealthCheck:
@@ -44,6 +47,12 @@ class HealthCheck:
             # 6 数据库检查
             await DBHealthCheck.create_and_check()
             logger.opt(colors=True).info("<g>HealthCheck</g>：数据库：<g>PASS</g>")
+            # 6.1 清理并预热TMDB缓存
+            await self._warm_tmdb_cache()
+            # 6.2 回填外部ID映射
+            await self._backfill_external_ids()
+            # 6.3 载入图片缓存索引
+            await self._load_image_cache()
             # 7 动态导入所有数据处理器
             await self._import_subclasses()
             logger.opt(colors=True).info(
@@ -80,6 +89,22 @@ class HealthCheck:
             APPCONFIG.emby_key = self.config.emby_apikey
             APPCONFIG.tmdb_authorization = self.config.tmdb_apikey
             APPCONFIG.proxy = self.config.tmdb_proxy
+            APPCONFIG.configured_proxy = self.config.tmdb_proxy
+            APPCONFIG.queue_workers = self.config.queue_workers
+            APPCONFIG.queue_max_size = self.config.queue_max_size
+            APPCONFIG.backlog_interval = self.config.backlog_interval
+            APPCONFIG.backlog_batch_size = self.config.backlog_batch_size
+            APPCONFIG.backlog_max_push = self.config.backlog_max_push
+            APPCONFIG.tmdb_rate_limit = self.config.tmdb_rate_limit
+            APPCONFIG.tmdb_max_retries = self.config.tmdb_max_retries
+            APPCONFIG.tmdb_timeout = self.config.tmdb_timeout
+            APPCONFIG.probe_interval = self.config.probe_interval
+            APPCONFIG.image_cache_size = self.config.image_cache_size
+            APPCONFIG.image_hedge_delay = self.config.image_hedge_delay
+            APPCONFIG.image_base_url = (self.config.image_base_url or "").rstrip("/") or None
+            APPCONFIG.image_max_edge = self.config.image_max_edge
+            APPCONFIG.image_quality = min(max(self.config.image_quality, 1), 100)
+            APPCONFIG.image_format = self.config.image_format
         except ValidationError as e:
             logger.opt(colors=True).error(
                 "<r>HealthCheck</r>：配置读取异常!请确认env文件是否已配置")
@@ -174,6 +199,38 @@ class HealthCheck:
         }
         return tasks
 
+    # 清理过期的TMDB缓存并从数据库预热内存缓存，失败不影响启动
+    async def _warm_tmdb_cache(self) -> None:
+        try:
+            purged = await TmdbCache.purge_expired()
+            count = await TmdbCache.warm()
+            logger.opt(colors=True).info(
+                f"<g>HealthCheck</g>：TMDB缓存预热 <g>{count}</g> 条，清理过期缓存 {purged} 条")
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>HealthCheck</y>：TMDB缓存预热失败：{e}")
+
+    # 从EMBY表回填外部ID映射，失败不影响启动
+    async def _backfill_external_ids(self) -> None:
+        try:
+            count = await ExternalIdMap.backfill()
+            logger.opt(colors=True).info(
+                f"<g>HealthCheck</g>：外部ID映射回填 <g>{count}</g> 条")
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>HealthCheck</y>：外部ID映射回填失败：{e}")
+
+    # 载入图片缓存索引并按容量清理，失败不影响启动
+    async def _load_image_cache(self) -> None:
+        try:
+            count = await ImageCache.load()
+            stats = ImageCache.stats()
+            logger.opt(colors=True).info(
+                f"<g>HealthCheck</g>：图片缓存 <g>{count}</g> 张，共 {stats['bytes'] / 1024 / 1024:.1f} MB")
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>HealthCheck</y>：图片缓存索引载入失败：{e}")
+
     # 动态导入所有数据处理器
     async def _import_subclasses(self) -> None:
         """
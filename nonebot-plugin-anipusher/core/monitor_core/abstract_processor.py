@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
+
 from nonebot import logger
-from .processor.anime_process import AnimeProcess
-from ...database import DatabaseTables, DatabaseService
+
+from ...database import DatabaseService, DatabaseTables, OutboxService
 from ...exceptions import AppError
-from ..push_core import PushService
+from ..push_core import ImageProcessor, PushService
+from .keyed_executor import KeyedExecutor
+from .processor.anime_process import AnimeProcess
 
 
 class AbstractDataProcessor(ABC):  # 数据处理基类
@@ -14,6 +17,8 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
         self.source: DatabaseTables.TableName = source  # 解析到的数据源
         self.reformated_data = None  # 整形化后的数据
         self.tmdb_id = None  # TMDB ID
+        self.row_id = None  # 持久化后数据在源表中的ID
+        self.anime_data = None  # 合并后的Anime数据
 
     @classmethod
     def register(cls, source_type):
@@ -32,13 +37,17 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
         return None
 
     # 主处理流程
-    async def execute(self):
+    async def execute(self) -> bool:
         """
         执行完整处理流程
-        1. 数据格式化
+        1. 数据格式化，完成后即在后台预取图片
         2. 数据持久化
         3. 可选项：Anime数据处理
         4. 数据推送
+        其中2~4步按番剧分片串行执行，避免同一番剧的并发事件互相覆盖Anime数据；
+        该番剧正在处理时本事件移交至其队列后立即返回，不占用接收队列的worker
+        Returns:
+            本次调用是否已执行完毕，移交至番剧队列时返回False
         """
         # 数据格式化
         try:
@@ -46,7 +55,28 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
         except (AppError.Exception, Exception) as e:
             logger.opt(colors=True).error(
                 f"<r>{self.source.value}</r>：数据格式化异常：{e}")
-            return
+            return True
+        # 图片下载与后续处理并行，推送时通常可直接使用已预热的缓存
+        self._prefetch_image()
+        return await KeyedExecutor.run(self._serial_key(), self._persist_and_push)
+
+    def _prefetch_image(self) -> None:
+        try:
+            image_queue, series_id = self._image_sources()
+            ImageProcessor.prefetch(image_queue, series_id, self.tmdb_id)
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>{self.source.value}</y>：图片预取异常：{e}")
+
+    # 分片key：优先使用tmdb_id，没有时使用Emby的series_id
+    def _serial_key(self) -> str | None:
+        if self.tmdb_id:
+            return f"tmdb:{self.tmdb_id}"
+        if self.reformated_data and (series_id := self.reformated_data.get("series_id")):
+            return f"series:{series_id}"
+        return None
+
+    async def _persist_and_push(self):
         # 数据持久化
         try:
             await self._store_data()
@@ -78,8 +108,10 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
         if not self.reformated_data:
             raise AppError.Exception(
                 AppError.ParamNotFound, f"<r>{self.source.value}</r>：待持久化的数据为空")
+        # 写入时即认领该数据，由本流程负责推送
+        self.reformated_data.update(OutboxService.new_claim())
         try:
-            await DatabaseService.upsert_data(
+            self.row_id = await DatabaseService.upsert_data(
                 self.source, self.reformated_data)
             logger.opt(colors=True).info(
                 f"<g>{self.source.value}</g>：数据持久化 <g>完成</g>")
@@ -90,6 +122,10 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
     def _enable_anime_process(self):
         return False
 
+    # 可选项，用于预取的图片队列及Emby的series_id
+    def _image_sources(self) -> tuple[list, str | None]:
+        return [], None
+
     # 可选项，Anime数据处理
     async def _anime_process(self):
         if not self.tmdb_id:
@@ -104,12 +140,20 @@ class AbstractDataProcessor(ABC):  # 数据处理基类
             anime_process = AnimeProcess(
                 self.reformated_data, self.source)
             await anime_process.process()
+            self.anime_data = anime_process.merged_data
         except Exception as e:
             raise e
 
     # 数据推送
     async def _push(self) -> None:
-        await PushService.create_and_run(self.source)
+        # 直接将内存中的数据交给推送服务，避免重新查询数据库
+        if self.row_id is None or not self.reformated_data:
+            # 不认领其他数据代替推送：本条数据（若已写入）在租约过期后由补发流程推送
+            logger.opt(colors=True).error(
+                f"<r>{self.source.value}</r>：未获取到持久化后的数据ID，等待补发流程推送")
+            return
+        source_data = {**self.reformated_data, "id": self.row_id}
+        await PushService.create_and_run(self.source, source_data, self.anime_data)
 
     # 需要子类实现的抽象方法
     # 数据格式化
@@ -0,0 +1,134 @@
+import asyncio
+from typing import Any, Optional
+
+from nonebot import logger
+
+from .keyed_executor import KeyedExecutor
+from .processing_engine import DataProcessor
+
+
+class IngestQueue:
+    """
+    webhook接收队列
+    有界队列 + 固定数量的worker，限制同时运行的处理流程数量
+    队列中的数据与已移交至番剧分片队列（KeyedExecutor）等待执行的数据合计达到上限时拒绝入队，由上游重试
+    """
+    _queue: Optional[asyncio.Queue[tuple[float, Any]]] = None
+    _workers: list[asyncio.Task] = []
+    _max_size = 100
+    # 统计数据
+    _busy_workers = 0
+    _accepted = 0
+    _rejected = 0
+    _processed = 0
+    _handed_off = 0  # 移交至番剧分片队列、由该番剧的执行者稍后处理的数据
+    _failed = 0
+    _last_wait = 0.0
+    _max_wait = 0.0
+    _total_wait = 0.0
+
+    @classmethod
+    async def start(cls, workers: int, max_size: int) -> None:
+        """启动队列及worker"""
+        if cls._queue is not None:
+            return
+        cls._max_size = max(1, max_size)
+        cls._queue = asyncio.Queue(maxsize=cls._max_size)
+        cls._workers = [
+            asyncio.create_task(cls._worker(i), name=f"anipusher_ingest_{i}")
+            for i in range(max(1, workers))
+        ]
+        logger.opt(colors=True).info(
+            f"<g>IngestQueue</g>：已启动 {len(cls._workers)} 个worker，队列上限 {cls._max_size}")
+
+    @classmethod
+    async def stop(cls, timeout: float = 5) -> None:
+        """停止worker，最多等待timeout秒让队列中的数据处理完毕"""
+        if cls._queue is None:
+            return
+        try:
+            await asyncio.wait_for(cls._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.opt(colors=True).warning(
+                f"<y>IngestQueue</y>：停止时仍有 {cls._queue.qsize()} 条数据未处理，将被丢弃")
+        for task in cls._workers:
+            task.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+        cls._queue = None
+
+    @classmethod
+    def submit(cls, data: Any) -> bool:
+        """
+        非阻塞入队
+        Returns:
+            bool: 入队成功返回True，队列已满或未启动返回False
+        """
+        if cls._queue is None:
+            return False
+        try:
+            if cls._queue.qsize() + KeyedExecutor.pending() >= cls._max_size:
+                raise asyncio.QueueFull
+            cls._queue.put_nowait((asyncio.get_running_loop().time(), data))
+        except asyncio.QueueFull:
+            cls._rejected += 1
+            logger.opt(colors=True).warning(
+                f"<y>IngestQueue</y>：队列已满({cls._max_size}，其中 {KeyedExecutor.pending()} 条等待番剧分片)，"
+                "拒绝本次推送")
+            return False
+        cls._accepted += 1
+        return True
+
+    @classmethod
+    def depth(cls) -> int:
+        """当前排队中的数据数量"""
+        return cls._queue.qsize() if cls._queue is not None else 0
+
+    @classmethod
+    def stats(cls) -> dict:
+        """队列状态统计"""
+        finished = cls._processed + cls._failed
+        return {
+            "depth": cls.depth(),
+            "lane_pending": KeyedExecutor.pending(),  # 已移交至番剧分片队列、尚未执行的数据
+            "max_size": cls._max_size,
+            "workers": len(cls._workers),
+            "busy_workers": cls._busy_workers,
+            "accepted": cls._accepted,
+            "rejected": cls._rejected,
+            "processed": cls._processed,
+            "handed_off": cls._handed_off,
+            "failed": cls._failed,
+            "last_wait": round(cls._last_wait, 3),
+            "max_wait": round(cls._max_wait, 3),
+            "avg_wait": round(cls._total_wait / finished, 3) if finished else 0.0,
+        }
+
+    @classmethod
+    async def _worker(cls, index: int) -> None:
+        assert cls._queue is not None
+        queue = cls._queue
+        while True:
+            enqueued_at, data = await queue.get()
+            wait = asyncio.get_running_loop().time() - enqueued_at
+            cls._last_wait = wait
+            cls._max_wait = max(cls._max_wait, wait)
+            cls._total_wait += wait
+            cls._busy_workers += 1
+            logger.opt(colors=True).debug(
+                f"IngestQueue：worker{index} 开始处理，排队 {wait:.3f}s，剩余 {queue.qsize()} 条")
+            try:
+                processor = await DataProcessor.create_and_run(data)
+                if processor.handed_off:
+                    cls._handed_off += 1  # 执行结果计入KeyedExecutor的统计
+                else:
+                    cls._processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                cls._failed += 1
+                logger.opt(colors=True).error(
+                    f"<r>IngestQueue</r>：数据处理异常：{e}")
+            finally:
+                cls._busy_workers -= 1
+                queue.task_done()
@@ -0,0 +1,91 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Hashable
+
+from nonebot import logger
+
+
+class KeyedExecutor:
+    """
+    按key分片的执行器
+    同一key的任务按提交顺序串行执行，不同key的任务并发执行
+    用于保护同一部番剧（tmdb_id/series_id）的 读取-合并-写入 流程
+    每个key一条队列：key空闲时由提交者直接执行，并负责执行期间同key后续提交的任务；
+    key忙碌时任务进入队列后立即返回，提交者（接收队列的worker）不会因等待该key而被占用；
+    排队中的任务计入接收队列的容量（见IngestQueue.submit），不会绕过接收队列的上限
+    """
+    _lanes: dict[Hashable, deque[Callable[[], Awaitable[object]]]] = {}  # 正在执行的key → 排队中的任务
+    # 统计数据
+    _handed_off = 0  # 累计移交至key队列的任务数
+    _lane_completed = 0  # 移交的任务中执行完成的数量
+    _lane_failed = 0  # 移交的任务中执行异常的数量
+
+    @classmethod
+    async def run(cls, key: Hashable | None, func: Callable[[], Awaitable[object]]) -> bool:
+        """
+        在key对应的分片上执行func
+        Args:
+            key: 分片key，为None时不做串行化直接执行
+            func: 无参协程函数
+        Returns:
+            由本次调用执行返回True；key正在执行、func已移交给该key的执行者时返回False
+        Raises:
+            func自身抛出的异常（移交来的任务的异常仅记录日志）
+        """
+        if key is None:
+            await func()
+            return True
+        lane = cls._lanes.get(key)
+        if lane is not None:
+            lane.append(func)
+            cls._handed_off += 1
+            return False
+        lane = cls._lanes[key] = deque()
+        error: Exception | None = None
+        try:
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e  # 先执行完排队任务再抛出
+            await cls._drain(key, lane)
+        finally:
+            if lane:
+                logger.opt(colors=True).warning(
+                    f"<y>KeyedExecutor</y>：{key} 执行中断，丢弃 {len(lane)} 个排队任务")
+            del cls._lanes[key]
+        if error is not None:
+            raise error
+        return True
+
+    @classmethod
+    async def _drain(cls, key: Hashable, lane: deque[Callable[[], Awaitable[object]]]) -> None:
+        """按顺序执行移交到该key的任务"""
+        while lane:
+            func = lane.popleft()
+            try:
+                await func()
+                cls._lane_completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                cls._lane_failed += 1
+                logger.opt(colors=True).error(
+                    f"<r>KeyedExecutor</r>：{key} 排队任务执行异常：{e}")
+
+    @classmethod
+    def pending(cls) -> int:
+        """已移交、尚未开始执行的任务数量"""
+        return sum(len(lane) for lane in cls._lanes.values())
+
+    @classmethod
+    def stats(cls) -> dict:
+        """执行器状态统计"""
+        return {
+            "active_keys": len(cls._lanes),
+            "queued": cls.pending(),
+            "handed_off": cls._handed_off,
+            "completed": cls._lane_completed,
+            "failed": cls._lane_failed,
+        }
@@ -1,9 +1,16 @@
 
-from nonebot import get_driver
-from nonebot.drivers import URL, Request, Response, ASGIMixin, HTTPServerSetup
-import asyncio
-from nonebot import logger
-from .processing_engine import DataProcessor
+import json
+
+from nonebot import get_driver, logger
+from nonebot.drivers import URL, ASGIMixin, HTTPServerSetup, Request, Response
+
+from ...config import APPCONFIG
+from ...external import CircuitBreaker, TmdbCache, TmdbClient
+from ..push_core import ImageCache
+from ..push_core.image_service import ImageProcessor
+from ..upstream_prober import UpstreamProber
+from .ingest_queue import IngestQueue
+from .keyed_executor import KeyedExecutor
 
 
 class Monitor:
@@ -19,12 +26,31 @@ class Monitor:
         async def handle_webhook(request: Request) -> Response:
             data = request.json
             logger.opt(colors=True).info(f"<lg>获取到新的推送消息：</lg>\n{data}")
-            # 在此处添加 处理流程
-            asyncio.create_task(DataProcessor.create_and_run(data))
+            # 放入接收队列，队列已满时返回503让上游重试
+            if not IngestQueue.submit(data):
+                return Response(503,
+                                headers={"Content-Type": "application/json",
+                                         "Retry-After": "30"},
+                                content=json.dumps({"status": "busy", **IngestQueue.stats()}))
             return Response(200,
-                            headers={"Content-Type": "application/json"},
+                            headers={"Content-Type": "application/json",
+                                     "X-Queue-Depth": str(IngestQueue.depth())},
                             content="ok")
 
+        async def handle_status(request: Request) -> Response:
+            return Response(200,
+                            headers={"Content-Type": "application/json"},
+                            content=json.dumps({"ingest": IngestQueue.stats(),
+                                                 "series": KeyedExecutor.stats(),
+                                                 "tmdb_cache": TmdbCache.stats(),
+                                                 "tmdb_requests": TmdbClient.stats(),
+                                                 "upstream": UpstreamProber.stats(),
+                                                 "circuits": CircuitBreaker.stats(),
+                                                 "image_cache": ImageCache.stats(),
+                                                 "image_requests": ImageProcessor.stats()}, ensure_ascii=False))
+
+        await IngestQueue.start(APPCONFIG.queue_workers, APPCONFIG.queue_max_size)
+
         if isinstance(self.driver, ASGIMixin):
             self.driver.setup_http_server(
                 HTTPServerSetup(
@@ -34,5 +60,50 @@ class Monitor:
                     handle_func=handle_webhook,
                 )
             )
+            self.driver.setup_http_server(
+                HTTPServerSetup(
+                    path=URL("/webhook/status"),
+                    method="GET",
+                    name="monitor_status",
+                    handle_func=handle_status,
+                )
+            )
             logger.opt(colors=True).success(
                 f"🔍 监控服务已启动，监听地址: <cyan>{self.host}:{self.port}/webhook</cyan>")
+            if APPCONFIG.image_base_url:
+                self._mount_image_route()
+
+    def _mount_image_route(self) -> None:
+        """
+        在驱动器的ASGI应用上挂载只读的缓存图片路由
+        使用Starlette的StaticFiles直接从缓存目录发送文件，并支持条件请求；
+        非Starlette系（FastAPI）驱动器不支持挂载，消息继续内嵌base64图片
+        """
+        try:
+            from starlette.applications import Starlette
+            from starlette.staticfiles import StaticFiles
+        except ImportError:
+            Starlette = StaticFiles = None
+        app = getattr(self.driver, "server_app", None)
+        if Starlette is None or StaticFiles is None or not isinstance(app, Starlette):
+            logger.opt(colors=True).warning(
+                "<y>Monitor</y>：当前驱动器不支持挂载图片路由，图片将以base64发送")
+            return
+        try:
+            app.mount(ImageCache.ROUTE,
+                      StaticFiles(directory=ImageCache.cache_dir()),
+                      name="anipusher_images")
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>Monitor</y>：图片路由挂载失败，图片将以base64发送：{e}")
+            return
+        ImageCache.route_mounted = True
+        logger.opt(colors=True).success(
+            f"🖼️ 图片路由已挂载，访问地址: <cyan>{APPCONFIG.image_base_url}{ImageCache.ROUTE}</cyan>")
+
+    @staticmethod
+    async def stop_monitor():
+        """
+        停止监控服务，等待队列中的数据处理完毕
+        """
+        await IngestQueue.stop()
@@ -1,13 +1,15 @@
-from ...exceptions import AppError
+from nonebot import logger
+
 from ...database import DatabaseTables
+from ...exceptions import AppError
 from ..monitor_core.abstract_processor import AbstractDataProcessor
-from nonebot import logger
 
 
 class DataProcessor():  # 数据处理
     def __init__(self, data):
         self.data = data  # 待处理数据
         self.source = None  # 数据源
+        self.handed_off = False  # 是否已移交至番剧分片队列，尚未执行
 
     # 初始化&主入口
     @classmethod
@@ -38,7 +40,7 @@ class DataProcessor():  # 数据处理
             if not processor:
                 raise AppError.Exception(
                     AppError.UnKnowSource, f"数据源解析失败：未找到对应的处理器，数据源类型：{self.source.value}")
-            await processor.execute()  # 执行处理流程
+            self.handed_off = not await processor.execute()  # 执行处理流程
         except (AppError.Exception, Exception) as e:
             raise e
 
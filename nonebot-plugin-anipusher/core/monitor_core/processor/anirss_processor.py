@@ -1,11 +1,13 @@
 
 import json
 import re
+
 from nonebot import logger
-from ..abstract_processor import AbstractDataProcessor
+
 from ....database import DatabaseTables
 from ....exceptions import AppError
 from ....utils import CommonUtils
+from ..abstract_processor import AbstractDataProcessor
 
 
 @AbstractDataProcessor.register(DatabaseTables.TableName.ANI_RSS)
@@ -158,3 +160,13 @@ class AniRSSProcessor(AbstractDataProcessor):
         这里可以根据实际需求决定是否启用Anime数据处理
         """
         return True
+
+    def _image_sources(self) -> tuple[list, str | None]:
+        """
+        可选项，用于预取的图片队列及Emby的series_id
+        AniRSS仅提供图片链接
+        """
+        if not self.reformated_data:
+            return [], None
+        image_url = self.reformated_data.get("image_url")
+        return ([image_url] if image_url else []), None
@@ -1,16 +1,17 @@
 
-import json
 import asyncio
+import json
 import re
-from typing import Any
+from typing import Any, Awaitable, Literal, cast
+
 from nonebot import logger
+
 from ....config import FUNCTION
-from ....database import DatabaseTables
-from ..abstract_processor import AbstractDataProcessor
+from ....database import DatabaseTables, ExternalIdMap
 from ....exceptions import AppError
-from ....utils import CommonUtils
 from ....external import TmdbClient
-from typing import cast, Literal
+from ....utils import CommonUtils
+from ..abstract_processor import AbstractDataProcessor
 
 
 @AbstractDataProcessor.register(DatabaseTables.TableName.EMBY)
@@ -112,8 +113,11 @@ class EmbyDataProcessor(AbstractDataProcessor):
             f"<g>{self.source.value}</g>：数据整形化完成，已准备好持久化数据")
 
     class DataExtraction:
+        SOURCE_NAMES = {"imdb_id": "Imdb", "tvdb_id": "Tvdb"}  # 外部ID来源 → 解析候选名称
+
         def __init__(self, data: dict):
             self.data = data
+            self._mapped_sources: set[str] = set()  # 由已保存的映射直接得到TMDB ID的候选
 
         def extract_timestamp(self) -> str:
             """提取时间戳"""
@@ -221,27 +225,65 @@ class EmbyDataProcessor(AbstractDataProcessor):
                     "<y>TMDB</y>：功能未启用，无法获取/验证 TMDB ID")
                 tmdb_id = None
                 return tmdb_id, imdb_id, tvdb_id
-            # 如果获取到tmdb_id，尝试验证ID
+            # 同时发起tmdb_id验证与第三方id转换，按 Tmdb > Imdb > Tvdb 的优先级取结果
+            candidates = []
             if tmdb_id:
-                # 如果验证成功直接返回，否则将tmdb_id置为None
-                if await self._verify_id_from_response(int(tmdb_id), item_type):
-                    return tmdb_id, imdb_id, tvdb_id
-                else:
-                    tmdb_id = None
-            # 当tmdb_id失败时，尝试通过第三方id转换获取tmdb_id
-            tasks = [
-                self._convert_external_id_to_tmdb(imdb_id, "imdb_id"),
-                self._convert_external_id_to_tmdb(tvdb_id, "tvdb_id")
-            ]
-            tasks_result = await asyncio.gather(*tasks, return_exceptions=True)
-            for result in tasks_result:
-                if result is not None and not isinstance(result, Exception):
-                    logger.opt(colors=True).info(
-                        f"<y>EMBY</y>：通过第三方ID转换成功，获取到TMDB ID: <b>{result}</b>")
-                    return result, imdb_id, tvdb_id
-            logger.opt(colors=True).warning(
-                "<y>EMBY</y>：所有第三方ID转换均失败，将返回空TMDB ID")
-            return None, imdb_id, tvdb_id
+                candidates.append(("Tmdb", self._verified_tmdb_id(tmdb_id, item_type)))
+            if imdb_id:
+                candidates.append(("Imdb", self._convert_external_id_to_tmdb(imdb_id, "imdb_id")))
+            if tvdb_id:
+                candidates.append(("Tvdb", self._convert_external_id_to_tmdb(tvdb_id, "tvdb_id")))
+            source, result = await self._resolve_by_priority(candidates)
+            if result is None:
+                logger.opt(colors=True).warning(
+                    "<y>EMBY</y>：TMDB ID验证及所有第三方ID转换均失败，将返回空TMDB ID")
+                return None, imdb_id, tvdb_id
+            if source != "Tmdb":
+                logger.opt(colors=True).info(
+                    f"<y>EMBY</y>：通过第三方ID（{source}）转换成功，获取到TMDB ID: <b>{result}</b>")
+            if source in self._mapped_sources:
+                return result, imdb_id, tvdb_id  # 结果直接来自已保存的映射，无需写入
+            try:
+                await ExternalIdMap.record(result, imdb_id=imdb_id, tvdb_id=tvdb_id)
+            except Exception as e:
+                logger.opt(colors=True).warning(
+                    f"<y>EMBY</y>：写入外部ID映射失败：{e}")
+            return result, imdb_id, tvdb_id
+
+        async def _verified_tmdb_id(self, tmdb_id, item_type) -> Any | None:
+            """验证tmdb_id，有效时返回该ID，否则返回None"""
+            if await self._verify_id_from_response(int(tmdb_id), item_type):
+                return tmdb_id
+            return None
+
+        @staticmethod
+        async def _resolve_by_priority(candidates: list[tuple[str, Awaitable[Any]]]) -> tuple[str | None, Any | None]:
+            """
+            并发执行所有候选任务，按列表顺序（优先级）返回第一个非空结果
+            较高优先级的任务得到结果后取消剩余的低优先级任务
+            Args:
+                candidates: (来源名称, 返回ID或None的协程) 列表，按优先级从高到低排列
+            Returns:
+                (来源名称, ID)，全部失败时返回 (None, None)
+            """
+            tasks = [(name, asyncio.ensure_future(coro)) for name, coro in candidates]
+            try:
+                for name, task in tasks:
+                    try:
+                        result = await task
+                    except Exception as e:
+                        logger.opt(colors=True).warning(
+                            f"<y>EMBY</y>：通过 {name} 获取TMDB ID时发生异常：{e}")
+                        continue
+                    if result is not None:
+                        return name, result
+                return None, None
+            finally:
+                for _, task in tasks:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        task.exception()  # 已完成但未使用的结果，避免未获取异常的警告
 
         def extract_series_id(self, item_type, item) -> Any | None:
             """提取Series ID"""
@@ -420,6 +462,18 @@ class EmbyDataProcessor(AbstractDataProcessor):
                     AppError.ParamNotFound, "参数缺失！缺少第三方ID来源")
             if not external_id:
                 return None
+            # 优先使用已保存的映射，避免网络请求
+            try:
+                mapped_id = await ExternalIdMap.get(source, external_id)
+            except Exception as e:
+                logger.opt(colors=True).warning(
+                    f"<y>EMBY</y>：查询外部ID映射失败：{e}")
+                mapped_id = None
+            if mapped_id is not None:
+                logger.opt(colors=True).info(
+                    f"<g>EMBY</g>：外部ID映射命中 {source}={external_id} → TMDB ID: <b>{mapped_id}</b>")
+                self._mapped_sources.add(self.SOURCE_NAMES[source])
+                return mapped_id
             try:
                 response = await TmdbClient.find_by_external_id(
                     external_id, source)
@@ -450,3 +504,13 @@ class EmbyDataProcessor(AbstractDataProcessor):
         这里可以根据实际需求决定是否启用Anime数据处理
         """
         return True
+
+    def _image_sources(self) -> tuple[list, str | None]:
+        """
+        可选项，用于预取的图片队列及Emby的series_id
+        Emby使用剧集的主封面
+        """
+        if not self.reformated_data:
+            return [], None
+        series_tag = self.reformated_data.get("series_tag")
+        return ([series_tag] if series_tag else []), self.reformated_data.get("series_id")
@@ -1,5 +1,11 @@
+from .backlog import BacklogDrainer
 from .handler import PushService
+from .image_cache import ImageCache
+from .image_service import ImageProcessor
 
 __all__ = [
     'PushService',
+    'BacklogDrainer',
+    'ImageCache',
+    'ImageProcessor',
 ]
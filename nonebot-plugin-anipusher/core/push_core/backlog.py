@@ -0,0 +1,108 @@
+import asyncio
+from typing import Optional
+
+from nonebot import get_bots, logger
+
+from ...database import DatabaseTables, OutboxService
+from .handler import PushService
+
+
+class BacklogDrainer:
+    """
+    积压数据补发
+    按id顺序分批从发件箱认领EMBY/ANIRSS表中可推送的数据（待推送、到期重试、租约过期）并逐条推送
+    启动后按固定间隔执行，Bot连接时额外执行一次；没有已连接的Bot时跳过，避免数据因无法发送而消耗重试次数
+    """
+    SOURCES = (DatabaseTables.TableName.EMBY, DatabaseTables.TableName.ANI_RSS)
+    _task: Optional[asyncio.Task] = None
+    _triggered: set[asyncio.Task] = set()  # Bot连接时触发的补发任务
+    _lock = asyncio.Lock()
+    _interval = 600  # 扫描间隔（秒），0为仅Bot连接时执行
+    _batch_size = 20  # 每批读取的数据行数
+    _max_push = 10  # 每个数据源单次最多补发的条数，避免宕机恢复后刷屏
+
+    @classmethod
+    async def start(cls, interval: int, batch_size: int, max_push: int) -> None:
+        """启动补发任务"""
+        if cls._task is not None:
+            return
+        cls._interval = max(0, interval)
+        cls._batch_size = max(1, batch_size)
+        cls._max_push = max(0, max_push)
+        cls._task = asyncio.create_task(cls._run(), name="anipusher_backlog")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止补发任务"""
+        tasks = list(cls._triggered)
+        if cls._task is not None:
+            tasks.append(cls._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cls._task = None
+        cls._triggered.clear()
+
+    @classmethod
+    def trigger(cls) -> None:
+        """Bot连接时补发一次（补发任务未启动时忽略）"""
+        if cls._task is None:
+            return
+        task = asyncio.create_task(cls._drain_logged(), name="anipusher_backlog_trigger")
+        cls._triggered.add(task)
+        task.add_done_callback(cls._triggered.discard)
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            await cls._drain_logged()
+            if not cls._interval:
+                return
+            await asyncio.sleep(cls._interval)
+
+    @classmethod
+    async def _drain_logged(cls) -> None:
+        try:
+            await cls.drain()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.opt(colors=True).error(f"<r>Backlog</r>：积压数据补发异常：{e}")
+
+    @classmethod
+    async def drain(cls) -> dict[str, int]:
+        """
+        补发所有数据源的积压数据
+        Returns:
+            各数据源本次补发的条数
+        """
+        if cls._max_push == 0:
+            return {}
+        if not get_bots():
+            logger.opt(colors=True).debug("<y>Backlog</y>：暂无已连接的Bot，跳过积压数据补发")
+            return {}
+        async with cls._lock:  # 避免定时任务与手动调用重叠
+            return {source.value: await cls._drain_source(source) for source in cls.SOURCES}
+
+    @classmethod
+    async def _drain_source(cls, source: DatabaseTables.TableName) -> int:
+        pushed = 0
+        while pushed < cls._max_push:
+            rows = await OutboxService.claim(
+                source, limit=min(cls._batch_size, cls._max_push - pushed))
+            if not rows:
+                break
+            for source_data in rows:
+                try:
+                    await PushService.create_and_run(source, source_data)
+                except Exception as e:
+                    logger.opt(colors=True).error(
+                        f"<r>Backlog</r>：{source.value} 数据 {source_data.get('id')} 补发失败：{e}")
+                pushed += 1
+        if pushed >= cls._max_push and await OutboxService.has_claimable(source):
+            logger.opt(colors=True).warning(
+                f"<y>Backlog</y>：{source.value} 本次补发已达上限 {cls._max_push} 条，剩余数据将在下次补发")
+        if pushed:
+            logger.opt(colors=True).info(
+                f"<g>Backlog</g>：{source.value} 补发积压数据 <g>{pushed}</g> 条")
+        return pushed
@@ -1,19 +1,25 @@
 
 from nonebot import logger
-from ...database import DatabaseTables, DatabaseService
+
+from ...config import PUSHTARGET
+from ...database import DatabaseService, DatabaseTables, OutboxService
 from ...exceptions import AppError
-from .image_service import ImageProcessor
+from ...utils import CommonUtils
 from .data_service import DataPicking
-from ...config import PUSHTARGET
+from .image_service import ImageProcessor
 from .message_builder import MessageBuilder
 from .message_template import MessageTemplate
 from .msg_pusher import group_msg_pusher, private_msg_pusher
-from ...utils import CommonUtils
 
 
 class PushService:
-    def __init__(self, source: DatabaseTables.TableName):
+    def __init__(self,
+                 source: DatabaseTables.TableName,
+                 source_data: dict | None = None,
+                 anime_data: dict | None = None):
         self.source = source  # 数据源
+        self.source_data = source_data  # 已认领的源数据（需包含id及lease_until），为None时从发件箱认领
+        self.anime_data = anime_data  # 处理器直接传入的Anime数据，为None时从数据库查询
         self.tmdb_id = None  # 数据库中未发送数据的TMDBID用于获取Anime库中的数据
         self.id = None  # 数据库中未发送数据的ID,用于最后修改发送状态
         self.private_targets = getattr(PUSHTARGET, "PrivatePushTarget", {}).get(
@@ -22,10 +28,14 @@ class PushService:
             getattr(self.source, "value", ""), [])  # 群聊推送目标
         self.data_id = None  # 数据库中未发送数据的ID,用于最后修改发送状态
         self.subscribers = ({}, [])  # 订阅者
+        self.delivered: set[str] = set()  # 已送达的推送目标（group:/private:前缀），失败重试时跳过
 
     @classmethod
-    async def create_and_run(cls, source: DatabaseTables.TableName):
-        instance = cls(source)
+    async def create_and_run(cls,
+                             source: DatabaseTables.TableName,
+                             source_data: dict | None = None,
+                             anime_data: dict | None = None):
+        instance = cls(source, source_data, anime_data)
         await instance.process()
         return instance
 
@@ -33,19 +43,41 @@ class PushService:
     async def process(self):
         if not self.source or not isinstance(self.source, DatabaseTables.TableName):
             raise AppError.Exception(AppError.ParamNotFound, "未指定数据源或数据源类型错误")
-        # 检查是否有未发送的数据
-        try:
-            db_data = await self._search_unsent_data()
-            if isinstance(db_data, list) and len(db_data) == 0:  # 严格验证
+        # 获取待推送数据：优先使用处理器传入的（写入时已认领的）数据，否则从发件箱认领一条
+        if self.source_data is not None:
+            source_data = self.source_data
+        else:
+            try:
+                claimed = await OutboxService.claim(self.source, limit=1)
+                if not claimed:
+                    logger.opt(colors=True).info(
+                        f"<g>Pusher</g>：{self.source.value} 没有需要推送的数据,等待下一次推送")
+                    return
+                source_data = claimed[0]
                 logger.opt(colors=True).info(
-                    f"<g>Pusher</g>：{self.source.value} 没有需要推送的数据,等待下一次推送")
+                    f"<g>Pusher</g>：{self.source.value} 认领未发送数据 <g>成功</g>")
+            except Exception as e:
+                logger.opt(colors=True).error(
+                    f"<r>Pusher</r>：{e}")
                 return
-            source_data = await self._convert_first_db_row_to_dict(list(db_data), self.source)
+        self.delivered = OutboxService.delivered_targets(source_data)
+        if self.delivered:
             logger.opt(colors=True).info(
-                f"<g>Pusher</g>：{self.source.value} 获取未发送数据 <g>成功</g>")
+                f"<g>Pusher</g>：{self.source.value} 数据 {source_data.get('id')} "
+                f"跳过之前已送达的 {len(self.delivered)} 个推送目标")
+        # 推送，并根据结果更新发件箱状态
+        error = None
+        try:
+            if not await self._push_record(source_data):
+                error = "消息构建失败或部分推送目标发送失败"
         except Exception as e:
+            error = str(e)
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：{e}")
+        await self._finish_claim(source_data, error)
+        logger.opt(colors=True).info(f"<g>Pusher</g>：{self.tmdb_id} 推送服务 <g>结束</g> ")
+
+    async def _push_record(self, source_data: dict) -> bool:
         # 获取TMDB ID
         try:
             self.tmdb_id = self._get_tmdb_id(source_data)
@@ -53,7 +85,10 @@ class PushService:
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：{e}")
         # 通过TMDB ID获取Anime库中的数据
-        anime_data = await self._get_data_from_anime_db()
+        if self.anime_data is not None:
+            anime_data = self.anime_data
+        else:
+            anime_data = await self._get_data_from_anime_db()
         # 将获取到的数据汇总，筛选出推送数据
         picked_data, hybrid_image_queue, series_id = await self._data_pick(source_data, anime_data)
         # 对混合图片进行处理,获取图片数据
@@ -61,25 +96,11 @@ class PushService:
         # 将图片路径添加到推送数据中
         picked_data["image"] = img_path
         # 推送
-        await self._push(picked_data)
+        success = await self._push(picked_data)
         logger.opt(colors=True).info(
-            f"<g>Pusher</g>：源：{self.source.value}，TMDB ID：{self.tmdb_id}，消息推送 <g>完成</g>")
-        # 更新数据库
-        await self._modify_send_status()
-        logger.opt(colors=True).info(
-            "<g>Pusher</g>：数据库发送状态更新 <g>完成</g>")
-        logger.opt(colors=True).info(f"<g>Pusher</g>：{self.tmdb_id} 推送服务 <g>结束</g> ")
-        return
-
-    async def _search_unsent_data(self):
-        try:
-            return await DatabaseService.select_data(
-                table_name=self.source,
-                where={"send_status": 0},
-                order_by="id DESC",
-                limit=1)
-        except Exception as e:
-            raise e
+            f"<g>Pusher</g>：源：{self.source.value}，TMDB ID：{self.tmdb_id}，消息推送 "
+            f"{'<g>完成</g>' if success else '<r>失败</r>'}")
+        return success
 
     async def _convert_first_db_row_to_dict(self, data: list, source: DatabaseTables.TableName):
         if not data:
@@ -113,8 +134,8 @@ class PushService:
         if not self.tmdb_id:
             logger.opt(colors=True).warning(
                 f"<y>Pusher</y>：{self.source.value} 未配置TMDB ID")
-            return DatabaseTables.get_table_schema(
-                DatabaseTables.TableName.ANIME).copy()
+            return DatabaseTables.generate_default_schema(
+                DatabaseTables.TableName.ANIME)
         # 通过TMDB ID获取Anime库中的数据，没有则返回默认模板
         try:
             anime_db_data = await self._search_in_animedb_by_tmdbid()
@@ -128,8 +149,8 @@ class PushService:
         except Exception as e:
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：{e}")
-        return DatabaseTables.get_table_schema(
-            DatabaseTables.TableName.ANIME).copy()
+        return DatabaseTables.generate_default_schema(
+            DatabaseTables.TableName.ANIME)
 
     async def _search_in_animedb_by_tmdbid(self):
         try:
@@ -160,55 +181,85 @@ class PushService:
         }
         return picked_data, hybrid_image_queue, series_id
 
-    async def _push(self, picked_data):
+    async def _push(self, picked_data) -> bool:
         # 构造推送消息器
         try:
             builder = MessageBuilder(MessageTemplate().PushMessage.copy())
             builder.set_data(picked_data)
-            message_without_at = builder.build()
+            message_without_at = await builder.build()
         except Exception as e:
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：模板消息填充失败，{e}")
+            return False
         try:
             # 推送消息群组消息
-            await self._group_push(message_without_at)
+            failed = await self._group_push(message_without_at)
             # 推送消息私人消息
-            await self._private_push(message_without_at)
+            failed += await self._private_push(message_without_at)
         except Exception as e:
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：{e}")
+            return False
+        return not failed
 
-    async def _private_push(self, message):
+    async def _private_push(self, message) -> list:
         if not self.private_targets:
             logger.opt(colors=True).info(
                 f"<y>Pusher</y>：{self.source.value} 没有需要推送的个人")
-            return
+            return []
         private_subscribers = self.subscriber[1]  # 获取订阅者列表
         target = list(set(str(x) for x in private_subscribers)
                       & set(str(x) for x in self.private_targets))  # 获取交集
         if not target:
             logger.opt(colors=True).info(
                 f"<y>Pusher</y>：{self.source.value} 没有用户订阅{self.tmdb_id}并启用私聊推送")
-            return
-        await private_msg_pusher(message, target)
+            return []
+        target = [user for user in target if f"private:{user}" not in self.delivered]  # 跳过之前已送达的用户
+        if not target:
+            return []
+        failed = await private_msg_pusher(message, target)
+        self.delivered.update(f"private:{user}" for user in target if user not in failed)
+        return failed
 
-    async def _group_push(self, message):
+    async def _group_push(self, message) -> list:
         if not self.group_targets:
             logger.opt(colors=True).info(
                 f"<y>Pusher</y>：{self.source.value} 没有需要推送的群组")
-            return
+            return []
         group_subscribers = self.subscriber[0]  # 获取订阅者列表
+        failed = []
         for group in self.group_targets:
+            if f"group:{group}" in self.delivered:
+                continue  # 之前的推送已送达
             subscribers = group_subscribers.get(group, [])
             message = MessageBuilder.append_at(message, subscribers)
-            await group_msg_pusher(message, [group])
+            group_failed = await group_msg_pusher(message, [group])
+            if not group_failed:
+                self.delivered.add(f"group:{group}")
+            failed += group_failed
+        return failed
 
-    async def _modify_send_status(self):
+    async def _finish_claim(self, source_data: dict, error: str | None) -> None:
         try:
-            await DatabaseService.update_data(
-                table_name=self.source,
-                where={"id": self.data_id},
-                update_columns={"send_status": 1})
+            if error is None:
+                if await OutboxService.complete(self.source, source_data, self.delivered):
+                    logger.opt(colors=True).info(
+                        "<g>Pusher</g>：数据库发送状态更新 <g>完成</g>")
+                else:
+                    logger.opt(colors=True).warning(
+                        f"<y>Pusher</y>：{self.source.value} 数据 {source_data.get('id')} 认领已过期，发送状态未更新")
+                return
+            # 记录已送达的目标，重试时只推送失败的目标
+            status = await OutboxService.fail(self.source, source_data, error, self.delivered)
+            if status is None:
+                logger.opt(colors=True).warning(
+                    f"<y>Pusher</y>：{self.source.value} 数据 {source_data.get('id')} 认领已过期，发送状态未更新")
+            elif status == DatabaseTables.SendStatus.DEAD:
+                logger.opt(colors=True).error(
+                    f"<r>Pusher</r>：{self.source.value} 数据 {source_data.get('id')} 超过最大重试次数，放弃推送")
+            else:
+                logger.opt(colors=True).warning(
+                    f"<y>Pusher</y>：{self.source.value} 数据 {source_data.get('id')} 推送失败，等待重试")
         except Exception as e:
             logger.opt(colors=True).error(
                 f"<r>Pusher</r>：{e}")
@@ -0,0 +1,374 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import quote
+
+from nonebot import logger
+
+from ...config import APPCONFIG, WORKDIR
+from ...database import DatabaseService, DatabaseTables
+from ...exceptions import AppError
+from ...external import sniff_image_format
+from ...utils import BlockingIO
+
+
+class ImageCache:
+    """
+    图片缓存管理
+    图片按内容寻址保存为 cache_dir/images/{sha256}.{format}，内容相同的图片只保存一份（也只编码一次）；
+    索引记录 key → 图片文件及格式、大小、修改时间、最近访问时间与条件请求校验信息（衍生图的key为 {原图key}.{规格}），
+    在内存中按最近访问排序，并持久化到IMAGE_CACHE表
+    实际占用超过 APPCONFIG.image_cache_size 后按最近最少使用淘汰，图片文件在不再被任何key引用时删除
+    配置 APPCONFIG.image_base_url 且图片路由挂载成功后，缓存图片可通过 ROUTE 以链接访问
+    """
+    DIR_NAME = "images"
+    ROUTE = "/anipusher/images"  # 只读图片路由
+    BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.\w+$")  # 内容寻址的文件名
+    SIDECAR_NAME = re.compile(r"^[^.]+\.(png|jpg|gif|bmp|webp)\.json$")  # 旧版本的图片校验信息文件
+    route_mounted = False  # 图片路由是否已挂载
+    _index: "OrderedDict[str, dict]" = OrderedDict()  # key → 索引数据，按最近访问从旧到新排列
+    _refs: dict[str, int] = {}  # 图片文件名 → 引用该文件的key数量
+    _lock = asyncio.Lock()  # 串行化文件的写入与删除，避免删除正被新key引用的文件
+    _created_dir: Path | None = None  # 已创建的缓存目录，避免每次访问都调用mkdir
+    _total_bytes = 0  # 实际占用，每个文件只计一次
+    _logical_bytes = 0  # 所有key引用的图片大小之和
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+
+    @classmethod
+    def cache_dir(cls) -> Path:
+        """图片缓存目录，通常已由load()创建，仅在尚未创建时同步创建一次"""
+        if not WORKDIR.cache_dir:
+            raise AppError.Exception(AppError.MissingData, "项目缓存目录缺失！")
+        path = WORKDIR.cache_dir / cls.DIR_NAME
+        if cls._created_dir != path:
+            path.mkdir(parents=True, exist_ok=True)
+            cls._created_dir = path
+        return path
+
+    @classmethod
+    async def lookup(cls, key: str) -> dict | None:
+        """
+        查询缓存图片并记录访问
+        Returns:
+            索引数据（含path），未命中时返回None
+        """
+        entry = cls._index.get(key)
+        if entry is not None and not await BlockingIO.run((cls.cache_dir() / entry["path"]).is_file):
+            await cls._forget(key)  # 文件已被外部删除
+            entry = None
+        if entry is None:
+            cls._misses += 1
+            return None
+        cls._hits += 1
+        entry["last_access"] = time.time()
+        cls._index.move_to_end(key)
+        await cls._persist(key)
+        return {**entry, "path": cls.cache_dir() / entry["path"]}
+
+    @classmethod
+    async def store(cls, key: str, temp_path: Path, meta: dict) -> Path:
+        """
+        将下载完成的临时文件按内容摘要移入缓存并更新索引，随后按容量淘汰
+        已有相同内容的文件时直接复用，丢弃临时文件
+        Args:
+            key: 缓存键
+            temp_path: 临时文件
+            meta: 下载信息，至少包含format，可包含sha256/url/source/etag/last_modified
+        Returns:
+            缓存文件路径
+        """
+        image_format = meta.get("format") or "jpg"
+        async with cls._lock:
+            digest = meta.get("sha256") or await BlockingIO.run(cls._hash_file, temp_path)
+            blob_path = cls.cache_dir() / f"{digest}.{image_format}"
+            stat = await BlockingIO.run(cls._commit_blob, temp_path, blob_path)
+            previous = cls._index.get(key)
+            changed = previous is None or previous["path"] != blob_path.name
+            orphan = cls._put(key, {
+                "path": blob_path.name,
+                "format": image_format,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "last_access": time.time(),
+                "url": meta.get("url"),
+                "source": meta.get("source"),
+                "etag": meta.get("etag"),
+                "last_modified": meta.get("last_modified"),
+            })
+            if orphan is not None and orphan != blob_path.name:
+                await BlockingIO.run((cls.cache_dir() / orphan).unlink, missing_ok=True)
+        await cls._persist(key)
+        if changed:
+            await cls._drop_variants(key)  # 内容变化后衍生图失效
+        await cls._evict(keep=key)
+        return blob_path
+
+    @classmethod
+    async def touch(cls, key: str) -> None:
+        """刷新缓存图片的修改时间（条件请求返回304时使用）"""
+        entry = cls._index.get(key)
+        if entry is None:
+            return
+        img_path = cls.cache_dir() / entry["path"]
+        entry["mtime"] = (await BlockingIO.run(cls._touch_file, img_path)).st_mtime
+        await cls._persist(key)
+
+    @classmethod
+    async def load(cls) -> int:
+        """
+        从数据库载入索引，并与缓存目录中的实际文件对齐：
+        丢弃文件已不存在的索引，旧版本按key命名的图片转存为内容寻址文件，删除未被引用的文件
+        Returns:
+            索引条目数
+        """
+        if not WORKDIR.cache_dir:
+            raise AppError.Exception(AppError.MissingData, "项目缓存目录缺失！")
+        directory = WORKDIR.cache_dir / cls.DIR_NAME
+        await BlockingIO.run(directory.mkdir, parents=True, exist_ok=True)
+        cls._created_dir = directory
+        await BlockingIO.run(cls._migrate_legacy_files, directory)
+        rows = await DatabaseService.select_data(
+            table_name=DatabaseTables.TableName.IMAGE_CACHE,
+            order_by="last_access ASC")
+        cls._index.clear()
+        cls._refs.clear()
+        cls._total_bytes = cls._logical_bytes = 0
+        existing = await BlockingIO.run(cls._list_files, directory)
+        for row in rows:
+            entry = DatabaseTables.row_to_dict(DatabaseTables.TableName.IMAGE_CACHE, tuple(row))
+            key = str(entry.pop("cache_key"))
+            path = directory / str(entry["path"])
+            if path.name not in existing:
+                await cls._delete_row(key)
+                continue
+            migrated = not cls.BLOB_NAME.match(path.name)
+            if migrated:
+                entry.update(await BlockingIO.run(cls._adopt_file, path, str(entry["format"])))
+                existing.discard(path.name)
+            cls._put(key, entry)
+            if migrated:
+                await cls._persist(key)
+        # 未被索引引用的文件：旧版本按key命名的图片（旧版本无论实际格式均以.png保存）按文件头识别的格式转存，其余删除
+        orphans = await BlockingIO.run(cls._collect_orphans, directory, existing - set(cls._refs))
+        for file, image_format, mtime in orphans:
+            key = file.name.split(".", 1)[0]
+            cls._put(key, {
+                "format": image_format, "last_access": mtime,
+                "url": None, "source": None, "etag": None, "last_modified": None,
+                **await BlockingIO.run(cls._adopt_file, file, image_format),
+            }, oldest=True)
+            await cls._persist(key)
+        await cls._evict()
+        return len(cls._index)
+
+    @classmethod
+    def public_url(cls, img_path: str | Path) -> str | None:
+        """
+        获取缓存图片的访问链接
+        Args:
+            img_path: 图片路径
+        Returns:
+            图片链接，未启用图片路由或图片不在缓存目录中时返回None
+        """
+        if not cls.route_mounted or not APPCONFIG.image_base_url:
+            return None
+        path = Path(img_path)
+        if path.parent != cls.cache_dir():
+            return None  # 默认图片等缓存目录以外的文件
+        try:
+            mtime = int(path.stat().st_mtime)
+        except OSError:
+            return None
+        # 附带修改时间，图片刷新后链接随之变化，避免OneBot实现使用旧的缓存
+        return f"{APPCONFIG.image_base_url}{cls.ROUTE}/{quote(path.name)}?v={mtime}"
+
+    @classmethod
+    def stats(cls) -> dict:
+        """缓存容量、去重与命中统计"""
+        return {
+            "entries": len(cls._index),
+            "blobs": len(cls._refs),
+            "bytes": cls._total_bytes,
+            "logical_bytes": cls._logical_bytes,
+            "dedup_ratio": round(cls._logical_bytes / cls._total_bytes, 2) if cls._total_bytes else 1.0,
+            "budget_bytes": cls._budget(),
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "evictions": cls._evictions,
+            "route_mounted": cls.route_mounted,
+        }
+
+    @staticmethod
+    def _budget() -> int:
+        return max(0, APPCONFIG.image_cache_size) * 1024 * 1024
+
+    @classmethod
+    def _migrate_legacy_files(cls, directory: Path) -> None:
+        """
+        旧版本直接保存在缓存根目录的图片移入图片目录，并按文件头识别的实际格式修正扩展名；
+        清理根目录中残留的临时文件及旧版本的图片校验信息文件（<图片名>.json）（在线程池中执行）
+        """
+        if not WORKDIR.cache_dir:
+            return
+        for file in WORKDIR.cache_dir.iterdir():
+            if not file.is_file():
+                continue
+            if file.suffix in (".png", ".jpg"):
+                image_format = cls._sniff(file)
+                if image_format is None:
+                    file.unlink(missing_ok=True)  # 写入不完整等无效文件
+                else:
+                    shutil.move(file, directory / f"{file.stem}.{image_format}")
+            elif file.suffix == ".tmp" or cls.SIDECAR_NAME.match(file.name):
+                file.unlink(missing_ok=True)
+
+    @staticmethod
+    def _list_files(directory: Path) -> set[str]:
+        return {file.name for file in directory.iterdir() if file.is_file()}
+
+    @classmethod
+    def _collect_orphans(cls, directory: Path, names: set[str]) -> list[tuple[Path, str, float]]:
+        """
+        检查未被引用的文件（在线程池中执行）
+        Returns:
+            可转存的旧版本图片 (路径, 图片格式, 修改时间)，由新到旧排列（逐个插入索引最旧端后，最旧的位于最前）；
+            临时文件、无效文件及未被引用的内容寻址文件直接删除
+        """
+        adoptable = []
+        for name in names:
+            file = directory / name
+            skip = cls.BLOB_NAME.match(name) or file.suffix == ".tmp"
+            image_format = None if skip else cls._sniff(file)
+            if image_format is None:
+                file.unlink(missing_ok=True)  # 残留的临时文件、无效文件或未被引用的文件
+                continue
+            adoptable.append((file, image_format, file.stat().st_mtime))
+        return sorted(adoptable, key=lambda item: item[2], reverse=True)
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _commit_blob(temp_path: Path, blob_path: Path) -> os.stat_result:
+        """将临时文件移入内容寻址文件，已存在时丢弃临时文件并刷新修改时间（在线程池中执行）"""
+        if blob_path.is_file():
+            temp_path.unlink(missing_ok=True)
+            blob_path.touch()
+        else:
+            shutil.move(temp_path, blob_path)
+        return blob_path.stat()
+
+    @classmethod
+    def _adopt_file(cls, path: Path, image_format: str) -> dict:
+        """将旧版本按key命名的图片转存为内容寻址文件，保留修改时间（在线程池中执行）"""
+        blob_path = path.with_name(f"{cls._hash_file(path)}.{image_format}")
+        if blob_path.is_file():
+            path.unlink()
+        else:
+            path.rename(blob_path)
+        stat = blob_path.stat()
+        return {"path": blob_path.name, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    @staticmethod
+    def _touch_file(img_path: Path) -> os.stat_result:
+        img_path.touch()
+        return img_path.stat()
+
+    @staticmethod
+    def _sniff(file: Path) -> str | None:
+        try:
+            with file.open("rb") as f:
+                return sniff_image_format(f.read(12))
+        except OSError:
+            return None
+
+    @classmethod
+    def _put(cls, key: str, entry: dict, oldest: bool = False) -> str | None:
+        """
+        写入索引并更新引用计数
+        Returns:
+            替换后不再被任何key引用的旧文件名
+        """
+        old = cls._index.pop(key, None)
+        orphan = old["path"] if old is not None and cls._unref(old) else None
+        cls._index[key] = entry
+        if oldest:
+            cls._index.move_to_end(key, last=False)
+        size = int(entry["size"] or 0)
+        cls._logical_bytes += size
+        cls._refs[entry["path"]] = cls._refs.get(entry["path"], 0) + 1
+        if cls._refs[entry["path"]] == 1:
+            cls._total_bytes += size
+        return orphan
+
+    @classmethod
+    def _unref(cls, entry: dict) -> bool:
+        """减少文件引用计数，返回文件是否已不再被引用"""
+        size = int(entry["size"] or 0)
+        cls._logical_bytes -= size
+        refs = cls._refs.get(entry["path"], 0) - 1
+        if refs > 0:
+            cls._refs[entry["path"]] = refs
+            return False
+        cls._refs.pop(entry["path"], None)
+        cls._total_bytes -= size
+        return True
+
+    @classmethod
+    async def _forget(cls, key: str) -> None:
+        """移除索引，文件不再被引用时一并删除"""
+        async with cls._lock:
+            entry = cls._index.pop(key, None)
+            if entry is not None and cls._unref(entry):
+                await BlockingIO.run((cls.cache_dir() / entry["path"]).unlink, missing_ok=True)
+        await cls._delete_row(key)
+
+    @classmethod
+    async def _drop_variants(cls, key: str) -> None:
+        """原图内容变化后删除其衍生图（键为 {key}.{规格}）"""
+        for variant in [k for k in cls._index if k.startswith(f"{key}.")]:
+            await cls._forget(variant)
+
+    @classmethod
+    async def _evict(cls, keep: str | None = None) -> None:
+        """淘汰最近最少使用的图片直到总大小不超过预算"""
+        budget = cls._budget()
+        for key in list(cls._index):
+            if cls._total_bytes <= budget:
+                break
+            if key == keep or key not in cls._index:  # 等待期间可能已被其他调用移除
+                continue
+            await cls._forget(key)
+            cls._evictions += 1
+            logger.opt(colors=True).info(f"<g>Pusher</g>：图片缓存超出容量，淘汰 {key}")
+
+    @classmethod
+    async def _persist(cls, key: str) -> None:
+        try:
+            # 写入完整数据行，清空的校验信息（etag等）须写为NULL，否则重启后旧值会附加到新的图片地址上
+            await DatabaseService.upsert_row(
+                DatabaseTables.TableName.IMAGE_CACHE,
+                {"cache_key": key, **cls._index[key]},
+                conflict_columns=["cache_key"])
+        except Exception as e:
+            logger.opt(colors=True).warning(f"<y>Pusher</y>：写入图片缓存索引失败：{e}")
+
+    @classmethod
+    async def _delete_row(cls, key: str) -> None:
+        try:
+            await DatabaseService.delete_data(
+                DatabaseTables.TableName.IMAGE_CACHE, {"cache_key": key})
+        except Exception as e:
+            logger.opt(colors=True).warning(f"<y>Pusher</y>：删除图片缓存索引失败：{e}")
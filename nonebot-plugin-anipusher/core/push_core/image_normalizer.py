@@ -0,0 +1,102 @@
+import uuid
+from pathlib import Path
+
+from nonebot import logger
+
+from ...config import APPCONFIG
+from ...utils import BlockingIO
+from .image_cache import ImageCache
+
+try:  # Pillow为可选依赖，未安装时跳过图片规格化
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class ImageNormalizer:
+    """
+    图片规格化
+    将缓存中的原图缩放至最长边不超过 APPCONFIG.image_max_edge，并按 APPCONFIG.image_quality 重新编码为
+    APPCONFIG.image_format，生成的衍生图以 {key}.{规格} 为键保存在原图旁，原图更新时随之失效
+    解码与编码在线程池中执行；未安装Pillow或image_max_edge为0时直接使用原图
+    """
+    FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}  # 配置值 → (Pillow格式, 扩展名)
+    _passthrough: dict[str, float] = {}  # 无需衍生图的规格键 → 判定时原图的修改时间
+    _warned = False
+
+    @classmethod
+    def enabled(cls) -> bool:
+        if APPCONFIG.image_max_edge <= 0:
+            return False
+        if Image is None:
+            if not cls._warned:
+                cls._warned = True
+                logger.opt(colors=True).warning(
+                    "<y>Pusher</y>：未安装Pillow，图片规格化 <y>已跳过</y>")
+            return False
+        return True
+
+    @classmethod
+    async def apply(cls, img_path: Path | None, key: str) -> Path | None:
+        """
+        获取图片的规格化版本
+        Args:
+            img_path: 缓存中的原图路径
+            key: 原图的缓存键
+        Returns:
+            衍生图路径，未启用、无需处理或处理失败时返回原图路径
+        """
+        if img_path is None or not cls.enabled():
+            return img_path
+        try:
+            if img_path.parent != ImageCache.cache_dir():
+                return img_path  # 默认图片等缓存目录以外的文件
+            pil_format, extension = cls.FORMATS.get(APPCONFIG.image_format.lower(), cls.FORMATS["jpeg"])
+            variant_key = f"{key}.{APPCONFIG.image_max_edge}q{APPCONFIG.image_quality}-{extension}"
+            source_mtime = (await BlockingIO.run(img_path.stat)).st_mtime
+            if cls._passthrough.get(variant_key) == source_mtime:
+                return img_path
+            if entry := await ImageCache.lookup(variant_key):
+                return entry["path"]
+            temp_path = ImageCache.cache_dir() / f"{variant_key}.{uuid.uuid4().hex}.tmp"
+            rendered = await BlockingIO.run(
+                cls._render, img_path, temp_path, pil_format,
+                APPCONFIG.image_max_edge, APPCONFIG.image_quality)
+            if not rendered:
+                cls._passthrough[variant_key] = source_mtime
+                return img_path
+            variant_path = await ImageCache.store(variant_key, temp_path, {"format": extension})
+            logger.opt(colors=True).info(
+                f"<g>Pusher</g>：图片规格化 <g>完成</g>，{rendered[0]} → {rendered[1]} 字节")
+            return variant_path
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>Pusher</y>：图片规格化失败，使用原图，错误信息：{e}")
+            return img_path
+
+    @staticmethod
+    def _render(source: Path, dest: Path, pil_format: str, max_edge: int, quality: int) -> tuple[int, int] | None:
+        """
+        缩放并重新编码图片（在线程池中执行）
+        Returns:
+            (原图字节数, 衍生图字节数)，动图或处理后体积未减小时返回None
+        """
+        try:
+            with Image.open(source) as im:
+                if getattr(im, "is_animated", False):
+                    return None  # 保留动图
+                im.draft("RGB", (max_edge, max_edge))  # JPEG解码时直接按比例降采样
+                im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                if pil_format == "JPEG" and im.mode != "RGB":
+                    rgba = im.convert("RGBA")
+                    im = Image.new("RGB", rgba.size, (255, 255, 255))
+                    im.paste(rgba, mask=rgba.getchannel("A"))  # 透明背景填充为白色
+                im.save(dest, pil_format, quality=quality, optimize=True)
+            original, derived = source.stat().st_size, dest.stat().st_size
+            if derived >= original:
+                dest.unlink(missing_ok=True)
+                return None
+            return original, derived
+        except Exception:
+            dest.unlink(missing_ok=True)
+            raise
@@ -1,30 +1,106 @@
 import asyncio
-import shutil
+import hashlib
+import uuid
 from pathlib import Path
 from typing import Literal
+
 from nonebot import logger
 
-from ...config import WORKDIR, APPCONFIG, FUNCTION
-from ...utils import CommonUtils, EmbyUtils
+from ...config import APPCONFIG, FUNCTION, WORKDIR
 from ...exceptions import AppError
-from ...external import get_request
+from ...external import download_image
+from ...utils import CommonUtils, EmbyUtils, SingleFlight
+from .image_cache import ImageCache
+from .image_normalizer import ImageNormalizer
 
 
 class ImageProcessor:
+    _single_flight = SingleFlight()  # 同一缓存键的并发获取共享一次下载
+    _prefetch_tasks: set[asyncio.Task] = set()  # 进行中的预取任务，保留引用避免被回收
+    _prefetched = 0  # 累计发起的预取次数
+
     def __init__(self, image_queue: list, emby_series_id: str | None = None, tmdb_id: str | None = None) -> None:
         self.image_queue = image_queue
         self.emby_series_id = emby_series_id
         self.tmdb_id = tmdb_id
         self.is_image_expired = False  # 图片是否过期
         self.output_img = None  # 最终图片输出路径
+        self.cache_entry: dict | None = None  # 本地缓存索引数据
+        self.cache_key = str(tmdb_id) if tmdb_id else None  # 原图的缓存键，没有tmdb_id时在下载后确定
 
     async def process(self) -> Path | None:
+        """获取图片，同一tmdb_id的并发调用共享同一次获取结果"""
+        if not self.tmdb_id:
+            return await self._acquire_normalized()
+        return await ImageProcessor._single_flight.do(str(self.tmdb_id), self._acquire_normalized)
+
+    async def _acquire_normalized(self) -> Path | None:
+        """获取图片并按配置规格化"""
+        img_path = await self._acquire()
+        if self.cache_key is None:
+            return img_path  # 未写入缓存（如默认图片）
+        return await ImageNormalizer.apply(img_path, self.cache_key)
+
+    @classmethod
+    def prefetch(cls, image_queue: list, emby_series_id: str | None = None, tmdb_id: str | None = None) -> None:
+        """
+        在后台预取图片至缓存，不等待结果
+        推送时对同一tmdb_id的获取会加入进行中的预取，或直接命中已预热的缓存
+        Args:
+            image_queue: 图片队列（url或emby的tag）
+            emby_series_id: Emby的series_id
+            tmdb_id: 缓存键
+        """
+        if not tmdb_id or not image_queue:
+            return
+        cls._prefetched += 1
+        task = asyncio.create_task(
+            cls(image_queue, emby_series_id, tmdb_id).process(),
+            name=f"anipusher_prefetch_{tmdb_id}")
+        cls._prefetch_tasks.add(task)
+        task.add_done_callback(cls._on_prefetch_done)
+
+    @classmethod
+    async def stop_prefetch(cls) -> None:
+        """取消所有进行中的预取任务"""
+        tasks = list(cls._prefetch_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    def _on_prefetch_done(cls, task: asyncio.Task) -> None:
+        cls._prefetch_tasks.discard(task)
+        if task.cancelled():
+            return
+        if e := task.exception():
+            logger.opt(colors=True).warning(
+                f"<y>Pusher</y>：图片预取失败，错误信息：{e}")
+
+    @staticmethod
+    def stats() -> dict:
+        """图片获取合并与预取统计"""
+        return {
+            **ImageProcessor._single_flight.stats(),
+            "prefetched": ImageProcessor._prefetched,
+            "prefetching": len(ImageProcessor._prefetch_tasks),
+        }
+
+    @staticmethod
+    def _temp_path(directory: Path, key: str) -> Path:
+        """生成唯一的临时文件路径，避免并发写入同一文件"""
+        return directory / f"{key}.{uuid.uuid4().hex}.tmp"
+
+    async def _acquire(self) -> Path | None:
         # 先搜索本地存储
-        self.output_img = self._search_in_localstore()  # 如果有且未过期，则设置output_img并返回，否则继续
+        self.output_img = await self._search_in_localstore()  # 如果有且未过期，则设置output_img并返回，否则继续
         if self.output_img:
             if self.is_image_expired:
                 logger.opt(colors=True).info(
                     '<y>Pusher</y>：发现可用的本地图片，但图片已过期，尝试重新获取')
+                # 先用保存的校验信息向原地址确认图片是否变化
+                if await self._revalidate_local_image():
+                    return self.output_img
             else:
                 logger.opt(colors=True).info(
                     '<g>Pusher</g>：发现可用的本地图片，使用本地图片')
@@ -48,9 +124,9 @@ class ImageProcessor:
                 return self.output_img
             logger.opt(colors=True).info('<y>Pusher</y>：没有获取到可用图片，使用默认图片')
             return self._default_image()
-        # 如果清洗后还有图片，则尝试下载图片，返回首个可用的图片的二进制
-        image_data = await self._download_first_valid_image(cleaned_urls)
-        if not image_data:
+        # 如果清洗后还有图片，则尝试下载图片，返回首个可用的图片的临时文件
+        downloaded = await self._download_first_valid_image(cleaned_urls)
+        if not downloaded:
             if self.output_img:
                 logger.opt(colors=True).info(
                     '<y>Pusher</y>：获取新图片失败，回退使用超期图片')
@@ -58,7 +134,7 @@ class ImageProcessor:
             logger.opt(colors=True).info('<y>Pusher</y>：没有获取到可用图片，使用默认图片')
             return self._default_image()
         # 如果成功获取到图片，则保存到本地，返回保存路径
-        img_path = await self._save_bytes_to_cache(image_data)
+        img_path = await self._save_file_to_cache(*downloaded)
         if img_path:
             self.output_img = img_path
             logger.opt(colors=True).info('<g>Pusher</g>：刷新图片缓存 <g>完成</g>')
@@ -71,19 +147,17 @@ class ImageProcessor:
             logger.opt(colors=True).info('<y>Pusher</y>：没有获取到可用图片，使用默认图片')
             return self._default_image()
 
-    # 在本地存储中查找图片，如果找不到，则返回None，等待后续处理
-    def _search_in_localstore(self) -> None | Path:
+    # 在本地缓存中查找图片，如果找不到，则返回None，等待后续处理
+    async def _search_in_localstore(self) -> None | Path:
         try:
             if not self.tmdb_id:
                 raise AppError.Exception(
                     AppError.MissingData, "项目TMDB ID缺失！")
-            if not WORKDIR.cache_dir:
-                raise AppError.Exception(AppError.MissingData, "项目缓存目录缺失！")
-            local_img_path = WORKDIR.cache_dir / f"{self.tmdb_id}.jpg"
-            # 如果本地存在图片，且未过期，则直接返回base64编码
-            if not local_img_path.exists():
+            self.cache_entry = await ImageCache.lookup(str(self.tmdb_id))
+            if not self.cache_entry:
                 return None
-            # 如果图片未过期，则直接返回base64编码
+            local_img_path = self.cache_entry["path"]
+            # 判断图片是否过期
             if CommonUtils.is_cache_img_expired(local_img_path):
                 self.is_image_expired = True
             return local_img_path
@@ -92,6 +166,38 @@ class ImageProcessor:
                 f"<y>Pusher</y>：获取本地图片失败，错误信息：{e}")
             return None
 
+    # 使用缓存索引中的校验信息发送条件请求，图片未变化（304）时仅刷新缓存时间
+    async def _revalidate_local_image(self) -> bool:
+        meta = self.cache_entry
+        if not self.output_img or not meta:
+            return False
+        if not meta.get("url") or not (meta.get("etag") or meta.get("last_modified")):
+            return False
+        source = meta.get("source") or "ANI_RSS"
+        if source == "EMBY" and not FUNCTION.emby_enabled:
+            return False
+        headers, proxy = self._request_options(source)
+        temp_path = self._temp_path(ImageCache.cache_dir(), str(self.tmdb_id))
+        try:
+            result = await download_image(
+                meta["url"], temp_path, headers=headers, proxy=proxy, validators=meta)
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>Pusher</y>：图片条件请求失败，错误信息：{e}")
+            return False
+        if result is None:
+            await ImageCache.touch(str(self.tmdb_id))  # 仅刷新修改时间
+            logger.opt(colors=True).info(
+                '<g>Pusher</g>：图片未变化（304），刷新缓存时间')
+            return True
+        img_path = await self._save_file_to_cache(
+            temp_path, {"url": meta["url"], "source": source, **result})
+        if not img_path:
+            return False
+        self.output_img = img_path
+        logger.opt(colors=True).info('<g>Pusher</g>：图片已变化，刷新图片缓存 <g>完成</g>')
+        return True
+
     # 获取默认图片
     def _default_image(self) -> Path | None:
         try:
@@ -128,73 +234,113 @@ class ImageProcessor:
                         f"<y>Pusher</y>：获取emby图片失败，错误信息：{e}")
         return url_dict
 
-    async def _download_first_valid_image(self, url_dict: dict):
-        tasks = []  # 初始化任务列表
-        errors = []  # 初始化错误列表
-        binary = None  # 初始化结果
-        for url, source in url_dict.items():
-            try:
-                if source == "ANI_RSS":
-                    headers = {
-                        "User-Agent": "AriadusTTT/nonebot_plugin_AniPush/1.0.0 (Python)"}
-                    proxy = None
-                elif source == "EMBY":
-                    headers = {
-                        "X-Emby-Token": APPCONFIG.emby_key,
-                        "User-Agent": "AriadusTTT/nonebot_plugin_AniPush/1.0.0 (Python)"
-                    }
-                    proxy = APPCONFIG.proxy
-                task = asyncio.create_task(
-                    get_request(url, headers=headers, proxy=proxy, is_binary=True))
-                tasks.append(task)
-            except Exception as e:
-                logger.opt(colors=True).warning(
-                    f"<y>Pusher</y>：{url}下载任务创建失败，错误信息：{e}")
-                continue
-        if not tasks:  # 如果没有创建任何任务
+    async def _download_first_valid_image(self, url_dict: dict) -> tuple[Path, dict] | None:
+        """
+        按优先级对冲下载图片
+        url_dict按优先级从高到低排列，先下载优先级最高的地址，
+        超过对冲延迟（APPCONFIG.image_hedge_delay）仍未完成或下载失败时再启动下一个地址；
+        有下载成功后不再启动新的下载，并在没有更高优先级的下载进行中时返回优先级最高的成功结果
+        Returns:
+            (临时文件路径, 下载信息)，全部失败时返回None
+        """
+        try:
+            cache_dir = ImageCache.cache_dir()
+        except Exception as e:
+            logger.opt(colors=True).warning(
+                f"<y>Pusher</y>：{e}")
             return None
-        # 使用as_completed迭代处理
-        for task in asyncio.as_completed(tasks):
-            try:
-                binary = await task
-                for t in tasks:
-                    if not t.done():
-                        t.cancel()
-                        try:
-                            await t  # 等待取消完成
-                        except (asyncio.CancelledError, Exception):
-                            pass  # 预期中的异常，无需处理
-                return binary  # 返回第一个成功的结果的二进制数据
-            except Exception as e:
-                errors.append(e)
+        candidates = list(url_dict.items())
+        if not candidates:
+            return None
+        running: dict[asyncio.Task, int] = {}  # 下载任务 → 优先级（下标越小优先级越高）
+        results: dict[int, tuple[Path, dict]] = {}  # 优先级 → 下载结果
+        errors = []  # 初始化错误列表
+        next_index = 0
+
+        def launch_next() -> None:
+            nonlocal next_index
+            url, source = candidates[next_index]
+            # 每个下载流式写入各自的临时文件，避免在内存中保留完整图片
+            temp_path = self._temp_path(cache_dir, str(self.tmdb_id or "download"))
+            task = asyncio.create_task(self._download_to(url, source, temp_path))
+            running[task] = next_index
+            next_index += 1
+
+        launch_next()
+        try:
+            while running:
+                can_launch = not results and next_index < len(candidates)
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=APPCONFIG.image_hedge_delay if can_launch else None,
+                    return_when=asyncio.FIRST_COMPLETED)
+                if not done:  # 超过对冲延迟，启动下一个地址
+                    logger.opt(colors=True).debug(
+                        f"Pusher：图片下载超过 {APPCONFIG.image_hedge_delay} 秒未完成，启动对冲下载")
+                    launch_next()
+                    continue
+                for task in done:
+                    priority = running.pop(task)
+                    try:
+                        results[priority] = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        if not results and next_index < len(candidates):
+                            launch_next()  # 下载失败，立即尝试下一个地址
+                if results:
+                    best = min(results)
+                    if all(priority > best for priority in running.values()):
+                        for priority, (temp_path, _) in results.items():
+                            if priority != best:
+                                temp_path.unlink(missing_ok=True)  # 未被采用的下载
+                        return results[best]
+        finally:
+            for task in running:
+                task.cancel()  # 未完成的临时文件由下载函数删除
+            await asyncio.gather(*running, return_exceptions=True)
         logger.opt(colors=True).warning(
             f"<y>Pusher</y>：图片下载全部失败，错误信息：{errors}")
         return None
 
-    async def _save_bytes_to_cache(self, binary: bytes) -> Path | Literal[False]:
-        if not WORKDIR.cache_dir:
-            logger.opt(colors=True).warning(
-                "<y>Pusher</y>：缓存目录缺失！")
-            return False
-        WORKDIR.cache_dir.mkdir(parents=True, exist_ok=True)
-        img_path = WORKDIR.cache_dir / f"{self.tmdb_id}.png"
-        try:
-            temp_path = img_path.with_suffix('.tmp')
-            temp_path.write_bytes(binary)
-        except Exception as e:
-            logger.opt(colors=True).warning(
-                f"<y>Pusher</y>：图片写入失败，错误信息：{e}")
-            return False
+    # 不同图片来源的请求头与代理
+    @staticmethod
+    def _request_options(source: str) -> tuple[dict, str | None]:
+        if source == "EMBY":
+            headers = {
+                "X-Emby-Token": APPCONFIG.emby_key,
+                "User-Agent": "AriadusTTT/nonebot_plugin_AniPush/1.0.0 (Python)"
+            }
+            return headers, APPCONFIG.proxy
+        headers = {
+            "User-Agent": "AriadusTTT/nonebot_plugin_AniPush/1.0.0 (Python)"}
+        return headers, None
+
+    @classmethod
+    async def _download_to(cls, url: str, source: str, temp_path: Path) -> tuple[Path, dict]:
+        headers, proxy = cls._request_options(source)
+        result = await download_image(url, temp_path, headers=headers, proxy=proxy)
+        if result is None:  # 未发送条件请求，不应出现304
+            raise AppError.Exception(AppError.RequestInvalidResponse, "意外的304响应")
+        return temp_path, {"url": url, "source": source, **result}
+
+    def _cache_key(self, meta: dict) -> str:
+        """缓存键：tmdb_id，缺失时使用图片来源地址的摘要，避免不同番剧共用同一缓存条目"""
+        if self.tmdb_id:
+            return str(self.tmdb_id)
+        return f"url-{hashlib.sha256(str(meta.get('url')).encode()).hexdigest()[:32]}"
+
+    async def _save_file_to_cache(self, temp_path: Path, meta: dict) -> Path | Literal[False]:
         try:
-            shutil.move(temp_path, img_path)
+            key = self._cache_key(meta)
+            img_path = await ImageCache.store(key, temp_path, meta)
+            self.cache_key = key
+            return img_path
         except Exception as e:
             logger.opt(colors=True).warning(
-                f"<y>Pusher</y>：图片替换失败，错误信息：{e}")
-            if temp_path.exists():
-                try:
-                    temp_path.unlink()
-                except Exception as e:
-                    logger.opt(colors=True).warning(
-                        f"<y>Pusher</y>：临时图片删除失败，错误信息：{e}")
+                f"<y>Pusher</y>：图片写入缓存失败，错误信息：{e}")
+            try:
+                temp_path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.opt(colors=True).warning(
+                    f"<y>Pusher</y>：临时图片删除失败，错误信息：{e}")
             return False
-        return img_path
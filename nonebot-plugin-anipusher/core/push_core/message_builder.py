@@ -1,8 +1,10 @@
 from typing import Dict, List
-from nonebot.adapters.onebot.v11 import Message, MessageSegment
-from ...utils import CommonUtils
 
 from nonebot import logger
+from nonebot.adapters.onebot.v11 import Message, MessageSegment
+
+from ...utils import CommonUtils
+from .image_cache import ImageCache
 
 
 class MessageBuilder:
@@ -15,7 +17,7 @@ class MessageBuilder:
         self.data = data
         return self
 
-    def build(self):
+    async def build(self):
         """构建消息段列表"""
         message = Message()
         for text, key in self.message_template:
@@ -26,7 +28,8 @@ class MessageBuilder:
                 # 跳过缺失或为None的字段
                 continue
             if key == "img" or key == "image":
-                data = CommonUtils.img_to_base64(self.data[key])
+                # 启用图片路由时以链接引用缓存图片，否则内嵌base64
+                data = ImageCache.public_url(self.data[key]) or await CommonUtils.img_to_base64_cached(self.data[key])
                 message.append(MessageSegment.image(data))
                 continue
             if key == "at":
@@ -0,0 +1,201 @@
+import asyncio
+import inspect
+import time
+from collections import deque
+from typing import Optional
+
+from nonebot import logger
+
+from ..config import APPCONFIG, FUNCTION
+from ..external import get_request
+
+
+class RouteHealth:
+    """单条上游线路的滚动健康统计"""
+    WINDOW = 10  # 统计最近多少次探测
+
+    def __init__(self) -> None:
+        self.samples: deque[tuple[bool, float]] = deque(maxlen=self.WINDOW)
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_probe: float | None = None
+
+    def record(self, ok: bool, latency: float, error: str | None = None) -> None:
+        self.samples.append((ok, latency))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        self.last_error = error
+        self.last_probe = time.time()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+    @property
+    def latency(self) -> float | None:
+        """成功探测的平均延迟（秒）"""
+        latencies = [latency for ok, latency in self.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def stats(self) -> dict:
+        latency = self.latency
+        return {
+            "probes": len(self.samples),
+            "error_rate": round(self.error_rate, 2),
+            "latency_ms": round(latency * 1000) if latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe,
+        }
+
+
+class UpstreamProber:
+    """
+    上游服务持续探测
+    定时探测Emby及TMDB（直连/代理）线路，记录滚动延迟与错误率，并实时调整：
+    - FUNCTION.emby_enabled / FUNCTION.tmdb_enabled：探测成功立即启用，连续失败达到阈值后禁用
+    - APPCONFIG.proxy：TMDB在直连与代理中选择可用且延迟更低的线路
+    启动时的开关状态由HealthCheck决定，探测器在此基础上持续更新
+    """
+    FAIL_THRESHOLD = 3  # 连续失败多少次后判定线路不可用
+    SWITCH_RATIO = 0.7  # 备用线路延迟低于当前线路的该比例时才切换，避免来回切换
+    TMDB_PROBE_URL = "https://api.themoviedb.org/3/authentication"
+    _task: Optional[asyncio.Task] = None
+    _interval = 60  # 探测间隔（秒），0为关闭探测
+    _routes: dict[str, RouteHealth] = {}
+
+    @classmethod
+    async def start(cls, interval: int) -> None:
+        """启动探测任务"""
+        if cls._task is not None:
+            return
+        cls._interval = max(0, interval)
+        if not cls._interval:
+            return
+        cls._task = asyncio.create_task(cls._run(), name="anipusher_prober")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止探测任务"""
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            await asyncio.sleep(cls._interval)
+            try:
+                await cls.probe_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.opt(colors=True).error(f"<r>Prober</r>：上游探测异常：{e}")
+
+    @classmethod
+    async def probe_once(cls) -> None:
+        """探测所有线路并更新功能开关与TMDB线路"""
+        probes = {"emby": cls._probe_emby(), "tmdb_direct": cls._probe_tmdb(None)}
+        if APPCONFIG.configured_proxy:
+            probes["tmdb_proxy"] = cls._probe_tmdb(APPCONFIG.configured_proxy)
+        results = await asyncio.gather(*probes.values())
+        for name, (ok, latency, error) in zip(probes.keys(), results):
+            cls._routes.setdefault(name, RouteHealth()).record(ok, latency, error)
+        cls._apply_emby()
+        cls._apply_tmdb()
+
+    @classmethod
+    def stats(cls) -> dict:
+        """线路健康状态与当前路由"""
+        return {
+            "routes": {name: route.stats() for name, route in cls._routes.items()},
+            "emby_enabled": FUNCTION.emby_enabled,
+            "tmdb_enabled": FUNCTION.tmdb_enabled,
+            "tmdb_route": cls._active_tmdb_route() if FUNCTION.tmdb_enabled else None,
+        }
+
+    @staticmethod
+    async def _timed(*requests) -> tuple[bool, float, str | None]:
+        """
+        依次执行请求，全部成功才视为成功，返回 (是否成功, 耗时, 错误信息)
+        依次执行保证熔断器half_open时由第一个请求试探，后续请求不会被拒绝
+        """
+        start = time.monotonic()
+        for request in requests:
+            try:
+                await request
+            except Exception as e:
+                for pending in requests:
+                    if inspect.iscoroutine(pending):
+                        pending.close()  # 关闭未执行的请求，避免未等待协程的警告
+                return False, time.monotonic() - start, UpstreamProber._describe(e)
+        return True, time.monotonic() - start, None
+
+    @staticmethod
+    def _describe(error: Exception) -> str:
+        """
+        错误摘要，会在未鉴权的状态接口中展示
+        只保留异常类型与HTTP状态码，不含异常文本（aiohttp的异常文本包含完整URL及查询参数）
+        """
+        status = getattr(error, "status", None)
+        return f"{type(error).__name__}: {status}" if status is not None else type(error).__name__
+
+    @classmethod
+    async def _probe_emby(cls) -> tuple[bool, float, str | None]:
+        emby_base = (APPCONFIG.emby_host or "").rstrip("/")
+        headers = {"X-Emby-Token": APPCONFIG.emby_key or ""}  # 密钥放在请求头中，不出现在URL里
+        return await cls._timed(
+            get_request(f"{emby_base}/emby/System/Ping", headers=headers),
+            get_request(f"{emby_base}/emby/System/Info", headers=headers))
+
+    @classmethod
+    async def _probe_tmdb(cls, proxy: str | None) -> tuple[bool, float, str | None]:
+        headers = {
+            "accept": "application/json",
+            "Authorization": f"Bearer {(APPCONFIG.tmdb_authorization or '')}"
+        }
+        return await cls._timed(get_request(cls.TMDB_PROBE_URL, headers=headers, proxy=proxy))
+
+    @classmethod
+    def _healthy(cls, name: str) -> bool:
+        route = cls._routes.get(name)
+        return route is not None and bool(route.samples) and route.consecutive_failures < cls.FAIL_THRESHOLD
+
+    @classmethod
+    def _active_tmdb_route(cls) -> str:
+        return "tmdb_direct" if APPCONFIG.proxy is None else "tmdb_proxy"
+
+    @classmethod
+    def _apply_emby(cls) -> None:
+        route = cls._routes["emby"]
+        if not FUNCTION.emby_enabled and route.consecutive_failures == 0:
+            FUNCTION.emby_enabled = True
+            logger.opt(colors=True).info("<g>Prober</g>：Emby已恢复，Emby功能 <g>已启用</g>")
+        elif FUNCTION.emby_enabled and not cls._healthy("emby"):
+            FUNCTION.emby_enabled = False
+            logger.opt(colors=True).warning(
+                f"<y>Prober</y>：Emby连续 {route.consecutive_failures} 次探测失败，Emby功能 <r>已禁用</r>")
+
+    @classmethod
+    def _apply_tmdb(cls) -> None:
+        candidates = [name for name in ("tmdb_direct", "tmdb_proxy") if cls._healthy(name)]
+        if not candidates:
+            if FUNCTION.tmdb_enabled:
+                FUNCTION.tmdb_enabled = False
+                logger.opt(colors=True).warning("<y>Prober</y>：TMDB所有线路探测失败，TMDB功能 <r>已禁用</r>")
+            return
+        current = cls._active_tmdb_route()
+        best = min(candidates, key=lambda name: cls._routes[name].latency or float("inf"))
+        if FUNCTION.tmdb_enabled and current in candidates and best != current:
+            current_latency = cls._routes[current].latency or float("inf")
+            best_latency = cls._routes[best].latency or float("inf")
+            if best_latency >= current_latency * cls.SWITCH_RATIO:
+                best = current  # 差距不明显时保持当前线路
+        if not FUNCTION.tmdb_enabled or best != current:
+            APPCONFIG.proxy = None if best == "tmdb_direct" else APPCONFIG.configured_proxy
+            FUNCTION.tmdb_enabled = True
+            logger.opt(colors=True).info(
+                f"<g>Prober</g>：TMDB切换至{'直连' if best == 'tmdb_direct' else '代理连接'}，TMDB功能 <g>已启用</g>")
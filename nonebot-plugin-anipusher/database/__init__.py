@@ -2,8 +2,10 @@
 from .database_manager import DatabaseManager
 from .db_health_check import DBHealthCheck
 from .db_models import DatabaseTables
-from .query_builder import SQLiteQueryBuilder
 from .db_operations import DatabaseService
+from .external_ids import ExternalIdMap
+from .outbox import OutboxService
+from .query_builder import SQLiteQueryBuilder
 
 # 定义当前模块的公开接口，即可以被其他模块导入的类
 __all__ = [
@@ -11,5 +13,7 @@ __all__ = [
     "DBHealthCheck",
     "DatabaseTables",
     "SQLiteQueryBuilder",
-    "DatabaseService"
+    "DatabaseService",
+    "OutboxService",
+    "ExternalIdMap"
 ]
@@ -1,15 +1,18 @@
-import aiosqlite
 import asyncio
 from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiosqlite
+
 from ..config import WORKDIR
 from ..exceptions import AppError
-from typing import Optional
 
 
 class DatabaseManager:
     _instance = None
     _init_lock = asyncio.Lock()
     _max_connections = 20
+    _cached_statements = 256  # 每个连接的预编译语句缓存容量
     _pool: Optional[asyncio.Queue[aiosqlite.Connection]] = None
     _current_connections = 0
 
@@ -81,7 +84,8 @@ class DatabaseManager:
             conn = await aiosqlite.connect(
                 database=WORKDIR.data_file,
                 isolation_level=None,
-                check_same_thread=False  # 允许在不同线程之间共享数据库连接
+                check_same_thread=False,  # 允许在不同线程之间共享数据库连接
+                cached_statements=DatabaseManager._cached_statements  # 相同SQL文本复用预编译语句
             )
 
             await conn.execute("PRAGMA journal_mode=WAL")  # 设置WAL模式
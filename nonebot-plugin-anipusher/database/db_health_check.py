@@ -1,6 +1,7 @@
-from .db_models import DatabaseTables
 from nonebot import logger
+
 from ..exceptions import AppError
+from .db_models import DatabaseTables
 from .db_operations import DatabaseSchemaManager, DatabaseService
 
 
@@ -26,35 +27,64 @@ class DBHealthCheck:
                     actual_columns = {col[1]: col for col in result}
                 except AppError.Exception as e:
                     if e.error_code == AppError.DatabaseTableNotFound:
-                        logger.opt(colors=True).info(
-                            f'表 <b>{table_name}</b> 不存在，正在创建表')
-                        await DatabaseSchemaManager.create_table(table_name)
-                        logger.opt(colors=True).info(f"{table_name}表创建完成！")
+                        await self._create_table(table_name)
                         continue  # 不再检查表结构
                     else:
                         raise
                 except Exception as e:
                     raise AppError.Exception(
                         AppError.DatabaseError, f'查询表 <b>{table_name}</b> 元数据失败，错误信息：{e}')
+                if not actual_columns:  # PRAGMA table_info 对不存在的表返回空结果
+                    await self._create_table(table_name)
+                    continue
                 try:
                     except_columns = DatabaseTables.get_table_schema(
                         table_name)
                     if set(except_columns) == set(actual_columns):
+                        await self._check_indexes(table_name)
                         continue
                     logger.opt(colors=True).info(
-                        f'表 <b>{table_name}</b> 的元数据与预期不符，正在重建表')
+                        f'表 <b>{table_name}</b> 的元数据与预期不符，正在迁移表')
                 except Exception as e:
                     raise AppError.Exception(
                         AppError.UnknownError, f'对比表 <b>{table_name}</b> 元数据失败，错误信息：{e}')
                 try:
-                    await DatabaseSchemaManager.drop_table(table_name)
-                    await DatabaseSchemaManager.create_table(table_name)
-                    logger.opt(colors=True).info(f"{table_name}表重建完成！")
+                    method = await DatabaseSchemaManager.migrate_table(table_name, actual_columns)
+                    logger.opt(colors=True).info(
+                        f"{table_name}表迁移完成！（{'新增列' if method == 'alter' else '复制数据至新表'}）")
                 except Exception as e:
-                    raise AppError.Exception(
-                        AppError.DatabaseError, f'重建表 <b>{table_name}</b> 失败，错误信息：{e}')
+                    # 迁移失败时退回重建，表中数据将丢失
+                    logger.opt(colors=True).warning(
+                        f'<y>表 <b>{table_name}</b> 迁移失败，正在重建表</y>，错误信息：{e}')
+                    try:
+                        await DatabaseSchemaManager.drop_table(table_name)
+                        await DatabaseSchemaManager.create_table(table_name)
+                        logger.opt(colors=True).info(f"{table_name}表重建完成！")
+                    except Exception as e:
+                        raise AppError.Exception(
+                            AppError.DatabaseError, f'重建表 <b>{table_name}</b> 失败，错误信息：{e}')
+                await self._check_indexes(table_name)
         except AppError.Exception:
             raise
         except Exception as e:
             raise AppError.Exception(
                 AppError.UnknownError, f'数据库健康检查失败，错误信息：{e}')
+
+    async def _create_table(self, table_name: DatabaseTables.TableName) -> None:
+        """创建缺失的表及其索引"""
+        logger.opt(colors=True).info(
+            f'表 <b>{table_name}</b> 不存在，正在创建表')
+        await DatabaseSchemaManager.create_table(table_name)
+        logger.opt(colors=True).info(f"{table_name}表创建完成！")
+        await self._check_indexes(table_name)
+
+    async def _check_indexes(self, table_name: DatabaseTables.TableName) -> None:
+        """创建表缺失或定义已变更的二级索引"""
+        try:
+            created = await DatabaseSchemaManager.ensure_indexes(table_name)
+        except Exception as e:
+            raise AppError.Exception(
+                AppError.DatabaseError, f'创建表 <b>{table_name}</b> 索引失败，错误信息：{e}')
+        if created:
+            logger.opt(colors=True).info(
+                f"表 <b>{table_name}</b> 索引创建完成：{', '.join(created)}")
@@ -1,5 +1,5 @@
-from enum import Enum
-from typing import TypedDict, Union, Literal, NotRequired
+from enum import Enum, IntEnum
+from typing import Literal, NotRequired, TypedDict, Union
 
 
 class DatabaseTables:
@@ -10,21 +10,52 @@ class DatabaseTables:
         EMBY = "EMBY"
         ANI_RSS = "ANIRSS"
         ANIME = "ANIME"
+        TMDB_CACHE = "TMDB_CACHE"
+        EXTERNAL_ID_MAP = "EXTERNAL_ID_MAP"
+        IMAGE_CACHE = "IMAGE_CACHE"
+
+    class SendStatus(IntEnum):
+        """推送状态（send_status列）"""
+        PENDING = 0  # 待推送
+        SENT = 1  # 已推送
+        CLAIMED = 2  # 已被认领，正在推送（lease_until前其他worker不可认领）
+        FAILED = 3  # 推送失败，等待next_retry_at后重试
+        DEAD = 4  # 超过最大重试次数，不再推送
 
     class ColumnDef(TypedDict):
         type: Literal["INTEGER", "TEXT", "REAL", "BLOB"]
         required: bool
         default: Union[int, str, None]  # 允许int类型
-        primary_key: NotRequired[bool]  # 主键可选
+        primary_key: NotRequired[bool]  # 主键可选，多列同时标记时为联合主键
         auto_increment: NotRequired[bool]  # 自增可选
         allowed_values: NotRequired[list[Union[int, str]]]  # 允许值可选
 
+    class IndexDef(TypedDict):
+        columns: list[str]  # 索引列，按顺序组成联合索引
+        unique: NotRequired[bool]  # 唯一索引可选
+        where: NotRequired[str]  # 部分索引条件可选，仅条件成立的行进入索引
+
+    # 可认领（待推送、失败待重试、认领中）数据的条件
+    # 认领语句须原样包含该条件，SQLite才能证明查询命中部分索引
+    CLAIMABLE_CONDITION = (f"send_status IN ({SendStatus.PENDING.value}, "
+                           f"{SendStatus.CLAIMED.value}, {SendStatus.FAILED.value})")
+
     # 表结构定义
     SCHEMAS: dict[TableName, dict[str, ColumnDef]] = {
         TableName.EMBY: {
             # 系统字段↓
             'id': {'type': 'INTEGER', 'required': False, 'default': None, 'primary_key': True, 'auto_increment': True},
-            'send_status': {'type': 'INTEGER', 'required': True, 'default': 0, 'allowed_values': [0, 1]},
+            'send_status': {'type': 'INTEGER', 'required': True, 'default': 0, 'allowed_values': [0, 1, 2, 3, 4]},
+            # 推送尝试次数
+            'attempts': {'type': 'INTEGER', 'required': True, 'default': 0},
+            # 认领租约到期时间（时间戳）
+            'lease_until': {'type': 'REAL', 'required': False, 'default': None},
+            # 失败后下次重试时间（时间戳）
+            'next_retry_at': {'type': 'REAL', 'required': False, 'default': None},
+            # 最近一次推送失败原因
+            'last_error': {'type': 'TEXT', 'required': False, 'default': None},
+            # 已送达的推送目标（JSON列表，如 ["group:123", "private:456"]），重试时跳过
+            'delivered_targets': {'type': 'TEXT', 'required': False, 'default': None},
             'timestamp': {'type': 'TEXT', 'required': False, 'default': None},
             # 剧集信息字段↓
             'type': {'type': 'TEXT', 'required': False, 'default': None},
@@ -65,7 +96,17 @@ class DatabaseTables:
         TableName.ANI_RSS: {
             # 系统字段↓
             'id': {'type': 'INTEGER', 'required': False, 'default': None, 'primary_key': True, 'auto_increment': True},
-            'send_status': {'type': 'INTEGER', 'required': True, 'default': 0, 'allowed_values': [0, 1]},
+            'send_status': {'type': 'INTEGER', 'required': True, 'default': 0, 'allowed_values': [0, 1, 2, 3, 4]},
+            # 推送尝试次数
+            'attempts': {'type': 'INTEGER', 'required': True, 'default': 0},
+            # 认领租约到期时间（时间戳）
+            'lease_until': {'type': 'REAL', 'required': False, 'default': None},
+            # 失败后下次重试时间（时间戳）
+            'next_retry_at': {'type': 'REAL', 'required': False, 'default': None},
+            # 最近一次推送失败原因
+            'last_error': {'type': 'TEXT', 'required': False, 'default': None},
+            # 已送达的推送目标（JSON列表，如 ["group:123", "private:456"]），重试时跳过
+            'delivered_targets': {'type': 'TEXT', 'required': False, 'default': None},
             'timestamp': {'type': 'TEXT', 'required': False, 'default': None},
             # 剧集信息字段↓(通过AniRSS webhook获取)
             # ani-rss动作
@@ -120,6 +161,60 @@ class DatabaseTables:
             'group_subscriber': {'type': 'TEXT', 'required': False, 'default': "{}"},
             # 私信订阅者
             'private_subscriber': {'type': 'TEXT', 'required': False, 'default': "[]"}
+        },
+        TableName.TMDB_CACHE: {
+            # 缓存键：接口路径+查询参数
+            'cache_key': {'type': 'TEXT', 'required': True, 'default': None, 'primary_key': True},
+            'endpoint': {'type': 'TEXT', 'required': False, 'default': None},
+            # 响应JSON
+            'payload': {'type': 'TEXT', 'required': False, 'default': None},
+            # 是否为"未找到"的否定缓存
+            'negative': {'type': 'INTEGER', 'required': True, 'default': 0, 'allowed_values': [0, 1]},
+            # 过期时间（时间戳）
+            'expires_at': {'type': 'REAL', 'required': True, 'default': 0}
+        },
+        TableName.EXTERNAL_ID_MAP: {
+            # 外部ID来源，与TMDB find接口的external_source一致（imdb_id / tvdb_id）
+            'source': {'type': 'TEXT', 'required': True, 'default': None, 'primary_key': True},
+            'external_id': {'type': 'TEXT', 'required': True, 'default': None, 'primary_key': True},
+            'tmdb_id': {'type': 'INTEGER', 'required': True, 'default': None},
+            # 最近一次写入时间（时间戳）
+            'updated_at': {'type': 'REAL', 'required': False, 'default': None}
+        },
+        TableName.IMAGE_CACHE: {
+            # 缓存键（通常为tmdb_id）
+            'cache_key': {'type': 'TEXT', 'required': True, 'default': None, 'primary_key': True},
+            # 相对于图片缓存目录的文件名
+            'path': {'type': 'TEXT', 'required': True, 'default': None},
+            'format': {'type': 'TEXT', 'required': False, 'default': None},
+            # 文件大小（字节）
+            'size': {'type': 'INTEGER', 'required': True, 'default': 0},
+            # 文件修改时间及最近访问时间（时间戳）
+            'mtime': {'type': 'REAL', 'required': False, 'default': None},
+            'last_access': {'type': 'REAL', 'required': False, 'default': None},
+            # 条件请求校验信息↓
+            'url': {'type': 'TEXT', 'required': False, 'default': None},
+            'source': {'type': 'TEXT', 'required': False, 'default': None},
+            'etag': {'type': 'TEXT', 'required': False, 'default': None},
+            'last_modified': {'type': 'TEXT', 'required': False, 'default': None}
+        }
+    }
+
+    # 二级索引定义，键为索引名，健康检查时创建缺失或定义已变更的索引
+    INDEXES: dict[TableName, dict[str, IndexDef]] = {
+        TableName.EMBY: {
+            # 推送认领：已推送数据占绝大多数，只索引尚未完成的数据
+            'idx_emby_claimable': {'columns': ['id'], 'where': CLAIMABLE_CONDITION},
+            # 按剧集查询历史记录
+            'idx_emby_tmdb_id': {'columns': ['tmdb_id', 'id']}
+        },
+        TableName.ANI_RSS: {
+            'idx_anirss_claimable': {'columns': ['id'], 'where': CLAIMABLE_CONDITION},
+            'idx_anirss_tmdb_id': {'columns': ['tmdb_id', 'id']}
+        },
+        TableName.TMDB_CACHE: {
+            # 启动时按过期时间加载未过期缓存
+            'idx_tmdb_cache_expires_at': {'columns': ['expires_at']}
         }
     }
 
@@ -134,6 +229,17 @@ class DatabaseTables:
         """
         return cls.SCHEMAS[table_name]
 
+    @classmethod
+    def get_table_indexes(cls, table_name: TableName) -> dict[str, IndexDef]:
+        """
+        获取指定表的二级索引定义
+        Args:
+            table_name: 表名枚举
+        Returns:
+            索引名到索引定义的字典，未定义索引时为空字典
+        """
+        return cls.INDEXES.get(table_name, {})
+
     @classmethod
     def get_table_names(cls) -> list['DatabaseTables.TableName']:
         """
@@ -160,3 +266,19 @@ class DatabaseTables:
             default_value = column_def.get('default', None)
             default_dict[column_name] = default_value
         return default_dict
+
+    @classmethod
+    def row_to_dict(cls, table_name: TableName, row: tuple) -> dict[str, object]:
+        """
+        将SELECT *查询到的数据行转换为字典
+        Args:
+            table_name: 表名枚举
+            row: 数据行元组
+        Returns:
+            数据字典
+        """
+        schema = cls.generate_default_schema(table_name)
+        if len(row) != len(schema):
+            raise ValueError(
+                f"数据行字段数不匹配(预期:{len(schema)}，实际:{len(row)})")
+        return dict(zip(schema.keys(), row))
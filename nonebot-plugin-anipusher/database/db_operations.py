@@ -1,9 +1,11 @@
 
+import re
 from typing import Iterable
-from .db_models import DatabaseTables
-from .query_builder import SQLiteQueryBuilder
+
 from ..exceptions import AppError
 from .database_manager import DatabaseManager
+from .db_models import DatabaseTables
+from .query_builder import SQLiteQueryBuilder
 
 
 class DatabaseService:
@@ -14,13 +16,15 @@ class DatabaseService:
         table_name: DatabaseTables.TableName,
         data: dict,
         conflict_columns: list[str] = []
-    ) -> None:
+    ) -> int | None:
         """
         插入或更新数据到指定表
         Args:
             table_name: 表名
             data: 要插入的数据字典
             conflict_columns: 冲突列名列表
+        Returns:
+            最后插入行的rowid
         """
         # 检查参数合规性
         if not data:
@@ -36,16 +40,48 @@ class DatabaseService:
             raise AppError.Exception(
                 AppError.UnSupportedType, f"意外的参数类型：{type(table_name)}")
         # 构建插入SQL语句
-        sql = SQLiteQueryBuilder.build_insert_or_update_data(
+        statement = SQLiteQueryBuilder.build_insert_or_update_data(
             table_name, data, conflict_columns)
-        if not sql:
+        if not statement:
             raise AppError.Exception(
                 AppError.UnknownError, "意外的错误：没有获取到生成的语句")
+        sql, params = statement
         async with DatabaseManager.get_connection() as conn:
             # 执行SQL语句
             try:
                 async with conn.cursor() as cursor:
-                    await cursor.execute(sql, data)
+                    await cursor.execute(sql, params)
+                    await conn.commit()
+                    return cursor.lastrowid
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+
+    # 写入完整数据行
+    @staticmethod
+    async def upsert_row(
+        table_name: DatabaseTables.TableName,
+        data: dict,
+        conflict_columns: list[str]
+    ) -> None:
+        """
+        插入或覆盖完整数据行，值为None的列写为NULL（upsert_data会忽略None值，保留原值）
+        Args:
+            table_name: 表名
+            data: 要写入的数据字典
+            conflict_columns: 冲突列名列表
+        """
+        if not data:
+            raise AppError.Exception(
+                AppError.ParamNotFound, "意外的参数缺失data")
+        if not isinstance(table_name, DatabaseTables.TableName):
+            raise AppError.Exception(
+                AppError.UnSupportedType, f"意外的参数类型：{type(table_name)}")
+        sql, params = SQLiteQueryBuilder.build_upsert_row(table_name, data, conflict_columns)
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
                     await conn.commit()
             except Exception as e:
                 raise AppError.Exception(
@@ -65,7 +101,7 @@ class DatabaseService:
         Args:
             table_name: 表名
             columns: 要查询的列名列表，None表示所有列
-            where: WHERE条件字典 {列名: 值}
+            where: WHERE条件字典 {列名: 值} 或 {列名: (运算符, 值)}
             order_by: 排序字段，如 "id DESC"
             limit: 返回记录数限制
             offset: 偏移量
@@ -80,7 +116,7 @@ class DatabaseService:
                 AppError.UnSupportedType, f"意外的参数类型：{type(table_name)}")
         # 构建查询SQL语句
 
-        sql = SQLiteQueryBuilder.build_select_table(
+        sql, params = SQLiteQueryBuilder.build_select_table(
             table_name, columns, where, order_by, limit, offset)
         if not sql:
             raise AppError.Exception(
@@ -89,7 +125,7 @@ class DatabaseService:
             # 执行SQL语句
             try:
                 async with conn.cursor() as cursor:
-                    await cursor.execute(sql)
+                    await cursor.execute(sql, params)
                     return await cursor.fetchall()
             except Exception as e:
                 if "no such table" in str(e).lower():
@@ -148,7 +184,7 @@ class DatabaseService:
             raise AppError.Exception(
                 AppError.UnSupportedType, "意外的参数类型conflict_columns")
         # 构建更新SQL语句
-        sql = SQLiteQueryBuilder.build_update_table(
+        sql, params = SQLiteQueryBuilder.build_update_table(
             table_name,
             update_columns,
             where,
@@ -160,8 +196,40 @@ class DatabaseService:
             # 执行SQL语句
             try:
                 async with conn.cursor() as cursor:
-                    await cursor.execute(sql)
+                    await cursor.execute(sql, params)
+                    await conn.commit()
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+
+
+    # 删除数据
+    @staticmethod
+    async def delete_data(
+        table_name: DatabaseTables.TableName,
+        where: dict
+    ) -> int:
+        """
+        删除数据
+        Args:
+            table_name: 表名
+            where: WHERE条件字典 {列名: 值} 或 {列名: (运算符, 值)}
+        Returns:
+            删除的行数
+        """
+        if not isinstance(table_name, DatabaseTables.TableName):
+            raise AppError.Exception(
+                AppError.UnSupportedType, f"意外的参数类型：{type(table_name)}")
+        if not where or not isinstance(where, dict):
+            raise AppError.Exception(
+                AppError.ParamNotFound, "意外的参数缺失where")
+        sql, params = SQLiteQueryBuilder.build_delete_data(table_name, where)
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
                     await conn.commit()
+                    return cursor.rowcount
             except Exception as e:
                 raise AppError.Exception(
                     AppError.DatabaseDaoError, f"数据库执行错误：{e}")
@@ -254,3 +322,126 @@ class DatabaseSchemaManager:
             except Exception as e:
                 raise AppError.Exception(
                     AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+
+    @staticmethod
+    async def migrate_table(table_name: DatabaseTables.TableName, actual_columns: Iterable[str]) -> str:
+        """
+        将已有表迁移到DatabaseTables中的当前结构，保留已有数据
+        仅在结构末尾新增列且已有列定义不变时逐列 ALTER TABLE ADD COLUMN；
+        否则（约束变更、删除列、列顺序变化、无法直接新增的列）在事务中新建临时表，复制共有列的数据后删除原表并改名
+        Args:
+            table_name: 表名
+            actual_columns: 表中现有的列名
+        Returns:
+            迁移方式："alter" 或 "copy"
+        """
+        if not isinstance(table_name, DatabaseTables.TableName):
+            raise AppError.Exception(
+                AppError.UnSupportedType, "意外的表名参数类型")
+        expected = DatabaseTables.get_table_schema(table_name)
+        actual = list(actual_columns)
+        added = [name for name in expected if name not in actual]
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(SQLiteQueryBuilder.build_table_sql_query(), {"table": table_name.value})
+                    row = await cursor.fetchone()
+                    if row is None:
+                        raise AppError.Exception(
+                            AppError.DatabaseTableNotFound, f"表{table_name.value}不存在")
+                    if DatabaseSchemaManager._alterable(table_name, row[0], actual, added):
+                        await cursor.execute("BEGIN")
+                        try:
+                            for name in added:
+                                await cursor.execute(
+                                    SQLiteQueryBuilder.build_add_column(table_name, name, expected[name]))
+                            await cursor.execute("COMMIT")
+                        except Exception:
+                            await cursor.execute("ROLLBACK")
+                            raise
+                        return "alter"
+                    temp = f"{table_name.value}__migrate"
+                    common = [name for name in expected if name in actual]
+                    await cursor.execute("BEGIN")
+                    try:
+                        await cursor.execute(f"DROP TABLE IF EXISTS {temp}")
+                        await cursor.execute(SQLiteQueryBuilder.build_create_table(table_name, expected, target=temp))
+                        await cursor.execute(SQLiteQueryBuilder.build_copy_rows(table_name.value, temp, common))
+                        await cursor.execute(SQLiteQueryBuilder.build_drop_table(table_name))
+                        await cursor.execute(SQLiteQueryBuilder.build_rename_table(temp, table_name))
+                        await cursor.execute("COMMIT")
+                    except Exception:
+                        await cursor.execute("ROLLBACK")
+                        raise
+                    return "copy"
+            except AppError.Exception:
+                raise
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+
+    @staticmethod
+    def _alterable(table_name: DatabaseTables.TableName, table_sql: str, actual: list[str], added: list[str]) -> bool:
+        """判断能否只通过 ALTER TABLE ADD COLUMN 完成迁移"""
+        expected = DatabaseTables.get_table_schema(table_name)
+        # 新增列总是追加在表尾，而row_to_dict及RETURNING *按结构定义的顺序映射列，
+        # 现有列须恰好是结构定义的前缀（不删除列、不调整顺序、新增列均位于末尾）
+        if list(expected)[:len(actual)] != actual:
+            return False
+        for name in added:
+            column_def = expected[name]
+            # SQLite新增列不能是主键，NOT NULL列必须有默认值
+            if column_def.get('primary_key', False):
+                return False
+            if column_def.get('required', False) and column_def.get('default') is None:
+                return False
+        # 已有列的定义（类型、约束）须与建表语句中的一致
+        primary_keys = [name for name, column_def in expected.items() if column_def.get('primary_key', False)]
+        for name in actual:
+            definition = SQLiteQueryBuilder.build_column_definition(
+                name, expected[name], inline_primary_key=len(primary_keys) == 1)
+            if not re.search(r"[(,]\s*" + re.escape(definition) + r"\s*[,)]", table_sql):
+                return False
+        return True
+
+    @staticmethod
+    async def ensure_indexes(table_name: DatabaseTables.TableName) -> list[str]:
+        """
+        按DatabaseTables.INDEXES创建缺失的索引，已存在但定义变更的同名索引删除后重建
+        未声明的索引保持不变
+        Args:
+            table_name: 表名
+        Returns:
+            本次创建或重建的索引名列表
+        """
+        if not isinstance(table_name, DatabaseTables.TableName):
+            raise AppError.Exception(
+                AppError.UnSupportedType, "意外的表名参数类型")
+        indexes = DatabaseTables.get_table_indexes(table_name)
+        if not indexes:
+            return []
+        try:
+            expected = {name: SQLiteQueryBuilder.build_create_index(table_name, name, index)
+                        for name, index in indexes.items()}
+        except Exception as e:
+            raise AppError.Exception(
+                AppError.DatabaseDaoError, f"获取索引定义/生成数据库语句异常：{e}")
+        created = []
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(SQLiteQueryBuilder.build_index_query(), {"table": table_name.value})
+                    actual = {name: sql for name, sql in await cursor.fetchall()}
+                    for name, sql in expected.items():
+                        # sqlite_master中保存的建索引语句不含IF NOT EXISTS
+                        if actual.get(name) == sql.replace(" IF NOT EXISTS", "", 1):
+                            continue
+                        if name in actual:
+                            await cursor.execute(SQLiteQueryBuilder.build_drop_index(name))
+                        await cursor.execute(sql)
+                        created.append(name)
+                    await conn.commit()
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+        return created
@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+
+from ..exceptions import AppError
+from .database_manager import DatabaseManager
+from .db_models import DatabaseTables
+from .db_operations import DatabaseService
+from .query_builder import SQLiteQueryBuilder
+
+
+class ExternalIdMap:
+    """
+    外部ID（imdb_id / tvdb_id）→ TMDB ID 映射
+    映射以 (source, external_id) 为联合主键保存在EXTERNAL_ID_MAP表中
+    每次成功解析后写入，启动时从EMBY表已有数据回填，解析前优先查询以避免网络请求
+    """
+    SOURCES = ("imdb_id", "tvdb_id")  # 与EMBY表中的外部ID列名一致
+    MEMORY_SIZE = 1024  # 内存中记住的映射条数
+    _known: "OrderedDict[tuple[str, str], int]" = OrderedDict()  # 已确认与数据库一致的映射
+
+    @classmethod
+    def _remember(cls, source: str, external_id: str, tmdb_id: int) -> None:
+        cls._known[(source, external_id)] = tmdb_id
+        cls._known.move_to_end((source, external_id))
+        if len(cls._known) > cls.MEMORY_SIZE:
+            cls._known.popitem(last=False)
+
+    @classmethod
+    async def get(cls, source: str, external_id: str | int | None) -> int | None:
+        """
+        查询外部ID对应的TMDB ID
+        Returns:
+            TMDB ID，无映射时返回None
+        """
+        if not external_id or source not in cls.SOURCES:
+            return None
+        rows = list(await DatabaseService.select_data(
+            table_name=DatabaseTables.TableName.EXTERNAL_ID_MAP,
+            columns=["tmdb_id"],
+            where={"source": source, "external_id": str(external_id)},
+            limit=1))
+        if not rows:
+            return None
+        tmdb_id = int(rows[0][0])
+        cls._remember(source, str(external_id), tmdb_id)
+        return tmdb_id
+
+    @classmethod
+    async def record(cls, tmdb_id: str | int | None, **external_ids: str | int | None) -> int:
+        """
+        写入同一TMDB ID的外部ID映射，已知与数据库一致的映射跳过
+        Args:
+            tmdb_id: TMDB ID
+            external_ids: 来源 → 外部ID，如 imdb_id="tt123", tvdb_id=456，空值忽略
+        Returns:
+            写入的映射条数
+        """
+        try:
+            tmdb_id = int(tmdb_id)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return 0
+        count = 0
+        for source, external_id in external_ids.items():
+            if not external_id or source not in cls.SOURCES:
+                continue
+            if cls._known.get((source, str(external_id))) == tmdb_id:
+                continue
+            await DatabaseService.upsert_data(
+                DatabaseTables.TableName.EXTERNAL_ID_MAP,
+                {
+                    "source": source,
+                    "external_id": str(external_id),
+                    "tmdb_id": tmdb_id,
+                    "updated_at": time.time(),
+                },
+                conflict_columns=["source", "external_id"])
+            cls._remember(source, str(external_id), tmdb_id)
+            count += 1
+        return count
+
+    @classmethod
+    async def backfill(cls) -> int:
+        """
+        从EMBY表已解析出tmdb_id的数据回填映射
+        Returns:
+            写入或更新的映射条数
+        """
+        total = 0
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    for source in cls.SOURCES:
+                        sql = SQLiteQueryBuilder.build_backfill_external_ids(
+                            DatabaseTables.TableName.EMBY, source)
+                        await cursor.execute(sql, {"source": source, "now": time.time()})
+                        total += max(cursor.rowcount, 0)
+                    await conn.commit()
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+        return total
@@ -0,0 +1,168 @@
+import json
+import time
+from typing import Iterable
+
+from ..exceptions import AppError
+from .database_manager import DatabaseManager
+from .db_models import DatabaseTables
+from .query_builder import SQLiteQueryBuilder
+
+
+class OutboxService:
+    """
+    推送发件箱
+    基于send_status的状态机：待推送 → 已认领 → 已推送 / 失败（等待重试） → 放弃
+    认领通过单条 UPDATE ... RETURNING 原子完成，多个worker或多个共享数据库的bot进程
+    可同时认领而不会重复推送（租约过期后数据可被重新认领，保证至少推送一次）
+    """
+    LEASE_SECONDS = 300  # 认领租约时长
+    MAX_ATTEMPTS = 5  # 最大推送尝试次数，超过后标记为放弃
+    RETRY_BASE = 60  # 失败重试基础间隔（秒），按尝试次数指数增长
+    RETRY_MAX = 3600  # 失败重试最大间隔（秒）
+
+    @classmethod
+    def new_claim(cls) -> dict:
+        """
+        新数据写入时直接持有的认领字段
+        实时推送流程插入数据时即认领，避免补发流程在推送前抢先认领
+        """
+        return {
+            "send_status": DatabaseTables.SendStatus.CLAIMED,
+            "lease_until": time.time() + cls.LEASE_SECONDS,
+            "attempts": 1,
+        }
+
+    @classmethod
+    async def claim(cls, table_name: DatabaseTables.TableName, limit: int = 1) -> list[dict]:
+        """
+        按id顺序认领至多limit条可推送数据
+        Returns:
+            认领到的数据字典列表
+        """
+        sql = SQLiteQueryBuilder.build_claim_rows(table_name)
+        return await cls._claim(table_name, sql, {"limit": limit})
+
+    @classmethod
+    async def has_claimable(cls, table_name: DatabaseTables.TableName) -> bool:
+        """
+        是否存在可认领的数据（仅查询，不认领）
+        """
+        sql = SQLiteQueryBuilder.build_claimable_exists(table_name)
+        params = {
+            "claimed": DatabaseTables.SendStatus.CLAIMED,
+            "pending": DatabaseTables.SendStatus.PENDING,
+            "failed": DatabaseTables.SendStatus.FAILED,
+            "now": time.time(),
+        }
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    return await cursor.fetchone() is not None
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+
+    @classmethod
+    async def complete(cls,
+                       table_name: DatabaseTables.TableName,
+                       row: dict,
+                       delivered: Iterable[str] | None = None) -> bool:
+        """
+        标记认领的数据推送成功
+        Args:
+            delivered: 已送达的推送目标，None时保留原记录
+        Returns:
+            是否仍持有该认领（租约过期被他人认领时返回False）
+        """
+        return await cls._finish(table_name, row, DatabaseTables.SendStatus.SENT, None, None, delivered)
+
+    @staticmethod
+    def delivered_targets(row: dict) -> set[str]:
+        """
+        读取数据行中已送达的推送目标
+        Returns:
+            推送目标集合，格式同fail/complete的delivered参数
+        """
+        try:
+            return set(json.loads(row.get("delivered_targets") or "[]"))
+        except (TypeError, ValueError):
+            return set()
+
+    @classmethod
+    async def fail(cls,
+                   table_name: DatabaseTables.TableName,
+                   row: dict,
+                   error: str,
+                   delivered: Iterable[str] | None = None) -> DatabaseTables.SendStatus | None:
+        """
+        标记认领的数据推送失败，未超过最大尝试次数时安排重试
+        Args:
+            delivered: 本次及之前已送达的推送目标，重试时只推送其余目标；None时保留原记录
+        Returns:
+            数据的新状态（FAILED 或 DEAD），已不再持有该认领（租约过期被他人认领）时返回None
+        """
+        attempts = int(row.get("attempts") or 1)
+        if attempts >= cls.MAX_ATTEMPTS:
+            status, next_retry_at = DatabaseTables.SendStatus.DEAD, None
+        else:
+            delay = min(cls.RETRY_BASE * 2 ** (attempts - 1), cls.RETRY_MAX)
+            status, next_retry_at = DatabaseTables.SendStatus.FAILED, time.time() + delay
+        if not await cls._finish(table_name, row, status, next_retry_at, error, delivered):
+            return None
+        return status
+
+    @classmethod
+    async def _claim(cls, table_name: DatabaseTables.TableName, sql: str, params: dict) -> list[dict]:
+        if not isinstance(table_name, DatabaseTables.TableName):
+            raise AppError.Exception(
+                AppError.UnSupportedType, f"意外的参数类型：{type(table_name)}")
+        now = time.time()
+        params.update({
+            "claimed": DatabaseTables.SendStatus.CLAIMED,
+            "pending": DatabaseTables.SendStatus.PENDING,
+            "failed": DatabaseTables.SendStatus.FAILED,
+            "now": now,
+            "lease_until": now + cls.LEASE_SECONDS,
+        })
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    rows = await cursor.fetchall()
+                    await conn.commit()
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
+        claimed = [DatabaseTables.row_to_dict(table_name, tuple(row)) for row in rows]
+        return sorted(claimed, key=lambda row: row["id"])  # type: ignore[arg-type, return-value]
+
+    @classmethod
+    async def _finish(cls,
+                      table_name: DatabaseTables.TableName,
+                      row: dict,
+                      status: DatabaseTables.SendStatus,
+                      next_retry_at: float | None,
+                      error: str | None,
+                      delivered: Iterable[str] | None) -> bool:
+        if not row.get("id"):
+            raise AppError.Exception(AppError.ParamNotFound, "意外的参数缺失id")
+        sql = SQLiteQueryBuilder.build_finish_claim(table_name)
+        params = {
+            "status": status,
+            "next_retry_at": next_retry_at,
+            "last_error": error,
+            "delivered_targets": json.dumps(sorted(delivered)) if delivered is not None else None,
+            "id": row["id"],
+            "claimed": DatabaseTables.SendStatus.CLAIMED,
+            "lease_until": row.get("lease_until"),
+        }
+        async with DatabaseManager.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    await conn.commit()
+                    return cursor.rowcount > 0
+            except Exception as e:
+                raise AppError.Exception(
+                    AppError.DatabaseDaoError, f"数据库执行错误：{e}")
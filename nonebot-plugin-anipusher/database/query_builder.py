@@ -1,54 +1,146 @@
-from .db_models import DatabaseTables
+from collections import OrderedDict
+from typing import Callable, Hashable
+
 from ..exceptions import AppError
+from .db_models import DatabaseTables
 
 
 class SQLiteQueryBuilder:
+    """
+    SQL语句生成器
+    涉及数据的语句均只包含占位符，返回 (SQL, 参数)；SQL文本按语句结构（表、列、条件列、排序、分页）缓存，
+    相同结构的调用得到同一条SQL文本，可直接命中连接上的预编译语句缓存
+    """
+    _WHERE_OPERATORS = ("=", "!=", ">", ">=", "<", "<=")  # WHERE条件允许的比较运算符
+    STATEMENT_CACHE_SIZE = 256  # 最多缓存多少种语句结构
+    _statements: "OrderedDict[Hashable, str]" = OrderedDict()  # 语句结构 → SQL文本
+    _statement_hits = 0
+    _statement_misses = 0
+
+    @classmethod
+    def _cached(cls, shape: Hashable, build: Callable[[], str]) -> str:
+        """按语句结构获取SQL文本，未缓存时调用build生成"""
+        sql = cls._statements.get(shape)
+        if sql is not None:
+            cls._statement_hits += 1
+            cls._statements.move_to_end(shape)
+            return sql
+        cls._statement_misses += 1
+        sql = cls._statements[shape] = build()
+        if len(cls._statements) > cls.STATEMENT_CACHE_SIZE:
+            cls._statements.popitem(last=False)
+        return sql
+
+    @classmethod
+    def statement_cache_stats(cls) -> dict:
+        """SQL文本缓存统计"""
+        return {"shapes": len(cls._statements), "hits": cls._statement_hits, "misses": cls._statement_misses}
+
+    @staticmethod
+    def _check_identifier(name: str) -> str:
+        """列名只能拼接进SQL文本，必须是合法标识符"""
+        if not isinstance(name, str) or not name.isidentifier():
+            raise AppError.Exception(AppError.DatabaseError, f"非法列名：{name}")
+        return name
+
     @staticmethod  # 创建创建表的SQL语句
     def build_create_table(table_name: DatabaseTables.TableName,
-                           columns: dict[str, DatabaseTables.ColumnDef]) -> str:
+                           columns: dict[str, DatabaseTables.ColumnDef],
+                           target: str | None = None) -> str:
         """
         根据表名和列定义生成创建表的SQL语句
         Args:
             table_name: 表名
             columns: 列定义字典，键为列名，值为列属性
+            target: 实际创建的表名，迁移时用于创建临时表，默认为table_name
         Returns:
             生成的CREATE TABLE SQL语句
         """
-        column_definitions = []
-        for column_name, column_def in columns.items():
-            parts = [f"{column_name} {column_def['type']}"]  # 列名和类型
-            # 处理NOT NULL约束
-            if column_def.get('required', False):
-                parts.append("NOT NULL")
-            # 处理DEFAULT约束
-            if 'default' in column_def and column_def['default'] is not None:
-                default_value = column_def['default']
-                # 根据类型处理默认值的格式
-                if column_def['type'] == 'TEXT':
-                    default_value = f"'{default_value}'"
-                parts.append(f"DEFAULT {default_value}")
-
-            # 处理PRIMARY KEY约束
-            if column_def.get('primary_key', False):
-                parts.append("PRIMARY KEY")
-
-            # 处理AUTO_INCREMENT约束
-            if column_def.get('auto_increment', False) and column_def['type'] == 'INTEGER':
-                parts.append("AUTOINCREMENT")
-
-            # 处理ALLOWED_VALUES约束
-            if 'allowed_values' in column_def and column_def['allowed_values']:
-                allowed_values = ", ".join(f"'{v}'" if isinstance(v, str) else str(v)
-                                           for v in column_def['allowed_values'])
-                parts.append(f"CHECK ({column_name} IN ({allowed_values}))")
-
-            # 将列定义添加到列表中
-            column_definitions.append(" ".join(parts))  # 拼接列定义
+        # 多个列标记为主键时生成表级联合主键
+        primary_keys = [name for name, column_def in columns.items()
+                        if column_def.get('primary_key', False)]
+        column_definitions = [
+            SQLiteQueryBuilder.build_column_definition(
+                column_name, column_def, inline_primary_key=len(primary_keys) == 1)
+            for column_name, column_def in columns.items()]
+        if len(primary_keys) > 1:
+            column_definitions.append(f"PRIMARY KEY ({', '.join(primary_keys)})")
 
         # 拼接CREATE TABLE语句
-        sql = f"CREATE TABLE IF NOT EXISTS {str(table_name.value)} ({', '.join(column_definitions)})"
+        sql = f"CREATE TABLE IF NOT EXISTS {target or str(table_name.value)} ({', '.join(column_definitions)})"
         return sql  # 返回生成的SQL语句
 
+    @staticmethod  # 单列定义
+    def build_column_definition(column_name: str,
+                                column_def: DatabaseTables.ColumnDef,
+                                inline_primary_key: bool = True) -> str:
+        """
+        生成CREATE TABLE / ALTER TABLE ADD COLUMN中的单列定义
+        Args:
+            column_name: 列名
+            column_def: 列属性
+            inline_primary_key: 是否在列上声明PRIMARY KEY（联合主键时为False）
+        Returns:
+            列定义文本
+        """
+        parts = [f"{column_name} {column_def['type']}"]  # 列名和类型
+        # 处理NOT NULL约束
+        if column_def.get('required', False):
+            parts.append("NOT NULL")
+        # 处理DEFAULT约束
+        if 'default' in column_def and column_def['default'] is not None:
+            default_value = column_def['default']
+            # 根据类型处理默认值的格式
+            if column_def['type'] == 'TEXT':
+                default_value = f"'{default_value}'"
+            parts.append(f"DEFAULT {default_value}")
+
+        # 处理PRIMARY KEY约束
+        if column_def.get('primary_key', False) and inline_primary_key:
+            parts.append("PRIMARY KEY")
+
+        # 处理AUTO_INCREMENT约束
+        if column_def.get('auto_increment', False) and column_def['type'] == 'INTEGER':
+            parts.append("AUTOINCREMENT")
+
+        # 处理ALLOWED_VALUES约束
+        if 'allowed_values' in column_def and column_def['allowed_values']:
+            allowed_values = ", ".join(f"'{v}'" if isinstance(v, str) else str(v)
+                                       for v in column_def['allowed_values'])
+            parts.append(f"CHECK ({column_name} IN ({allowed_values}))")
+        return " ".join(parts)  # 拼接列定义
+
+    @staticmethod  # 新增列
+    def build_add_column(table_name: DatabaseTables.TableName,
+                         column_name: str,
+                         column_def: DatabaseTables.ColumnDef) -> str:
+        definition = SQLiteQueryBuilder.build_column_definition(column_name, column_def)
+        return f"ALTER TABLE {table_name.value} ADD COLUMN {definition}"
+
+    @staticmethod  # 建表语句查询
+    def build_table_sql_query() -> str:
+        """
+        Returns:
+            使用参数 :table 的SQL语句，结果为sqlite_master中保存的建表语句
+        """
+        return "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"
+
+    @staticmethod  # 复制数据
+    def build_copy_rows(source: str, target: str, columns: list[str]) -> str:
+        """
+        生成将source表中指定列的数据复制到target表的INSERT ... SELECT语句
+        Args:
+            source: 源表名
+            target: 目标表名
+            columns: 两表共有的列
+        """
+        column_clause = ", ".join(SQLiteQueryBuilder._check_identifier(col) for col in columns)
+        return f"INSERT INTO {target} ({column_clause}) SELECT {column_clause} FROM {source}"
+
+    @staticmethod  # 重命名表
+    def build_rename_table(source: str, table_name: DatabaseTables.TableName) -> str:
+        return f"ALTER TABLE {source} RENAME TO {table_name.value}"
+
     @staticmethod  # 元数据查询
     def build_metadata_query(table_name: DatabaseTables.TableName) -> str:
         sql = f"PRAGMA table_info({str(table_name.value)})"
@@ -59,11 +151,48 @@ class SQLiteQueryBuilder:
         sql = f"DROP TABLE IF EXISTS {str(table_name.value)}"
         return sql
 
-    @staticmethod  # 智能覆盖插入
-    def build_insert_or_update_data(table_name: DatabaseTables.TableName,
+    @classmethod  # 创建索引
+    def build_create_index(cls,
+                           table_name: DatabaseTables.TableName,
+                           index_name: str,
+                           index: DatabaseTables.IndexDef) -> str:
+        """
+        根据索引定义生成创建索引的SQL语句
+        Args:
+            table_name: 表名
+            index_name: 索引名
+            index: 索引定义
+        Returns:
+            生成的CREATE INDEX SQL语句，定义了where时为部分索引
+        """
+        columns = ", ".join(cls._check_identifier(column) for column in index['columns'])
+        unique = "UNIQUE " if index.get('unique', False) else ""
+        sql = (f"CREATE {unique}INDEX IF NOT EXISTS {cls._check_identifier(index_name)} "
+               f"ON {table_name.value} ({columns})")
+        if index.get('where'):
+            sql += f" WHERE {index['where']}"
+        return sql
+
+    @staticmethod  # 索引查询
+    def build_index_query() -> str:
+        """
+        生成查询表上已有索引的SQL语句（不含主键等约束自动生成的索引）
+        Returns:
+            使用参数 :table 的SQL语句，结果为 (索引名, 建索引语句)
+        """
+        return ("SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL")
+
+    @classmethod  # 删除索引
+    def build_drop_index(cls, index_name: str) -> str:
+        return f"DROP INDEX IF EXISTS {cls._check_identifier(index_name)}"
+
+    @classmethod  # 智能覆盖插入
+    def build_insert_or_update_data(cls,
+                                    table_name: DatabaseTables.TableName,
                                     data: dict,
                                     conflict_columns: list[str] = [],
-                                    ) -> str | None:
+                                    ) -> tuple[str, dict] | None:
         """
         生成支持智能覆盖的INSERT语句
         Args:
@@ -72,95 +201,254 @@ class SQLiteQueryBuilder:
             conflict_columns: 用于检测冲突的列（必须显式指定，无默认值）
 
         Returns:
-            带ON CONFLICT DO UPDATE的INSERT语句
+            (带ON CONFLICT DO UPDATE的INSERT语句, 命名参数)
         """
         try:
+            # conflict_columns合法性检测
+            if conflict_columns and not isinstance(conflict_columns, list):
+                return None
             # 提取所有有效字段（过滤掉None值）
             valid_data = {key: value for key,
                           value in data.items() if value is not None}
-            columns = list(valid_data.keys())
-
-            # 基础INSERT部分
-            sql = f"""
-            INSERT INTO {str(table_name.value)} ({', '.join(columns)})
-            VALUES ({', '.join(f':{col}' for col in columns)})
-            """
-            # 仅当显式指定 conflict_columns 时添加 ON CONFLICT 部分
-            if conflict_columns:
-                # conflict_columns合法性检测
-                if not isinstance(conflict_columns, list):
-                    return None
-                # 过滤掉 data 中不存在的列
-                valid_conflict_columns = [
-                    col for col in conflict_columns if col in data]
+            columns = tuple(cls._check_identifier(col) for col in valid_data)
+            # 过滤掉 data 中不存在的列
+            valid_conflict_columns = tuple(
+                col for col in conflict_columns if col in data)
+
+            def build() -> str:
+                # 基础INSERT部分
+                sql = (f"INSERT INTO {str(table_name.value)} ({', '.join(columns)}) "
+                       f"VALUES ({', '.join(f':{col}' for col in columns)})")
+                # 仅当显式指定 conflict_columns 时添加 ON CONFLICT 部分
                 if valid_conflict_columns:
                     # 构造ON CONFLICT DO UPDATE部分
                     update_cols = [f"{col}=excluded.{col}" for col in columns]
-                    sql += f"""
-                    ON CONFLICT ({', '.join(valid_conflict_columns)}) DO UPDATE SET {', '.join(update_cols)}
-                    """
+                    sql += (f" ON CONFLICT ({', '.join(valid_conflict_columns)})"
+                            f" DO UPDATE SET {', '.join(update_cols)}")
+                return sql
+            sql = cls._cached(("insert", table_name, columns, valid_conflict_columns), build)
         except Exception as e:
             raise AppError.Exception(
                 AppError.UnknownError, f"意外的错误：生成语句时出现异常{e}")
-        return sql.strip()
+        return sql, valid_data
+
+    @classmethod  # 写入完整数据行的SQL语句生成器
+    def build_upsert_row(cls,
+                         table_name: DatabaseTables.TableName,
+                         data: dict,
+                         conflict_columns: list[str]) -> tuple[str, dict]:
+        """
+        生成写入完整数据行的INSERT ... ON CONFLICT DO UPDATE语句
+        与build_insert_or_update_data不同，值为None的列写为NULL，冲突时覆盖原值
+        Args:
+            table_name: 表名
+            data: 要写入的数据字典
+            conflict_columns: 用于检测冲突的列
+        Returns:
+            (SQL语句, 命名参数)
+        """
+        columns = tuple(cls._check_identifier(col) for col in data)
+        conflicts = tuple(cls._check_identifier(col) for col in conflict_columns)
+        if not columns or not conflicts or not set(conflicts) <= set(columns):
+            raise AppError.Exception(
+                AppError.ParamNotFound, "意外的参数缺失：数据须包含全部冲突列")
 
-    @staticmethod  # 查询数据的SQL语句生成器
-    def build_select_table(table_name: DatabaseTables.TableName,
+        def build() -> str:
+            update_cols = [f"{col}=excluded.{col}" for col in columns if col not in conflicts]
+            return (f"INSERT INTO {table_name.value} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(f':{col}' for col in columns)}) "
+                    f"ON CONFLICT ({', '.join(conflicts)}) DO UPDATE SET {', '.join(update_cols)}")
+        return cls._cached(("upsert_row", table_name, columns, conflicts), build), dict(data)
+
+    @classmethod  # 查询数据的SQL语句生成器
+    def build_select_table(cls,
+                           table_name: DatabaseTables.TableName,
                            columns: list[str] | None = None,
                            where: dict | None = None,
                            order_by: str | None = None,
                            limit: int | None = None,
                            offset: int | None = None
-                           ) -> str:
+                           ) -> tuple[str, tuple]:
         """
         生成SELECT SQL查询语句
 
         参数:
             table_name: 表名
             columns: 要查询的列名列表，None表示所有列
-            where: WHERE条件字典 {列名: 值}
+            where: WHERE条件字典 {列名: 值} 或 {列名: (运算符, 值)}
             order_by: 排序字段，如 "id DESC"
             limit: 返回记录数限制
             offset: 偏移量
 
         返回:
-            构造的SQL查询字符串
+            (使用?占位符的SQL查询语句, 参数元组)
         """
-        # 处理列选择
         try:
-            if columns is None or len(columns) == 0:
-                column_clause = "*"
-            else:
-                column_clause = ", ".join(columns)
-            sql = f"SELECT {column_clause} FROM {str(table_name.value)}"
-            # 处理WHERE条件
-            if where and len(where) > 0:
-                conditions = []
-                for col, val in where.items():
-                    if isinstance(val, str):
-                        conditions.append(f"{col} = '{val}'")
-                    else:
-                        conditions.append(f"{col} = {val}")
-                sql += " WHERE " + " AND ".join(conditions)
-            # 处理排序
-            if order_by:
-                sql += f" ORDER BY {order_by}"
-            # 处理分页
+            column_names = tuple(cls._check_identifier(col) for col in columns or ())
+            conditions, params = cls._split_where(where or {})
+            params = list(params)
+            # 分页参数同样使用占位符，不同的分页取值共用同一条语句
             if limit is not None:
-                sql += f" LIMIT {limit}"
+                params.append(int(limit))
                 if offset is not None:
-                    sql += f" OFFSET {offset}"
+                    params.append(int(offset))
+
+            def build() -> str:
+                # 处理列选择
+                column_clause = ", ".join(column_names) if column_names else "*"
+                sql = f"SELECT {column_clause} FROM {str(table_name.value)}"
+                # 处理WHERE条件
+                if conditions:
+                    sql += " WHERE " + cls._build_where_clause(conditions)
+                # 处理排序
+                if order_by:
+                    sql += f" ORDER BY {order_by}"
+                # 处理分页
+                if limit is not None:
+                    sql += " LIMIT ?"
+                    if offset is not None:
+                        sql += " OFFSET ?"
+                return sql
+            shape = ("select", table_name, column_names, conditions, order_by,
+                     limit is not None, limit is not None and offset is not None)
+            sql = cls._cached(shape, build)
         except Exception as e:
             raise AppError.Exception(
                 AppError.UnknownError, f"意外的错误：生成语句时出现异常{e}")
-        return sql.strip()
+        return sql, tuple(params)
+
+    @classmethod  # 拆分WHERE条件
+    def _split_where(cls, where: dict) -> tuple[tuple[tuple[str, str], ...], tuple]:
+        """
+        将WHERE条件拆分为语句结构与参数
+        Args:
+            where: WHERE条件字典 {列名: 值} 或 {列名: (运算符, 值)}
+        Returns:
+            ((列名, 运算符), ...), (值, ...)
+        """
+        conditions = []
+        params = []
+        for col, val in where.items():
+            # 支持 (运算符, 值) 形式的比较条件，如 {"id": (">", 10)}
+            operator = "="
+            if isinstance(val, tuple):
+                operator, val = val
+                if operator not in cls._WHERE_OPERATORS:
+                    raise AppError.Exception(
+                        AppError.DatabaseError, f"不支持的WHERE运算符：{operator}")
+            conditions.append((cls._check_identifier(col), operator))
+            params.append(val)
+        return tuple(conditions), tuple(params)
+
+    @staticmethod  # WHERE条件
+    def _build_where_clause(conditions: tuple[tuple[str, str], ...]) -> str:
+        """
+        生成WHERE条件（不含WHERE关键字）
+        Args:
+            conditions: _split_where返回的 ((列名, 运算符), ...)
+        """
+        return " AND ".join(f"{col} {operator} ?" for col, operator in conditions)
 
-    @staticmethod  # 局部更新的SQL语句生成器
-    def build_update_table(table_name: DatabaseTables.TableName,
+    @classmethod  # 删除数据的SQL语句生成器
+    def build_delete_data(cls, table_name: DatabaseTables.TableName, where: dict) -> tuple[str, tuple]:
+        """
+        生成DELETE语句
+        Args:
+            table_name: 表名
+            where: WHERE条件字典，不允许为空以免误删整表
+        Returns:
+            (使用?占位符的SQL语句, 参数元组)
+        """
+        if not where:
+            raise AppError.Exception(
+                AppError.ParamNotFound, "意外的参数缺失where")
+        conditions, params = cls._split_where(where)
+        sql = cls._cached(
+            ("delete", table_name, conditions),
+            lambda: f"DELETE FROM {table_name.value} WHERE {cls._build_where_clause(conditions)}")
+        return sql, params
+
+    @staticmethod  # 原子认领待推送数据
+    def build_claim_rows(table_name: DatabaseTables.TableName) -> str:
+        """
+        生成原子认领待推送数据的 UPDATE ... RETURNING 语句
+        可认领的数据：待推送、已到重试时间的失败数据、租约已过期的认领数据
+        Args:
+            table_name: 表名
+        Returns:
+            按id顺序认领至多:limit条数据的SQL语句，参数为 :claimed :pending :failed :now :lease_until :limit
+        """
+        claimable = SQLiteQueryBuilder._claimable_clause()
+        target = (f"id IN (SELECT id FROM {table_name.value} WHERE {claimable}"
+                  " ORDER BY id ASC LIMIT :limit)")
+        return (f"UPDATE {table_name.value} "
+                "SET send_status = :claimed, lease_until = :lease_until, attempts = attempts + 1 "
+                f"WHERE {target} RETURNING *")
+
+    @staticmethod  # 是否存在可认领数据
+    def build_claimable_exists(table_name: DatabaseTables.TableName) -> str:
+        """
+        生成查询是否存在可认领数据的SQL语句（不认领）
+        Returns:
+            使用命名参数的SQL语句，参数为 :claimed :pending :failed :now
+        """
+        return f"SELECT 1 FROM {table_name.value} WHERE {SQLiteQueryBuilder._claimable_clause()} LIMIT 1"
+
+    @staticmethod
+    def _claimable_clause() -> str:
+        """可认领数据的条件：待推送、已到重试时间的失败数据、租约已过期的认领数据"""
+        # 前置的CLAIMABLE_CONDITION与部分索引条件一致，使认领只扫描尚未完成的数据
+        return (f"{DatabaseTables.CLAIMABLE_CONDITION} AND (send_status = :pending"
+                " OR (send_status = :failed AND next_retry_at <= :now)"
+                " OR (send_status = :claimed AND lease_until < :now))")
+
+    @staticmethod  # 结束认领
+    def build_finish_claim(table_name: DatabaseTables.TableName) -> str:
+        """
+        生成结束认领的UPDATE语句，仅当数据仍由本次认领持有（lease_until未变）时生效
+        Args:
+            table_name: 表名
+        Returns:
+            使用命名参数的SQL语句，参数为 :status :next_retry_at :last_error :delivered_targets
+            :id :claimed :lease_until（:delivered_targets为NULL时保留原值）
+        """
+        return (f"UPDATE {table_name.value} "
+                "SET send_status = :status, next_retry_at = :next_retry_at, last_error = :last_error, "
+                "delivered_targets = COALESCE(:delivered_targets, delivered_targets), lease_until = NULL "
+                "WHERE id = :id AND send_status = :claimed AND lease_until = :lease_until")
+
+    @staticmethod  # 从EMBY表回填外部ID映射
+    def build_backfill_external_ids(source_table: DatabaseTables.TableName, column: str) -> str:
+        """
+        生成从数据表回填EXTERNAL_ID_MAP的INSERT ... SELECT语句
+        同一外部ID取最新数据行的tmdb_id，仅写入缺失或tmdb_id不同的映射，映射未变化时不产生写入
+        Args:
+            source_table: 含tmdb_id及外部ID列的数据表
+            column: 外部ID列名，同时作为映射的来源名称
+        Returns:
+            使用命名参数的SQL语句，参数为 :source :now
+        """
+        if not column.isidentifier():
+            raise AppError.Exception(
+                AppError.DatabaseError, f"非法列名：{column}")
+        id_map = DatabaseTables.TableName.EXTERNAL_ID_MAP.value
+        latest = (f"SELECT MAX(id) FROM {source_table.value} "
+                  f"WHERE {column} IS NOT NULL AND {column} != '' AND tmdb_id IS NOT NULL "
+                  f"GROUP BY CAST({column} AS TEXT)")
+        return (f"INSERT INTO {id_map} (source, external_id, tmdb_id, updated_at) "
+                f"SELECT :source, CAST({column} AS TEXT), tmdb_id, :now FROM {source_table.value} "
+                f"WHERE id IN ({latest}) "
+                "ON CONFLICT (source, external_id) DO UPDATE SET "
+                "tmdb_id = excluded.tmdb_id, updated_at = excluded.updated_at "
+                f"WHERE excluded.tmdb_id IS NOT {id_map}.tmdb_id")
+
+    @classmethod  # 局部更新的SQL语句生成器
+    def build_update_table(cls,
+                           table_name: DatabaseTables.TableName,
                            update_columns: dict,
                            where: dict,
                            conflict_columns: list[str] = [],
-                           ) -> str:
+                           ) -> tuple[str, tuple]:
         """
         生成用于局部更新的SQL语句。
         Args:
@@ -170,7 +458,7 @@ class SQLiteQueryBuilder:
             conflict_columns (list[str], optional): 冲突处理列名列表，用于SQLite的ON CONFLICT语法。默认为空列表。
 
         Returns:
-            str: 生成的SQL更新语句。
+            tuple[str, tuple]: 使用?占位符的SQL更新语句及参数元组。
 
         Raises:
             AppError.Exception: 如果参数缺失或类型错误，抛出异常。
@@ -182,41 +470,28 @@ class SQLiteQueryBuilder:
         """
         try:
             # SET 部分
-            set_items = []
-            for col, val in update_columns.items():
-                if not isinstance(col, str) or not col.isidentifier():
-                    raise AppError.Exception(
-                        AppError.DatabaseError, f"非法列名：{col}")
-                formatted_val = f"'{val}'" if isinstance(val, str) else str(val)
-                set_items.append(f"{col}={formatted_val}")
-            set_clause = ", ".join(set_items)
-            # WHERE 部分
-            where_items = []
-            for col, val in where.items():
-                if not isinstance(col, str) or not col.isidentifier():
-                    raise AppError.Exception(
-                        AppError.DatabaseError, f"非法WHERE列名：{col}")
-                formatted_val = f"'{val}'" if isinstance(val, str) else str(val)
-                where_items.append(f"{col}={formatted_val}")
-            where_clause = " AND ".join(where_items)
+            set_columns = tuple(cls._check_identifier(col) for col in update_columns)
+            set_params = tuple(update_columns.values())
+            # WHERE 部分（仅支持等值条件）
+            where_columns = tuple(cls._check_identifier(col) for col in where)
+            where_params = tuple(where.values())
             # 冲突处理（SQLite语法）
-            conflict_clause = ""
-            if conflict_columns:
-                valid_conflict_cols = [
-                    col for col in conflict_columns
-                    if isinstance(col, str) and col.isidentifier()
-                ]
+            valid_conflict_cols = tuple(
+                col for col in conflict_columns
+                if isinstance(col, str) and col.isidentifier()
+            )
+
+            def build() -> str:
+                set_clause = ", ".join(f"{col}=?" for col in set_columns)
+                where_clause = " AND ".join(f"{col}=?" for col in where_columns)
+                sql = f"UPDATE {table_name.value} SET {set_clause} WHERE {where_clause}"
                 if valid_conflict_cols:
-                    conflict_clause = f"""
-                    ON CONFLICT ({', '.join(valid_conflict_cols)})
-                    DO UPDATE SET {set_clause}
-                    """
-            # 最终SQL组装
-            return f"""
-            UPDATE {table_name.value}
-            SET {set_clause}
-            WHERE {where_clause}
-            {conflict_clause}
-            """.strip()
+                    sql += f" ON CONFLICT ({', '.join(valid_conflict_cols)}) DO UPDATE SET {set_clause}"
+                return sql
+            sql = cls._cached(("update", table_name, set_columns, where_columns, valid_conflict_cols), build)
+            params = set_params + where_params
+            if valid_conflict_cols:
+                params += set_params
+            return sql, params
         except (AppError.Exception, Exception) as e:
             raise e
@@ -1,6 +1,15 @@
-from .requests import get_request
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .requests import HttpClient, download_image, get_request, sniff_image_format
+from .tmdb_cache import TmdbCache
 from .tmdb_client import TmdbClient
+
 __all__ = [
     "get_request",
+    "download_image",
+    "sniff_image_format",
+    "HttpClient",
+    "CircuitBreaker",
+    "CircuitOpenError",
     "TmdbClient",
+    "TmdbCache",
 ]
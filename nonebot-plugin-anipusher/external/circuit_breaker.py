@@ -0,0 +1,124 @@
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """熔断器处于打开状态，请求未发出即失败"""
+
+    def __init__(self, key: str, retry_in: float) -> None:
+        super().__init__(f"{key} 熔断中，{retry_in:.0f}秒后重试")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    单个上游线路的熔断器
+    closed：正常放行，连续失败达到阈值后打开
+    open：直接拒绝请求，等待RESET_TIMEOUT后进入half_open
+    half_open：仅放行一个试探请求，成功则关闭，失败则重新打开
+    仅网络错误、超时与5xx计为失败，其余响应说明上游可达，计为成功
+    """
+    FAILURE_THRESHOLD = 5  # 连续失败多少次后打开
+    RESET_TIMEOUT = 30  # 打开后多久允许试探（秒）
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    _breakers: dict[str, "CircuitBreaker"] = {}
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.state = self.CLOSED
+        self.failures = 0  # 连续失败次数
+        self.opened_at = 0.0
+        self.trial_inflight = False
+        self.trips = 0  # 累计打开次数
+        self.rejected = 0  # 累计被拒绝的请求数
+
+    @classmethod
+    def get(cls, host: str, proxy: str | None = None) -> "CircuitBreaker":
+        """
+        获取主机（及代理）对应的熔断器，直连与代理线路分别统计
+        键会在状态接口中展示，去除主机及代理地址中的用户名密码
+        """
+        host = host.rpartition("@")[2]
+        if proxy:
+            if "://" in proxy:
+                parts = urlsplit(proxy)
+                proxy = f"{parts.scheme}://{parts.netloc.rpartition('@')[2]}"
+            else:
+                proxy = proxy.rpartition("@")[2]
+        key = f"{host} via {proxy}" if proxy else host
+        breaker = cls._breakers.get(key)
+        if breaker is None:
+            breaker = cls._breakers[key] = cls(key)
+        return breaker
+
+    @classmethod
+    def stats(cls) -> dict:
+        """所有熔断器的状态与计数"""
+        return {
+            key: {
+                "state": breaker.state,
+                "failures": breaker.failures,
+                "trips": breaker.trips,
+                "rejected": breaker.rejected,
+            }
+            for key, breaker in cls._breakers.items()
+        }
+
+    def acquire(self) -> bool:
+        """
+        请求前检查是否放行
+        Returns:
+            本次请求是否为half_open状态下的试探请求
+        Raises:
+            CircuitOpenError: 熔断器打开或已有试探请求在进行中
+        """
+        if self.state == self.OPEN:
+            retry_in = self.opened_at + self.RESET_TIMEOUT - time.monotonic()
+            if retry_in > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.key, retry_in)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.trial_inflight:
+                self.rejected += 1
+                raise CircuitOpenError(self.key, 0)
+            self.trial_inflight = True
+            return True
+        return False
+
+    def release(self, ok: bool | None, trial: bool = False) -> None:
+        """
+        请求结束后记录结果
+        Args:
+            ok: 是否成功，None表示请求被取消等无法判断的情况，不计入统计
+            trial: acquire的返回值
+        """
+        if trial:
+            self.trial_inflight = False
+            if ok is None:
+                return
+            if ok:
+                self._close()
+            else:
+                self._open()
+            return
+        if ok is None or self.state != self.CLOSED:
+            return  # 打开前发出的请求不影响试探结果
+        if ok:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.FAILURE_THRESHOLD:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def _close(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
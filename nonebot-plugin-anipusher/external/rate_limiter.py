@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    异步令牌桶限流器
+    令牌按rate个/秒匀速补充，桶容量为burst，获取令牌时按先来后到排队等待
+    收到服务端限流响应时可通过pause暂停发放令牌，让所有调用方一起退避
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited = 0  # 需要排队等待的获取次数
+
+    def pause(self, seconds: float) -> None:
+        """暂停发放令牌至少seconds秒，暂停期间不补充令牌"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = self._paused_until
+
+    async def acquire(self, deadline: float | None = None) -> None:
+        """
+        获取一个令牌
+        Args:
+            deadline: time.monotonic()下的截止时间，为None时不限制
+        Raises:
+            asyncio.TimeoutError: 在截止时间前无法获得令牌
+        """
+        async with self._lock:  # 持锁等待，保证先到先得
+            wait = self._wait_time()
+            if wait > 0:
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise asyncio.TimeoutError("等待令牌将超过截止时间")
+                self.waited += 1
+                await asyncio.sleep(wait)
+                self._wait_time()
+            self._tokens -= 1
+
+    def stats(self) -> dict:
+        """限流器状态"""
+        self._refill()
+        return {
+            "rate": self.rate,
+            "tokens": round(self._tokens, 2),
+            "waited": self.waited,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now <= self._updated:  # 暂停中
+            return
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self) -> float:
+        """补充令牌并返回获得下一个令牌需要等待的时间"""
+        self._refill()
+        now = time.monotonic()
+        pause = max(0.0, self._paused_until - now)
+        shortage = max(0.0, 1 - self._tokens) / self.rate
+        return pause + shortage
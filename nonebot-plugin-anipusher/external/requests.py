@@ -1,5 +1,69 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from urllib.parse import urlsplit
+
 import aiohttp
 
+from ..exceptions import AppError
+from ..utils import BlockingIO
+from .circuit_breaker import CircuitBreaker
+
+# 图片文件头 → 格式
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+IMAGE_MAX_BYTES = 10 * 1024 * 1024  # 图片最大字节数
+IMAGE_CHUNK_SIZE = 64 * 1024  # 流式读取的分块大小
+IMAGE_WRITE_SIZE = 1024 * 1024  # 累积到该大小后在线程池中写入文件，避免逐块同步写入阻塞事件循环
+# 图片下载的超时设置，读取间隔比普通请求宽松，避免慢速线路下大图被中断
+IMAGE_TIMEOUT = aiohttp.ClientTimeout(
+    total=30,     # 总超时
+    connect=5,    # 连接超时
+    sock_read=10  # 读取超时
+)
+
+
+class HttpClient:
+    """
+    进程级共享的aiohttp会话管理
+    按代理地址区分会话，会话内复用TCP/TLS连接并缓存DNS解析结果
+    会话在首次请求时创建，随NoneBot驱动关闭时统一关闭
+    """
+    LIMIT = 100  # 单个会话的最大连接数
+    LIMIT_PER_HOST = 10  # 单个主机的最大连接数
+    DNS_TTL = 300  # DNS缓存时间（秒）
+    KEEPALIVE_TIMEOUT = 30  # 空闲连接保持时间（秒）
+    _sessions: dict[str | None, aiohttp.ClientSession] = {}
+
+    @classmethod
+    def get_session(cls, proxy: str | None = None) -> aiohttp.ClientSession:
+        """获取代理地址对应的共享会话，不存在或已关闭时创建"""
+        session = cls._sessions.get(proxy)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=cls.LIMIT,
+                limit_per_host=cls.LIMIT_PER_HOST,
+                ttl_dns_cache=cls.DNS_TTL,
+                keepalive_timeout=cls.KEEPALIVE_TIMEOUT,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            cls._sessions[proxy] = session
+        return session
+
+    @classmethod
+    async def close(cls) -> None:
+        """关闭所有共享会话"""
+        sessions = list(cls._sessions.values())
+        cls._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
 
 async def get_request(url: str,
                       headers: dict | None = None,
@@ -23,16 +87,153 @@ async def get_request(url: str,
         str: 当is_binary为False时返回文本数据
     Raises:
         aiohttp.ClientError: 网络请求错误
+        CircuitOpenError: 目标线路熔断中（aiohttp.ClientConnectionError的子类）
     """
     _DEFAULT_TIMEOUT = aiohttp.ClientTimeout(
         total=8,      # 总超时
         connect=5,    # 连接超时
         sock_read=2   # 读取超时
     )
-    async with aiohttp.ClientSession(timeout=timeout or _DEFAULT_TIMEOUT) as session:
-        async with session.get(url, headers=headers, params=params, proxy=proxy) as resp:
+    breaker = CircuitBreaker.get(urlsplit(url).netloc, proxy)
+    trial = breaker.acquire()  # 熔断中直接失败，不再等待超时
+    ok = None
+    try:
+        session = HttpClient.get_session(proxy)
+        async with session.get(url, headers=headers, params=params, proxy=proxy,
+                               timeout=timeout or _DEFAULT_TIMEOUT) as resp:
             resp.raise_for_status()  # 如果状态码不是 2XX，就主动抛出异常
             if is_binary:
-                return await resp.read()  # 返回 bytes（用于图片/文件）
+                content: bytes | str = await resp.read()  # 返回 bytes（用于图片/文件）
             else:
-                return await resp.text()  # 返回文本（默认行为）
+                content = await resp.text()  # 返回文本（默认行为）
+        ok = True
+        return content
+    except aiohttp.ClientResponseError as e:
+        ok = e.status < 500  # 非5xx响应说明上游可达
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        ok = False
+        raise
+    finally:
+        breaker.release(ok, trial)
+
+
+def sniff_image_format(head: bytes) -> str | None:
+    """
+    根据文件头判断图片格式
+    Args:
+        head: 文件开头至少12个字节
+    Returns:
+        图片格式（jpg/png/gif/bmp/webp），不是图片时返回None
+    """
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+async def download_image(url: str,
+                         dest: Path,
+                         headers: dict | None = None,
+                         proxy: str | None = None,
+                         validators: dict | None = None,
+                         max_bytes: int = IMAGE_MAX_BYTES,
+                         timeout: aiohttp.ClientTimeout | None = None
+                         ) -> dict | None:
+    """
+    流式下载图片到指定文件
+    分块读取，累积至IMAGE_WRITE_SIZE后在线程池中写入文件，不在内存中缓存完整响应；
+    超过max_bytes或内容不是图片时中止并删除已写入的文件
+    提供validators时发送条件请求，图片未变化（304）时不写入文件
+
+    Args:
+        url: 图片URL
+        dest: 写入的文件路径（通常为临时文件）
+        headers: 请求头
+        proxy: 代理地址
+        validators: 上次下载时保存的校验信息 {"etag": ..., "last_modified": ...}
+        max_bytes: 允许的最大字节数
+        timeout: 自定义超时设置，默认使用IMAGE_TIMEOUT
+    Returns:
+        dict: {"format": 图片格式, "sha256": 内容摘要, "etag": ETag, "last_modified": Last-Modified}
+        None: 条件请求返回304，图片未变化
+    Raises:
+        aiohttp.ClientError: 网络请求错误
+        AppError.Exception: 图片超过大小限制或内容不是图片
+    """
+    breaker = CircuitBreaker.get(urlsplit(url).netloc, proxy)
+    trial = breaker.acquire()
+    ok = None
+    completed = False
+    request_headers = dict(headers or {})
+    if validators:
+        if validators.get("etag"):
+            request_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            request_headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        session = HttpClient.get_session(proxy)
+        async with session.get(url, headers=request_headers, proxy=proxy,
+                               timeout=timeout or IMAGE_TIMEOUT) as resp:
+            resp.raise_for_status()
+            ok = True  # 上游已正常响应，之后的内容校验失败不计入熔断
+            if resp.status == 304:
+                return None
+            if resp.content_length is not None and resp.content_length > max_bytes:
+                raise AppError.Exception(
+                    AppError.InvalidLength, f"图片大小 {resp.content_length} 字节超过上限 {max_bytes} 字节")
+            size = 0
+            head = b""
+            image_format = None
+            digest = hashlib.sha256()  # 边下载边计算摘要，供内容寻址存储使用
+            buffer: list[bytes] = []
+            buffered = 0
+            file = await BlockingIO.run(dest.open, "wb")
+            try:
+                async for chunk in resp.content.iter_chunked(IMAGE_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise AppError.Exception(
+                            AppError.InvalidLength, f"图片大小超过上限 {max_bytes} 字节")
+                    if image_format is None:
+                        head += chunk[:12]
+                        if len(head) >= 12:
+                            image_format = sniff_image_format(head)
+                            if image_format is None:
+                                raise AppError.Exception(
+                                    AppError.RequestInvalidResponse,
+                                    f"返回内容不是图片（Content-Type: {resp.content_type}）")
+                    digest.update(chunk)
+                    buffer.append(chunk)
+                    buffered += len(chunk)
+                    if buffered >= IMAGE_WRITE_SIZE:
+                        await BlockingIO.run(file.write, b"".join(buffer))
+                        buffer, buffered = [], 0
+                if buffer:
+                    await BlockingIO.run(file.write, b"".join(buffer))
+            finally:
+                await asyncio.shield(BlockingIO.run(file.close))
+            if image_format is None:
+                image_format = sniff_image_format(head)  # 小于12字节的响应
+                if image_format is None:
+                    raise AppError.Exception(
+                        AppError.RequestInvalidResponse, f"返回内容不是图片（{size} 字节）")
+        completed = True
+        return {
+            "format": image_format,
+            "sha256": digest.hexdigest(),
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+    except aiohttp.ClientResponseError as e:
+        ok = e.status < 500
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        ok = False
+        raise
+    finally:
+        breaker.release(ok, trial)
+        if not completed:
+            dest.unlink(missing_ok=True)
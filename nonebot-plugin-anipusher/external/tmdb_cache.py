@@ -0,0 +1,163 @@
+import json
+import time
+from collections import OrderedDict
+
+from nonebot import logger
+
+from ..database import DatabaseService, DatabaseTables
+
+
+class TmdbCache:
+    """
+    TMDB响应两级缓存
+    内存LRU在前，数据库TMDB_CACHE表在后，按接口类型设置过期时间
+    "未找到"（status_code 34、find/结果全空、search/结果为空）的结果以较短的过期时间做否定缓存，
+    避免新条目在正常过期时间内一直无法解析；过期数据定期从数据库清理
+    """
+    MEMORY_SIZE = 512  # 内存缓存最大条目数
+    # 接口路径前缀 → 过期时间（秒），未匹配的接口使用DEFAULT_TTL
+    ENDPOINT_TTL = {
+        "find/": 30 * 24 * 3600,  # 外部ID映射几乎不会变化
+        "search/": 6 * 3600,
+    }
+    DEFAULT_TTL = 24 * 3600  # 详情类接口
+    NEGATIVE_TTL = 3600  # 否定缓存
+    PURGE_INTERVAL = 24 * 3600  # 写入缓存时清理过期数据的最小间隔（秒）
+    _memory: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+    _hits = 0
+    _misses = 0
+    _last_purge = 0.0
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict | None = None) -> str:
+        """由接口路径与查询参数生成缓存键"""
+        endpoint = endpoint.lstrip("/")
+        if not params:
+            return endpoint
+        return f"{endpoint}#{json.dumps(params, sort_keys=True, ensure_ascii=False)}"
+
+    @staticmethod
+    def is_negative(endpoint: str, payload: dict) -> bool:
+        """
+        判断响应是否为"未找到"结果
+        Args:
+            endpoint: 接口路径
+            payload: 响应数据
+        """
+        if payload.get("status_code") == 34 or payload.get("success") is False:
+            return True
+        endpoint = endpoint.lstrip("/").lower()
+        if endpoint.startswith("find/"):
+            results = [value for key, value in payload.items() if key.endswith("_results")]
+            return bool(results) and not any(results)
+        if endpoint.startswith("search/"):
+            return "results" in payload and not payload["results"]
+        return False
+
+    @classmethod
+    def ttl_for(cls, endpoint: str, negative: bool) -> int:
+        if negative:
+            return cls.NEGATIVE_TTL
+        endpoint = endpoint.lstrip("/").lower()
+        for prefix, ttl in cls.ENDPOINT_TTL.items():
+            if endpoint.startswith(prefix):
+                return ttl
+        return cls.DEFAULT_TTL
+
+    @classmethod
+    async def get(cls, key: str) -> dict | None:
+        """读取缓存，未命中或已过期返回None"""
+        now = time.time()
+        if (entry := cls._memory.get(key)) is not None:
+            if entry[0] > now:
+                cls._memory.move_to_end(key)
+                cls._hits += 1
+                return entry[1]
+            del cls._memory[key]
+        try:
+            rows = list(await DatabaseService.select_data(
+                table_name=DatabaseTables.TableName.TMDB_CACHE,
+                columns=["payload", "expires_at"],
+                where={"cache_key": key, "expires_at": (">", now)}))
+        except Exception as e:
+            logger.opt(colors=True).warning(f"<y>TMDB</y>：读取缓存失败：{e}")
+            rows = []
+        if not rows:
+            cls._misses += 1
+            return None
+        payload = json.loads(rows[0][0])
+        cls._remember(key, float(rows[0][1]), payload)
+        cls._hits += 1
+        return payload
+
+    @classmethod
+    async def set(cls, key: str, endpoint: str, payload: dict) -> None:
+        """写入缓存（内存及数据库）"""
+        negative = cls.is_negative(endpoint, payload)
+        expires_at = time.time() + cls.ttl_for(endpoint, negative)
+        cls._remember(key, expires_at, payload)
+        try:
+            await DatabaseService.upsert_data(
+                DatabaseTables.TableName.TMDB_CACHE,
+                {
+                    "cache_key": key,
+                    "endpoint": endpoint,
+                    "payload": json.dumps(payload, ensure_ascii=False),
+                    "negative": int(negative),
+                    "expires_at": expires_at,
+                },
+                conflict_columns=["cache_key"])
+        except Exception as e:
+            logger.opt(colors=True).warning(f"<y>TMDB</y>：写入缓存失败：{e}")
+        if time.time() - cls._last_purge >= cls.PURGE_INTERVAL:
+            try:
+                await cls.purge_expired()
+            except Exception as e:
+                logger.opt(colors=True).warning(f"<y>TMDB</y>：清理过期缓存失败：{e}")
+
+    @classmethod
+    async def purge_expired(cls) -> int:
+        """
+        删除数据库中已过期的缓存
+        Returns:
+            删除的条目数
+        """
+        now = cls._last_purge = time.time()
+        for key in [key for key, (expires_at, _) in cls._memory.items() if expires_at <= now]:
+            del cls._memory[key]
+        return await DatabaseService.delete_data(
+            DatabaseTables.TableName.TMDB_CACHE, {"expires_at": ("<=", now)})
+
+    @classmethod
+    async def warm(cls) -> int:
+        """
+        从数据库加载未过期的缓存到内存
+        Returns:
+            加载的条目数
+        """
+        rows = await DatabaseService.select_data(
+            table_name=DatabaseTables.TableName.TMDB_CACHE,
+            columns=["cache_key", "payload", "expires_at"],
+            where={"expires_at": (">", time.time())},
+            order_by="expires_at DESC",
+            limit=cls.MEMORY_SIZE)
+        count = 0
+        for key, payload, expires_at in rows:
+            try:
+                cls._remember(key, float(expires_at), json.loads(payload))
+                count += 1
+            except (TypeError, ValueError):
+                continue
+        return count
+
+    @classmethod
+    def stats(cls) -> dict:
+        """缓存命中统计"""
+        return {"memory_entries": len(cls._memory), "hits": cls._hits, "misses": cls._misses}
+
+    @classmethod
+    def _remember(cls, key: str, expires_at: float, payload: dict) -> None:
+        cls._memory[key] = (expires_at, payload)
+        cls._memory.move_to_end(key)
+        while len(cls._memory) > cls.MEMORY_SIZE:
+            cls._memory.popitem(last=False)
@@ -1,23 +1,43 @@
 
+import asyncio
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Literal
+
+import aiohttp
+from nonebot import logger
+
 from ..config import APPCONFIG, FUNCTION
 from ..exceptions import AppError
+from ..utils import SingleFlight
+from .circuit_breaker import CircuitOpenError
+from .rate_limiter import TokenBucket
 from .requests import get_request
-import aiohttp
-import json
-from typing import Literal
+from .tmdb_cache import TmdbCache
 
 
 class TmdbClient:
+    ATTEMPT_TIMEOUT = 8  # 单次请求的最长时间（秒）
+    RETRY_BASE = 0.5  # 重试退避基础间隔（秒），按重试次数指数增长并加入随机抖动
+    RETRY_MAX_DELAY = 8  # 重试退避最大间隔（秒）
+    _single_flight = SingleFlight()  # 合并相同的并发请求
+    _limiter: TokenBucket | None = None  # 所有TMDB请求共享的令牌桶
+    _retries = 0  # 累计重试次数
+
     @staticmethod
     async def _request_tmdb_api(
         endpoint: str,
-        params: dict | None = None
+        params: dict | None = None,
+        timeout: float | None = None
     ) -> dict | None:
         """
-        异步请求TMDB API
+        异步请求TMDB API，优先读取缓存，相同的并发请求只发起一次
         Args:
             endpoint: API端点路径 (如 "find/123")
             params: 查询参数字典
+            timeout: 本次调用的截止时长（秒），包含限流等待与重试，默认使用配置值
         Returns:
             解析后的JSON数据字典
         Raises:
@@ -26,32 +46,139 @@ class TmdbClient:
         if not FUNCTION.tmdb_enabled:
             raise AppError.Exception(
                 AppError.UnExpectedMethod, "TMDB功能未启用")
+        cache_key = TmdbCache.make_key(endpoint, params)
+        if (cached := await TmdbCache.get(cache_key)) is not None:
+            return cached
+        if timeout is None:
+            timeout = APPCONFIG.tmdb_timeout
+        deadline = time.monotonic() + timeout
+
+        async def fetch_and_cache() -> dict | None:
+            result = await TmdbClient._fetch_tmdb_api(endpoint, params, deadline)
+            if isinstance(result, dict):
+                await TmdbCache.set(cache_key, endpoint, result)
+            return result
+        try:
+            # 等待超时不会取消共享的请求，其他调用方仍可获得结果
+            return await asyncio.wait_for(
+                TmdbClient._single_flight.do(cache_key, fetch_and_cache), timeout)
+        except asyncio.TimeoutError:
+            raise AppError.Exception(
+                AppError.RequestTimeout, f"TMDB请求超过截止时间（{timeout}秒）：{endpoint}")
+
+    @staticmethod
+    def stats() -> dict:
+        """请求合并、重试与限流统计"""
+        return {
+            **TmdbClient._single_flight.stats(),
+            "retries": TmdbClient._retries,
+            "limiter": TmdbClient._get_limiter().stats(),
+        }
+
+    @staticmethod
+    def _get_limiter() -> TokenBucket:
+        """获取共享令牌桶，首次使用时按配置创建"""
+        if TmdbClient._limiter is None:
+            rate = APPCONFIG.tmdb_rate_limit
+            TmdbClient._limiter = TokenBucket(rate, burst=max(1, int(rate)))
+        return TmdbClient._limiter
+
+    @staticmethod
+    def _parse_retry_after(headers) -> float | None:
+        """解析Retry-After响应头（秒数或HTTP日期），无法解析时返回None"""
+        value = headers.get("Retry-After") if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """第attempt次重试前的等待时间（指数退避，一半固定一半随机）"""
+        delay = min(TmdbClient.RETRY_BASE * 2 ** (attempt - 1), TmdbClient.RETRY_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    async def _fetch_tmdb_api(
+        endpoint: str,
+        params: dict | None = None,
+        deadline: float | None = None
+    ) -> dict | None:
+        """
+        请求TMDB API（不经过缓存）
+        每次请求前从共享令牌桶获取令牌，遇到429/5xx/网络错误时按退避间隔重试
+        429响应优先按Retry-After等待，并暂停令牌桶使其他请求一同退避
+        Args:
+            deadline: time.monotonic()下的截止时间，重试等待不会超过该时间
+        """
         url = f"https://api.themoviedb.org/3/{endpoint.lstrip('/')}"
         headers = {
             "accept": "application/json",
             "Authorization": f"Bearer {APPCONFIG.tmdb_authorization}"
         }
-        try:
-            response = await get_request(
-                url,
-                headers=headers,
-                params=params,
-                proxy=APPCONFIG.proxy
-            )
-            if not response:
+        limiter = TmdbClient._get_limiter()
+        attempt = 0
+        while True:
+            try:
+                await limiter.acquire(deadline)
+            except asyncio.TimeoutError:
+                raise AppError.Exception(
+                    AppError.RequestTimeout, "TMDB限流等待将超过截止时间")
+            remaining = TmdbClient.ATTEMPT_TIMEOUT if deadline is None else deadline - time.monotonic()
+            retry_after = None
+            try:
+                response = await get_request(
+                    url,
+                    headers=headers,
+                    params=params,
+                    proxy=APPCONFIG.proxy,
+                    timeout=aiohttp.ClientTimeout(
+                        total=max(0.1, min(TmdbClient.ATTEMPT_TIMEOUT, remaining)),
+                        connect=5,
+                        sock_read=2)
+                )
+                break
+            except CircuitOpenError as e:
                 raise AppError.Exception(
-                    AppError.ResponseNotFound, "未获取到返回数据")
-            if not isinstance(response, str):
+                    AppError.RequestError, f"网络请求失败: {str(e)}")
+            except aiohttp.ClientResponseError as e:
+                # 404为TMDB的"资源不存在"，转换为对应的响应体以便否定缓存
+                if e.status == 404:
+                    return {"success": False, "status_code": 34, "status_message": e.message}
+                if e.status != 429 and e.status < 500:
+                    raise AppError.Exception(
+                        AppError.RequestError, f"网络请求失败: {str(e)}")
+                retry_after = TmdbClient._parse_retry_after(e.headers)
+                if e.status == 429:
+                    limiter.pause(retry_after if retry_after is not None else TmdbClient._backoff(attempt + 1))
+                error: Exception = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            except Exception as e:
                 raise AppError.Exception(
-                    AppError.UnSupportedType, "返回数据类型错误！")
-        except aiohttp.ClientError as e:
+                    AppError.UnknownError, f"发生未知错误: {str(e)}")
+            attempt += 1
+            delay = retry_after if retry_after is not None else TmdbClient._backoff(attempt)
+            if attempt > APPCONFIG.tmdb_max_retries or (
+                    deadline is not None and time.monotonic() + delay >= deadline):
+                raise AppError.Exception(
+                    AppError.RequestError, f"网络请求失败（已尝试{attempt}次）: {type(error).__name__}: {error}")
+            TmdbClient._retries += 1
+            logger.opt(colors=True).warning(
+                f"<y>TMDB</y>：请求失败（{type(error).__name__}: {error}），{delay:.1f}秒后进行第{attempt}次重试")
+            await asyncio.sleep(delay)
+        if not response:
             raise AppError.Exception(
-                AppError.RequestError, f"网络请求失败: {str(e)}")
-        except AppError.Exception as e:
-            raise e
-        except Exception as e:
+                AppError.ResponseNotFound, "未获取到返回数据")
+        if not isinstance(response, str):
             raise AppError.Exception(
-                AppError.UnknownError, f"发生未知错误: {str(e)}")
+                AppError.UnSupportedType, "返回数据类型错误！")
         try:
             return json.loads(response)
         except json.JSONDecodeError as e:
@@ -62,7 +189,7 @@ class TmdbClient:
                 AppError.UnknownError, f"发生未知错误: {type(e).__name__}: {str(e)}")
 
     @staticmethod
-    async def find_by_external_id(id: str, source: str) -> dict | None:
+    async def find_by_external_id(id: str, source: str, timeout: float | None = None) -> dict | None:
         """异步通过外部ID查找"""
         # 判断ID是否为空
         if not id:
@@ -73,10 +200,12 @@ class TmdbClient:
             raise AppError.Exception(
                 AppError.MissingData, "参数缺失！缺少 source 字段")
         endpoint = f"find/{id}?external_source={source}"
-        return await TmdbClient._request_tmdb_api(endpoint)
+        return await TmdbClient._request_tmdb_api(endpoint, timeout=timeout)
 
     @staticmethod
-    async def get_id_details(id: int, type: Literal["Movie", "Episode", "Series"] = "Episode") -> dict | None:
+    async def get_id_details(id: int,
+                             type: Literal["Movie", "Episode", "Series"] = "Episode",
+                             timeout: float | None = None) -> dict | None:
         """异步获取ID的详细信息"""
         if not id:
             raise AppError.Exception(
@@ -86,10 +215,10 @@ class TmdbClient:
                 AppError.UnSupportedType, "参数类型错误！ID 应为int类型")
 
         endpoint = f"{type}/{id}"
-        return await TmdbClient._request_tmdb_api(endpoint)
+        return await TmdbClient._request_tmdb_api(endpoint, timeout=timeout)
 
     @staticmethod
-    async def search_by_multi(query: str) -> dict | None:
+    async def search_by_multi(query: str, timeout: float | None = None) -> dict | None:
         """异步通过多条件搜索"""
         if not query:
             raise AppError.Exception(
@@ -98,4 +227,4 @@ class TmdbClient:
             raise AppError.Exception(
                 AppError.UnSupportedType, "参数类型错误！query应为str类型")
         endpoint = f"search/multi?query={query}&include_adult=true&language=zh-CN&page=1"
-        return await TmdbClient._request_tmdb_api(endpoint)
+        return await TmdbClient._request_tmdb_api(endpoint, timeout=timeout)
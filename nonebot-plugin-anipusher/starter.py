@@ -1,7 +1,5 @@
-
 from nonebot import get_driver
 
-
 driver = get_driver()
 
 
@@ -14,5 +12,43 @@ async def init_webhook():
     from .core.monitor_core.monitor import Monitor
     moniter = Monitor()
     await moniter.start_monitor()
+    # 启动积压数据补发
+    from .config import APPCONFIG
+    from .core.push_core import BacklogDrainer
+    await BacklogDrainer.start(APPCONFIG.backlog_interval,
+                               APPCONFIG.backlog_batch_size,
+                               APPCONFIG.backlog_max_push)
+    # 启动上游服务探测
+    from .core.upstream_prober import UpstreamProber
+    await UpstreamProber.start(APPCONFIG.probe_interval)
     # 启动命令匹配
     from .core import commands_core
+
+
+@driver.on_bot_connect
+async def drain_backlog_on_connect():
+    # Bot连接后补发积压数据（启动时尚无Bot连接，补发会被跳过）
+    from .core.push_core import BacklogDrainer
+    BacklogDrainer.trigger()
+
+
+@driver.on_shutdown
+async def close_webhook():
+    # 停止webhook接收队列
+    from .core.monitor_core.monitor import Monitor
+    await Monitor.stop_monitor()
+    # 停止积压数据补发
+    from .core.push_core import BacklogDrainer
+    await BacklogDrainer.stop()
+    # 停止上游服务探测
+    from .core.upstream_prober import UpstreamProber
+    await UpstreamProber.stop()
+    # 取消进行中的图片预取
+    from .core.push_core import ImageProcessor
+    await ImageProcessor.stop_prefetch()
+    # 关闭共享的HTTP会话
+    from .external import HttpClient
+    await HttpClient.close()
+    # 关闭阻塞IO线程池
+    from .utils import BlockingIO
+    BlockingIO.shutdown()
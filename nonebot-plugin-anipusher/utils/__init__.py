@@ -1,8 +1,13 @@
-from .file_io import JsonIO
-from .emby_utlis import EmbyUtils
+from .blocking_io import BlockingIO
 from .common_utlis import CommonUtils
+from .emby_utlis import EmbyUtils
+from .file_io import JsonIO
+from .single_flight import SingleFlight
+
 __all__ = [
     "JsonIO",
     "CommonUtils",
     "EmbyUtils",
+    "SingleFlight",
+    "BlockingIO",
 ]
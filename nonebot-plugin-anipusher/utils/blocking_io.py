@@ -0,0 +1,37 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class BlockingIO:
+    """
+    阻塞IO线程池
+    文件读写、base64编码等同步操作统一交由容量有限的线程池执行，避免阻塞事件循环
+    """
+    MAX_WORKERS = 4  # 最大线程数
+    _executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    async def run(cls, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行同步函数
+        Args:
+            func: 同步函数
+            *args, **kwargs: 函数参数
+        Returns:
+            func的返回值
+        """
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=cls.MAX_WORKERS, thread_name_prefix="anipusher_io")
+        return await asyncio.get_running_loop().run_in_executor(
+            cls._executor, functools.partial(func, *args, **kwargs))
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """关闭线程池，等待已提交的任务完成"""
+        if cls._executor is None:
+            return
+        cls._executor.shutdown(wait=True)
+        cls._executor = None
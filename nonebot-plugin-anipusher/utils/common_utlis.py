@@ -1,11 +1,19 @@
-from datetime import datetime, timedelta
-from ..exceptions import AppError
 import base64
-from urllib.parse import urlparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlparse
+
+from ..exceptions import AppError
+from .blocking_io import BlockingIO
+from .single_flight import SingleFlight
 
 
 class CommonUtils:
+    BASE64_CACHE_SIZE = 8  # 最多缓存多少张图片的base64编码
+    _base64_cache: "OrderedDict[tuple[Path, float], str]" = OrderedDict()  # (路径, 修改时间) → 编码结果
+    _base64_flight = SingleFlight()  # 同一图片的并发编码只执行一次
+
     @staticmethod  # 获取时间戳
     def get_timestamp() -> str:
         try:
@@ -23,6 +31,27 @@ class CommonUtils:
             base64_data = base64.b64encode(f.read()).decode("utf-8")
         return f"base64://{base64_data}"
 
+    @classmethod
+    async def img_to_base64_cached(cls, img_path: str | Path) -> str:
+        """
+        在线程池中将图片编码为base64，并按(路径, 修改时间)缓存编码结果
+        同一张图片推送给多个目标或多次推送时只编码一次，图片更新后自动重新编码
+        """
+        file_path = Path(img_path)
+        try:
+            mtime = (await BlockingIO.run(file_path.stat)).st_mtime
+        except OSError:
+            raise AppError.Exception(AppError.TargetNotFound, "图片路径不存在")
+        key = (file_path, mtime)
+        if (data := cls._base64_cache.get(key)) is not None:
+            cls._base64_cache.move_to_end(key)
+            return data
+        data = await cls._base64_flight.do(key, lambda: BlockingIO.run(cls.img_to_base64, file_path))
+        cls._base64_cache[key] = data
+        while len(cls._base64_cache) > cls.BASE64_CACHE_SIZE:
+            cls._base64_cache.popitem(last=False)
+        return data
+
     @staticmethod
     def is_url(item: str) -> bool:
         try:
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    合并相同key的并发调用
+    同一时刻相同key只执行一次，其余调用者等待并共享同一个结果（或异常）
+    发起者被取消时不会影响其他等待者
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.executed = 0  # 实际执行次数
+        self.coalesced = 0  # 被合并的调用次数
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入key对应的调用
+        Args:
+            key: 调用标识
+            func: 无参协程函数
+        Returns:
+            func的返回值
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            self.executed += 1
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._on_done(key, f))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def inflight(self) -> int:
+        """正在执行中的调用数量"""
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        """合并统计"""
+        return {"executed": self.executed, "coalesced": self.coalesced, "inflight": self.inflight()}
+
+    def _on_done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 所有等待者都被取消时避免"exception was never retrieved"警告
+        if not future.cancelled():
+            future.exception()
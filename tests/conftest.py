@@ -0,0 +1,29 @@
+"""
+测试公共配置
+插件目录名含连字符且导入时会注册NoneBot启动钩子，这里初始化NoneBot后将插件目录注册为不执行__init__的包anipusher，
+测试直接导入被测模块
+"""
+import sys
+import types
+from pathlib import Path
+
+import nonebot
+import pytest
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent / "nonebot-plugin-anipusher"
+
+nonebot.init()
+if "anipusher" not in sys.modules:
+    package = types.ModuleType("anipusher")
+    package.__path__ = [str(PLUGIN_DIR)]
+    sys.modules["anipusher"] = package
+
+
+@pytest.fixture
+async def database(tmp_path):
+    """使用临时数据库文件，测试结束后关闭连接池"""
+    from anipusher.config import WORKDIR
+    from anipusher.database import DatabaseManager
+    WORKDIR.data_file = tmp_path / "test.db"
+    yield WORKDIR.data_file
+    await DatabaseManager.close_pool()
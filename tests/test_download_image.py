@@ -0,0 +1,44 @@
+import hashlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from anipusher.external import requests
+from anipusher.external.circuit_breaker import CircuitBreaker
+from anipusher.external.requests import HttpClient, download_image
+
+BODY = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * (3 * 4096)  # 约3MB
+
+
+@pytest.fixture
+async def server(monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, "_breakers", {})
+
+    async def image(request):
+        return web.Response(body=BODY, content_type="image/png", headers={"ETag": '"E1"'})
+
+    app = web.Application()
+    app.router.add_get("/poster.png", image)
+    async with TestServer(app) as test_server:
+        yield test_server
+    await HttpClient.close()
+
+
+async def test_writes_run_off_the_event_loop(server, tmp_path, monkeypatch):
+    calls = []
+    run = requests.BlockingIO.run
+
+    async def tracked(func, *args, **kwargs):
+        calls.append(getattr(func, "__name__", repr(func)))
+        return await run(func, *args, **kwargs)
+
+    monkeypatch.setattr(requests.BlockingIO, "run", tracked)
+    dest = tmp_path / "poster.tmp"
+    result = await download_image(str(server.make_url("/poster.png")), dest)
+    assert result["format"] == "png"
+    assert result["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert result["etag"] == '"E1"'
+    assert dest.read_bytes() == BODY
+    # 按IMAGE_WRITE_SIZE批量写入，而不是逐块写入
+    assert 1 <= calls.count("write") <= len(BODY) // requests.IMAGE_WRITE_SIZE + 1
+    assert calls[0] == "open" and calls[-1] == "close"
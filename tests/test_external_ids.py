@@ -0,0 +1,23 @@
+import pytest
+from anipusher.database import DatabaseService, DatabaseTables, ExternalIdMap
+from anipusher.database.db_operations import DatabaseSchemaManager
+
+EMBY = DatabaseTables.TableName.EMBY
+
+
+@pytest.fixture
+async def tables(database):
+    await DatabaseSchemaManager.create_table(EMBY)
+    await DatabaseSchemaManager.create_table(DatabaseTables.TableName.EXTERNAL_ID_MAP)
+
+
+async def test_backfill_writes_only_missing_or_changed_mappings(tables):
+    await DatabaseService.upsert_data(EMBY, {"title": "a", "tmdb_id": "100", "imdb_id": "tt1", "tvdb_id": "7"})
+    await DatabaseService.upsert_data(EMBY, {"title": "b", "tmdb_id": "200", "imdb_id": "tt2"})
+    assert await ExternalIdMap.backfill() == 3
+    assert await ExternalIdMap.backfill() == 0  # 映射未变化，重启时不再写入
+    # 同一外部ID以最新数据行为准
+    await DatabaseService.upsert_data(EMBY, {"title": "c", "tmdb_id": "300", "imdb_id": "tt1"})
+    assert await ExternalIdMap.backfill() == 1
+    assert await ExternalIdMap.get("imdb_id", "tt1") == 300
+    assert await ExternalIdMap.get("tvdb_id", "7") == 100
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from anipusher.config import APPCONFIG, WORKDIR
+from anipusher.core.push_core.image_service import ImageProcessor
+
+
+class FakeDownloads:
+    """按地址控制下载完成时机与结果"""
+
+    def __init__(self) -> None:
+        self.gates: dict[str, asyncio.Event] = {}
+        self.failures: set[str] = set()
+        self.started: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def __call__(self, url: str, source: str, temp_path):
+        self.started.append(url)
+        try:
+            await self.gates.setdefault(url, asyncio.Event()).wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        if url in self.failures:
+            raise ConnectionError(url)
+        temp_path.write_bytes(url.encode())
+        return temp_path, {"url": url, "source": source}
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    fake = FakeDownloads()
+    monkeypatch.setattr(WORKDIR, "cache_dir", tmp_path)
+    monkeypatch.setattr(ImageProcessor, "_download_to", staticmethod(fake))
+    return fake
+
+
+async def settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+URLS = {"primary": "EMBY", "secondary": "ANI_RSS", "tertiary": "ANI_RSS"}
+
+
+async def test_failure_launches_next_candidate(downloads, monkeypatch):
+    monkeypatch.setattr(APPCONFIG, "image_hedge_delay", 60)
+    task = asyncio.create_task(ImageProcessor([])._download_first_valid_image(URLS))
+    await settle()
+    assert downloads.started == ["primary"]
+    downloads.failures.add("primary")
+    downloads.gates["primary"].set()
+    await settle()
+    assert downloads.started == ["primary", "secondary"]
+    downloads.gates["secondary"].set()
+    path, meta = await task
+    assert meta["url"] == "secondary"
+    assert path.read_bytes() == b"secondary"
+
+
+async def test_prefers_higher_priority_result(downloads, monkeypatch):
+    monkeypatch.setattr(APPCONFIG, "image_hedge_delay", 0)
+    task = asyncio.create_task(ImageProcessor([])._download_first_valid_image(URLS))
+    await settle()
+    assert downloads.started == ["primary", "secondary", "tertiary"]
+    downloads.gates["secondary"].set()
+    await settle()
+    assert not task.done()  # 更高优先级的下载仍在进行
+    downloads.gates["primary"].set()
+    path, meta = await task
+    assert meta["url"] == "primary"
+    assert downloads.cancelled == ["tertiary"]
+    assert [file.name for file in path.parent.iterdir()] == [path.name]  # 未采用的临时文件已删除
+
+
+async def test_all_failed_returns_none(downloads, monkeypatch):
+    monkeypatch.setattr(APPCONFIG, "image_hedge_delay", 60)
+    downloads.failures.update(URLS)
+    for url in URLS:
+        downloads.gates[url] = asyncio.Event()
+        downloads.gates[url].set()
+    assert await ImageProcessor([])._download_first_valid_image(URLS) is None
+    assert downloads.started == list(URLS)
@@ -0,0 +1,50 @@
+import pytest
+from anipusher.config import WORKDIR
+from anipusher.core.push_core import image_cache
+from anipusher.core.push_core.image_cache import ImageCache
+from anipusher.database import DatabaseTables
+from anipusher.database.db_operations import DatabaseSchemaManager
+
+
+@pytest.fixture
+async def cache(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(WORKDIR, "cache_dir", tmp_path / "cache")
+    await DatabaseSchemaManager.create_table(DatabaseTables.TableName.IMAGE_CACHE)
+    await ImageCache.load()
+    yield ImageCache
+    ImageCache._index.clear()
+    ImageCache._refs.clear()
+
+
+async def store(cache, tmp_path, content: bytes, **meta):
+    temp = tmp_path / "download.tmp"
+    temp.write_bytes(content)
+    return await cache.store("100", temp, {"format": "png", **meta})
+
+
+async def test_cleared_validators_are_persisted_as_null(cache, tmp_path):
+    await store(cache, tmp_path, b"old", url="https://a/1.png", etag='"E1"', last_modified="Mon")
+    await store(cache, tmp_path, b"new", url="https://b/1.png")
+    await cache.load()  # 模拟重启后从数据库载入
+    entry = await cache.lookup("100")
+    assert entry["url"] == "https://b/1.png"
+    assert entry["etag"] is None
+    assert entry["last_modified"] is None
+
+
+async def test_lookup_does_not_block_on_filesystem(cache, tmp_path, monkeypatch):
+    await store(cache, tmp_path, b"img")
+    calls = []
+    run = image_cache.BlockingIO.run
+
+    async def tracked(func, *args, **kwargs):
+        calls.append(getattr(func, "__name__", repr(func)))
+        return await run(func, *args, **kwargs)
+
+    def no_mkdir(*args, **kwargs):
+        raise AssertionError("mkdir on lookup")
+
+    monkeypatch.setattr(image_cache.BlockingIO, "run", tracked)
+    monkeypatch.setattr(image_cache.Path, "mkdir", no_mkdir)
+    assert (await cache.lookup("100"))["path"].read_bytes() == b"img"
+    assert calls == ["is_file"]
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+from anipusher.core.push_core import image_service
+from anipusher.core.push_core.image_service import ImageProcessor
+
+
+@pytest.fixture
+def normalized(monkeypatch):
+    calls = []
+
+    async def fake_apply(img_path, key):
+        calls.append((img_path, key))
+        return img_path.with_suffix(".small")
+
+    async def fake_acquire(self):
+        if self.cache_key is None:
+            self.cache_key = "url-abc"  # 模拟下载后按地址写入缓存
+        return Path("/cache/blob.png")
+
+    monkeypatch.setattr(image_service.ImageNormalizer, "apply", fake_apply)
+    monkeypatch.setattr(ImageProcessor, "_acquire", fake_acquire)
+    return calls
+
+
+@pytest.mark.parametrize(("tmdb_id", "key"), [("100", "100"), (None, "url-abc")])
+async def test_both_paths_are_normalized(normalized, tmdb_id, key):
+    assert await ImageProcessor(["https://a/1.png"], None, tmdb_id).process() == Path("/cache/blob.small")
+    assert normalized == [(Path("/cache/blob.png"), key)]
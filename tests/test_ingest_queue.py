@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from anipusher.core.monitor_core import ingest_queue
+from anipusher.core.monitor_core.ingest_queue import IngestQueue
+from anipusher.core.monitor_core.keyed_executor import KeyedExecutor
+
+
+class FakeProcessor:
+    """所有数据属于同一番剧，第一条数据阻塞到gate放行"""
+    gate: asyncio.Event
+
+    def __init__(self) -> None:
+        self.handed_off = False
+
+    @classmethod
+    async def create_and_run(cls, data):
+        instance = cls()
+        instance.handed_off = not await KeyedExecutor.run("tmdb:1", cls.gate.wait)
+        return instance
+
+
+@pytest.fixture
+async def queue(monkeypatch):
+    FakeProcessor.gate = asyncio.Event()
+    monkeypatch.setattr(ingest_queue, "DataProcessor", FakeProcessor)
+    for name in ("_accepted", "_rejected", "_processed", "_handed_off", "_failed"):
+        monkeypatch.setattr(IngestQueue, name, 0)
+    await IngestQueue.start(workers=2, max_size=3)
+    yield IngestQueue
+    FakeProcessor.gate.set()
+    await IngestQueue.stop()
+
+
+async def settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_lane_backlog_counts_toward_queue_limit(queue):
+    assert all(queue.submit({"n": n}) for n in range(3))
+    await settle()
+    # 第一条占用番剧分片，其余移交至分片队列，接收队列已空
+    assert queue.depth() == 0
+    assert KeyedExecutor.pending() == 2
+    assert queue.submit({"n": 3}) is True
+    await settle()
+    assert queue.submit({"n": 4}) is False  # 分片队列中的数据计入上限
+    stats = queue.stats()
+    assert (stats["lane_pending"], stats["handed_off"], stats["processed"], stats["rejected"]) == (3, 3, 0, 1)
+    FakeProcessor.gate.set()
+    await settle()
+    assert queue.stats()["processed"] == 1
+    assert KeyedExecutor.pending() == 0
+    assert queue.submit({"n": 5}) is True
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from anipusher.core.monitor_core.keyed_executor import KeyedExecutor
+
+
+def job(log: list, name: str, gate: asyncio.Event | None = None, error: Exception | None = None):
+    async def run():
+        if gate is not None:
+            await gate.wait()
+        log.append(name)
+        if error is not None:
+            raise error
+    return run
+
+
+async def test_same_key_runs_in_submission_order():
+    log = []
+    gate = asyncio.Event()
+    owner = asyncio.create_task(KeyedExecutor.run("tmdb:1", job(log, "first", gate)))
+    await asyncio.sleep(0)
+    # key忙碌时后续任务移交至该key的队列，立即返回
+    assert await KeyedExecutor.run("tmdb:1", job(log, "second")) is False
+    assert await KeyedExecutor.run("tmdb:1", job(log, "third")) is False
+    assert KeyedExecutor.pending() == 2
+    assert KeyedExecutor.stats()["active_keys"] == 1
+    gate.set()
+    assert await owner is True
+    assert log == ["first", "second", "third"]
+    assert KeyedExecutor.pending() == 0
+    assert KeyedExecutor.stats()["active_keys"] == 0
+
+
+async def test_busy_key_does_not_block_other_keys():
+    log = []
+    gate = asyncio.Event()
+    owner = asyncio.create_task(KeyedExecutor.run("tmdb:1", job(log, "a1", gate)))
+    await asyncio.sleep(0)
+    await KeyedExecutor.run("tmdb:1", job(log, "a2"))
+    # 其他key不受tmdb:1阻塞
+    assert await KeyedExecutor.run("tmdb:2", job(log, "b1")) is True
+    assert log == ["b1"]
+    gate.set()
+    await owner
+    assert log == ["b1", "a1", "a2"]
+
+
+async def test_none_key_runs_directly():
+    log = []
+    assert await KeyedExecutor.run(None, job(log, "x")) is True
+    assert log == ["x"]
+
+
+async def test_handed_off_failure_does_not_stop_lane():
+    log = []
+    gate = asyncio.Event()
+    owner = asyncio.create_task(KeyedExecutor.run("k", job(log, "first", gate)))
+    await asyncio.sleep(0)
+    await KeyedExecutor.run("k", job(log, "broken", error=RuntimeError("boom")))
+    await KeyedExecutor.run("k", job(log, "last"))
+    gate.set()
+    assert await owner is True
+    assert log == ["first", "broken", "last"]
+
+
+async def test_owner_failure_raised_after_lane_drained():
+    log = []
+    gate = asyncio.Event()
+    owner = asyncio.create_task(KeyedExecutor.run("k", job(log, "first", gate, RuntimeError("boom"))))
+    await asyncio.sleep(0)
+    await KeyedExecutor.run("k", job(log, "queued"))
+    gate.set()
+    with pytest.raises(RuntimeError):
+        await owner
+    assert log == ["first", "queued"]
+    assert KeyedExecutor.stats()["active_keys"] == 0
@@ -0,0 +1,78 @@
+import pytest
+from anipusher.database import DatabaseService, DatabaseTables, OutboxService
+from anipusher.database.db_operations import DatabaseSchemaManager
+
+TABLE = DatabaseTables.TableName.EMBY
+Status = DatabaseTables.SendStatus
+
+
+@pytest.fixture
+async def rows(database):
+    await DatabaseSchemaManager.create_table(TABLE)
+    return [await DatabaseService.upsert_data(TABLE, {"title": f"ep{i}"}) for i in range(3)]
+
+
+async def status_of(row_id: int) -> int:
+    result = await DatabaseService.select_data(TABLE, columns=["send_status"], where={"id": row_id})
+    return result[0][0]
+
+
+async def test_claim_in_id_order_with_limit(rows):
+    claimed = await OutboxService.claim(TABLE, limit=2)
+    assert [row["id"] for row in claimed] == rows[:2]
+    assert all(row["send_status"] == Status.CLAIMED and row["attempts"] == 1 for row in claimed)
+    # 租约有效期内不会被再次认领
+    assert [row["id"] for row in await OutboxService.claim(TABLE, limit=5)] == rows[2:]
+    assert await OutboxService.claim(TABLE) == []
+    assert await OutboxService.has_claimable(TABLE) is False
+
+
+async def test_complete_marks_sent(rows):
+    row, = await OutboxService.claim(TABLE)
+    assert await OutboxService.complete(TABLE, row) is True
+    assert await status_of(row["id"]) == Status.SENT
+    assert await OutboxService.complete(TABLE, row) is False  # 已不再处于认领状态
+
+
+async def test_expired_lease_is_reclaimed_and_stale_holder_rejected(rows, monkeypatch):
+    monkeypatch.setattr(OutboxService, "LEASE_SECONDS", -1)  # 认领即过期
+    stale, = await OutboxService.claim(TABLE)
+    monkeypatch.setattr(OutboxService, "LEASE_SECONDS", 300)
+    fresh, = await OutboxService.claim(TABLE)
+    assert fresh["id"] == stale["id"]
+    assert fresh["attempts"] == 2
+    # 原持有者的租约已被接管，完成与失败都不生效
+    assert await OutboxService.complete(TABLE, stale) is False
+    assert await OutboxService.fail(TABLE, stale, "timeout") is None
+    assert await status_of(fresh["id"]) == Status.CLAIMED
+    assert await OutboxService.complete(TABLE, fresh) is True
+    assert await status_of(fresh["id"]) == Status.SENT
+
+
+async def test_fail_schedules_retry_then_gives_up(rows, monkeypatch):
+    row, = await OutboxService.claim(TABLE)
+    assert await OutboxService.fail(TABLE, row, "send failed") == Status.FAILED
+    assert await status_of(row["id"]) == Status.FAILED
+    # 未到next_retry_at前不可认领
+    assert [r["id"] for r in await OutboxService.claim(TABLE, limit=5)] == rows[1:]
+    await DatabaseService.update_data(TABLE, {"next_retry_at": 0}, {"id": rows[0]})
+    monkeypatch.setattr(OutboxService, "RETRY_BASE", -1)  # 之后的失败立即到期
+    for attempt in range(2, OutboxService.MAX_ATTEMPTS + 1):
+        row, = await OutboxService.claim(TABLE)
+        assert row["attempts"] == attempt
+        expected = Status.DEAD if attempt == OutboxService.MAX_ATTEMPTS else Status.FAILED
+        assert await OutboxService.fail(TABLE, row, "send failed") == expected
+    assert await status_of(rows[0]) == Status.DEAD
+    assert await OutboxService.claim(TABLE) == []
+
+
+async def test_delivered_targets_survive_retry(rows):
+    row, = await OutboxService.claim(TABLE)
+    assert OutboxService.delivered_targets(row) == set()
+    assert await OutboxService.fail(TABLE, row, "group 222 failed", {"group:111"}) == Status.FAILED
+    await DatabaseService.update_data(TABLE, {"next_retry_at": 0}, {"id": row["id"]})
+    retry, = [r for r in await OutboxService.claim(TABLE, limit=5) if r["id"] == row["id"]]
+    assert OutboxService.delivered_targets(retry) == {"group:111"}
+    assert await OutboxService.complete(TABLE, retry, {"group:111", "group:222"}) is True
+    result = await DatabaseService.select_data(TABLE, columns=["delivered_targets"], where={"id": row["id"]})
+    assert OutboxService.delivered_targets({"delivered_targets": result[0][0]}) == {"group:111", "group:222"}
@@ -0,0 +1,37 @@
+from anipusher.core.push_core import handler
+from anipusher.core.push_core.handler import PushService
+from anipusher.database import DatabaseTables, OutboxService
+
+
+def make_service(delivered: set[str]) -> PushService:
+    service = PushService(DatabaseTables.TableName.EMBY)
+    service.group_targets = [111, 222]
+    service.private_targets = ["1", "2"]
+    service.subscriber = ({}, ["1", "2"])
+    service.delivered = delivered
+    return service
+
+
+async def test_retry_skips_delivered_targets(monkeypatch):
+    sent = []
+    broken = {222, "2"}
+
+    async def fake_pusher(message, targets):
+        sent.extend(targets)
+        return [target for target in targets if target in broken]
+
+    monkeypatch.setattr(handler, "group_msg_pusher", fake_pusher)
+    monkeypatch.setattr(handler, "private_msg_pusher", fake_pusher)
+
+    first = make_service(set())
+    failed = await first._group_push([]) + await first._private_push([])
+    assert failed == [222, "2"]
+    assert first.delivered == {"group:111", "private:1"}
+
+    # 重试时从数据行恢复已送达目标，只推送失败的目标
+    broken.clear()
+    stored = {"delivered_targets": '["group:111", "private:1"]'}
+    retry = make_service(OutboxService.delivered_targets(stored))
+    assert await retry._group_push([]) + await retry._private_push([]) == []
+    assert {target: sent.count(target) for target in sent} == {111: 1, 222: 2, "1": 1, "2": 2}
+    assert retry.delivered == {"group:111", "group:222", "private:1", "private:2"}
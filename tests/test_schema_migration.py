@@ -0,0 +1,38 @@
+from anipusher.database import DatabaseManager, DatabaseService, DatabaseTables, OutboxService, SQLiteQueryBuilder
+from anipusher.database.db_operations import DatabaseSchemaManager
+
+TABLE = DatabaseTables.TableName.EMBY
+
+
+async def create_legacy_table(columns: list[str]) -> None:
+    schema = DatabaseTables.get_table_schema(TABLE)
+    legacy = {name: schema[name] for name in columns}
+    async with DatabaseManager.get_connection() as conn:
+        await conn.execute(SQLiteQueryBuilder.build_create_table(TABLE, legacy))
+        await conn.execute(f"INSERT INTO {TABLE.value} (title) VALUES ('ep1')")
+        await conn.commit()
+
+
+async def table_columns() -> list[str]:
+    return [row[1] for row in await DatabaseSchemaManager.get_table_metadata(TABLE)]
+
+
+async def test_columns_added_in_the_middle_use_copy(database):
+    schema = list(DatabaseTables.get_table_schema(TABLE))
+    legacy = [name for name in schema if name not in ("attempts", "lease_until", "next_retry_at")]
+    await create_legacy_table(legacy)
+    assert await DatabaseSchemaManager.migrate_table(TABLE, legacy) == "copy"
+    assert await table_columns() == schema
+    # 按结构顺序映射的认领结果字段不错位
+    row, = await OutboxService.claim(TABLE)
+    assert row["title"] == "ep1"
+    assert row["attempts"] == 1
+
+
+async def test_columns_added_at_the_end_use_alter(database):
+    schema = list(DatabaseTables.get_table_schema(TABLE))
+    await create_legacy_table(schema[:-1])
+    assert await DatabaseSchemaManager.migrate_table(TABLE, schema[:-1]) == "alter"
+    assert await table_columns() == schema
+    rows = await DatabaseService.select_data(TABLE, columns=["title"])
+    assert [tuple(row) for row in rows] == [("ep1",)]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from anipusher.utils import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    gate = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return "poster"
+
+    waiters = [asyncio.create_task(flight.do("tmdb:1", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert flight.inflight() == 1
+    gate.set()
+    assert await asyncio.gather(*waiters) == ["poster"] * 3
+    assert calls == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 2, "inflight": 0}
+
+
+async def test_different_keys_execute_separately():
+    flight = SingleFlight()
+
+    async def fetch():
+        return object()
+
+    first, second = await asyncio.gather(flight.do("a", fetch), flight.do("b", fetch))
+    assert first is not second
+    assert flight.stats()["executed"] == 2
+
+
+async def test_exception_is_shared_and_key_released():
+    flight = SingleFlight()
+    gate = asyncio.Event()
+
+    async def broken():
+        await gate.wait()
+        raise ValueError("download failed")
+
+    waiters = [asyncio.create_task(flight.do("k", broken)) for _ in range(2)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.inflight() == 0
+
+    async def ok():
+        return 1
+
+    assert await flight.do("k", ok) == 1  # 失败后不再合并到旧的调用
+
+
+async def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+    gate = asyncio.Event()
+
+    async def fetch():
+        await gate.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("k", fetch))
+    second = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    gate.set()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "done"
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+from anipusher.database import DatabaseService, DatabaseTables
+from anipusher.database.db_operations import DatabaseSchemaManager
+from anipusher.external.tmdb_cache import TmdbCache
+
+TABLE = DatabaseTables.TableName.TMDB_CACHE
+
+
+@pytest.mark.parametrize(("endpoint", "payload", "negative"), [
+    ("find/tt1", {"movie_results": [], "tv_results": [], "tv_episode_results": []}, True),
+    ("find/tt1", {"movie_results": [], "tv_results": [{"id": 1}]}, False),
+    ("search/tv", {"page": 1, "results": [], "total_results": 0}, True),
+    ("search/tv", {"page": 1, "results": [{"id": 1}]}, False),
+    ("tv/1", {"status_code": 34, "success": False}, True),
+    ("tv/1", {"id": 1, "seasons": []}, False),
+])
+def test_is_negative(endpoint, payload, negative):
+    assert TmdbCache.is_negative(endpoint, payload) is negative
+
+
+async def test_empty_find_uses_negative_ttl_and_expired_rows_are_purged(database, monkeypatch):
+    monkeypatch.setattr(TmdbCache, "_memory", type(TmdbCache._memory)())
+    monkeypatch.setattr(TmdbCache, "_last_purge", 0.0)
+    await DatabaseSchemaManager.create_table(TABLE)
+    await TmdbCache.set("find/tt1", "find/tt1", {"movie_results": [], "tv_results": []})
+    (expires_at, negative), = await DatabaseService.select_data(TABLE, columns=["expires_at", "negative"])
+    assert negative == 1
+    assert expires_at <= time.time() + TmdbCache.NEGATIVE_TTL
+    await DatabaseService.update_data(TABLE, {"expires_at": 0}, {"cache_key": "find/tt1"})
+    await TmdbCache.set("tv/1", "tv/1", {"id": 1})
+    assert await TmdbCache.purge_expired() == 1
+    assert [tuple(row) for row in await DatabaseService.select_data(TABLE, columns=["cache_key"])] == [("tv/1",)]